@@ -1,9 +1,9 @@
 import React, { useState, useRef } from 'react';
 import { createPortal } from 'react-dom';
 import { useReactToPrint } from 'react-to-print';
-import { Printer } from 'lucide-react';
+import { Printer, FileDown } from 'lucide-react';
 import { PrintableReport } from './PrintableReport';
-import { MovementLogEntry } from '../types';
+import { MovementLogEntry, Job } from '../types';
 
 interface PrintReportButtonProps {
   filters: {
@@ -20,6 +20,7 @@ export const PrintReportButton: React.FC<PrintReportButtonProps> = ({ filters, d
   const [printableData, setPrintableData] = useState<MovementLogEntry[]>([]);
   const [isPreparing, setIsPreparing] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [pdfJob, setPdfJob] = useState<Job | null>(null);
   const printComponentRef = useRef<HTMLDivElement>(null);
 
   const handlePrint = useReactToPrint({
@@ -40,6 +41,44 @@ export const PrintReportButton: React.FC<PrintReportButtonProps> = ({ filters, d
     `,
   });
 
+  // Large results are rendered to PDF on the server, so the rows never reach the DOM.
+  const exportPdf = async () => {
+    setError(null);
+    try {
+      const response = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          kind: 'movement_logs_pdf',
+          params: {
+            date_from: filters.fromDate || undefined,
+            date_to: filters.toDate || undefined,
+            item_id: filters.itemId || undefined,
+            provider_id: filters.providerId || undefined,
+            destination_id: filters.destinationId || undefined,
+          },
+        }),
+      });
+      let job: Job = await response.json();
+      if (!response.ok) throw new Error((job as any).error || 'Failed to start the PDF report');
+      setPdfJob(job);
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const poll = await fetch(`/api/jobs/${job.id}`);
+        job = await poll.json();
+        if (!poll.ok) throw new Error((job as any).error || 'Failed to check the PDF report');
+        setPdfJob(job);
+      }
+      if (job.status === 'failed') throw new Error(job.error || 'Failed to render the PDF report');
+      window.location.href = `/api/jobs/${job.id}/download`;
+    } catch (err: any) {
+      console.error("Error exporting PDF:", err);
+      setError(err.message || "فشل في إنشاء ملف PDF.");
+    } finally {
+      setPdfJob(null);
+    }
+  };
+
   const prepareAndPrint = async () => {
     setIsPreparing(true);
     setError(null);
@@ -95,6 +134,24 @@ export const PrintReportButton: React.FC<PrintReportButtonProps> = ({ filters, d
           </>
         )}
       </button>
+
+      <button
+        onClick={exportPdf}
+        className="btn btn-outline"
+        disabled={disabled || pdfJob !== null}
+      >
+        {pdfJob ? (
+          <>
+            <span className="loading loading-spinner loading-xs"></span>
+            {pdfJob.progress.rows ? `جاري إنشاء PDF (${pdfJob.progress.rows} سجل)...` : 'جاري إنشاء PDF...'}
+          </>
+        ) : (
+          <>
+            <FileDown size={16} className="ml-2 rtl:mr-2 rtl:ml-0" />
+            تصدير PDF
+          </>
+        )}
+      </button>
       
       {error && <p className="text-error-500 text-xs mt-1">{error}</p>}
 
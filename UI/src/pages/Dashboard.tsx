@@ -4,7 +4,7 @@ import {
   PlusCircle, BarChart3, ScanLine // Added icons for Quick Actions
 } from 'lucide-react';
 import { useAppContext } from '../context/AppContext';
-import { Unit, MovementLogEntry } from '../types'; // Import the shared Item and Unit types
+import { Unit, MovementLogEntry, ReorderDashboardFeed } from '../types'; // Import the shared Item and Unit types
 import { AddItemModal } from '../components/AddItemModal'; // Import AddItemModal
 
 // Removed imports: Search, Plus, SearchBar, ItemCard, AdjustQuantityModal
@@ -24,6 +24,11 @@ export const Dashboard = () => {
   const [isLoadingRecentLogs, setIsLoadingRecentLogs] = useState(true);
   const [recentLogsError, setRecentLogsError] = useState<string | null>(null);
 
+  // Reorder widget, fed by the demand forecast
+  const [reorderFeed, setReorderFeed] = useState<ReorderDashboardFeed | null>(null);
+  const [isLoadingReorder, setIsLoadingReorder] = useState(true);
+  const [reorderError, setReorderError] = useState<string | null>(null);
+
   // State for AddItemModal
   const [isAddItemModalOpen, setIsAddItemModalOpen] = useState(false);
   const [dashboardUnits, setDashboardUnits] = useState<Unit[]>([]);
@@ -110,6 +115,26 @@ export const Dashboard = () => {
     };
 
     fetchRecentLogs();
+
+    const fetchReorderFeed = async () => {
+      setIsLoadingReorder(true);
+      setReorderError(null);
+      try {
+        const response = await fetch('/api/analytics/reorder/dashboard');
+        if (!response.ok) {
+          const errorData = await response.json().catch(() => ({}));
+          throw new Error(errorData.error || `Failed to fetch reorder forecast: ${response.statusText}`);
+        }
+        setReorderFeed(await response.json());
+      } catch (e: any) {
+        console.error("Failed to fetch reorder forecast", e);
+        setReorderError(e.message || "An unexpected error occurred while fetching the reorder forecast.");
+      } finally {
+        setIsLoadingReorder(false);
+      }
+    };
+
+    fetchReorderFeed();
   }, []);
 
   const handleItemAdded = () => {
@@ -296,33 +321,44 @@ export const Dashboard = () => {
           )}
         </div>
 
-        {/* Low Stock Items Section (Right Column - takes 1/3 on large screens) - REMOVED */}
-        {/* 
-        <div className="lg:col-span-1 card p-6 shadow-sm">
-          <h2 className="text-xl font-semibold mb-4 text-gray-700">أصناف تحتاج انتباه</h2>
-          <div className="space-y-3">
-            <div className="flex justify-between items-center p-3 bg-warning-50 rounded-md">
-              <div>
-                <p className="text-sm font-medium text-warning-700">ورق طباعة A4</p>
-                <p className="text-xs text-warning-600">متبقي: 5 رزم فقط</p>
-              </div>
-              <button className="btn btn-xs btn-outline-warning">إعادة طلب</button>
-            </div>
-            <div className="flex justify-between items-center p-3 bg-warning-50 rounded-md">
-              <div>
-                <p className="text-sm font-medium text-warning-700">أقلام حبر أزرق</p>
-                <p className="text-xs text-warning-600">متبقي: 12 قلم فقط</p>
-              </div>
-              <button className="btn btn-xs btn-outline-warning">إعادة طلب</button>
+        {/* Items to reorder, from the demand forecast (lowest days of cover first) */}
+        <div className="card p-6 shadow-sm">
+          <h2 className="text-xl font-semibold mb-4 text-gray-700">أصناف تحتاج إعادة طلب</h2>
+          {isLoadingReorder && (
+            <div className="flex justify-center items-center py-4">
+              <div className="animate-spin rounded-full h-8 w-8 border-t-2 border-b-2 border-primary-500"></div>
+              <p className="ml-3 text-gray-600">جارٍ حساب توقعات الاستهلاك...</p>
             </div>
-            <div className="text-center mt-4">
-              <a href="#" className="text-primary-600 hover:text-primary-700 text-sm font-medium">
-                عرض كل التنبيهات &rarr;
-              </a>
+          )}
+          {reorderError && (
+            <div className="p-4 my-2 text-sm text-red-700 bg-red-100 rounded-lg text-center" role="alert">
+              <span className="font-medium">خطأ في تحميل التوقعات!</span> {reorderError}
             </div>
-          </div>
+          )}
+          {!isLoadingReorder && !reorderError && reorderFeed && (
+            <>
+              <p className="text-sm text-gray-500 mb-4">
+                {reorderFeed.needs_reorder_count} صنف وصل إلى حد إعادة الطلب، و{reorderFeed.low_cover_count} صنف يكفي مخزونه أقل من مدة التوريد.
+              </p>
+              {reorderFeed.items.length === 0 ? (
+                <p className="text-center text-gray-500 py-4">لا توجد أصناف تحتاج إعادة طلب حالياً.</p>
+              ) : (
+                <div className="space-y-3">
+                  {reorderFeed.items.map((item) => (
+                    <div key={item.item_id} className="flex justify-between items-center p-3 bg-warning-50 rounded-md">
+                      <div>
+                        <p className="text-sm font-medium text-warning-700">{item.name}</p>
+                        <p className="text-xs text-warning-600">
+                          متبقي: {item.current_quantity} — يكفي {item.days_of_cover ?? '—'} يوم — حد الطلب: {Math.ceil(item.reorder_point)}
+                        </p>
+                      </div>
+                    </div>
+                  ))}
+                </div>
+              )}
+            </>
+          )}
         </div>
-        */}
       </div>
       
       {/* AddItemModal Render */}
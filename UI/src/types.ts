@@ -49,4 +49,35 @@ export type Provider = {
   name: string;
 };
 
+export type ReorderForecastItem = {
+  item_id: number;
+  name: string;
+  current_quantity: number;
+  avg_daily_demand_30d: number;
+  avg_daily_demand_90d: number;
+  forecast_daily_demand: number;
+  demand_std_daily: number;
+  days_of_cover: number | null; // null when the item has no recent demand
+  reorder_point: number;
+  needs_reorder: boolean;
+};
+
+export type ReorderDashboardFeed = {
+  as_of: string;
+  computed_at: string;
+  needs_reorder_count: number;
+  low_cover_count: number;
+  items: ReorderForecastItem[];
+};
+
+export type Job = {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'ready' | 'failed';
+  progress: { rows?: number; pages?: number };
+  error: string | null;
+  has_file: boolean;
+  reused?: boolean;
+};
+
 // You can add other shared types/interfaces here as the application grows. 
\ No newline at end of file
@@ -4,12 +4,21 @@
 
 block_cipher = None
 
+# Write .gz/.br copies of the built UI so app.static_assets can serve them
+# without compressing at runtime.
+import os
+import sys
+sys.path.insert(0, SPECPATH)
+from app.static_assets import precompress_directory
+precompress_directory(os.path.join(SPECPATH, 'UI', 'dist'))
+
 # Define data files to be included in the application bundle.
 # The paths are relative to this .spec file (project root).
 # The tuple format is (source_path, destination_path_in_bundle).
 datas_list = [
     ('UI/dist/', './dist/'),              # Copies the built React frontend.
     ('database/schema.sql', './database/'), # Copies the database schema.
+    ('database/migrations/', './database/migrations/'), # Copies the numbered schema migrations.
     ('app/assets/arial.ttf', './assets/') # Copies the font file.
 ]
 
@@ -27,8 +36,28 @@ a = Analysis(
         'barcode',
         'barcode.writer',
         
+        'app.metrics',
+        'app.compression',
+        'app.json_format',
+        'app.static_assets',
+        'app.barcode_render',
+        'app.pdf_render',
+        'app.reports',
+        'app.jobs',
+
         # Models
         'app.models.db_utils',
+        'app.models.barcode_index',
+        'app.models.log_archive_model',
+        'app.models.count_cache',
+        'app.models.valuation_model',
+        'app.models.forecast_model',
+        'app.models.abc_model',
+        'app.models.reconciliation_model',
+        'app.models.stocktake_model',
+        'app.models.scan_session_model',
+        'app.models.sql_tracing',
+        'app.models.text_utils',
         'app.models.item_model',
         'app.models.movement_log_model',
         'app.models.unit_model',
@@ -44,6 +73,14 @@ a = Analysis(
         'app.routes.category_routes',
         'app.routes.destination_routes',
         'app.routes.provider_routes',
+        'app.routes.metrics_routes',
+        'app.routes.valuation_routes',
+        'app.routes.analytics_routes',
+        'app.routes.reconciliation_routes',
+        'app.routes.stocktake_routes',
+        'app.routes.scan_session_routes',
+        'app.routes.scan_socket_routes',
+        'app.routes.job_routes',
     ],
     hookspath=[],
     runtime_hooks=[],
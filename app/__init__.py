@@ -1 +1,60 @@
- 
\ No newline at end of file
+import flask
+from flask import g
+
+def create_app(static_folder=None):
+    """
+    Builds the Flask application with every API blueprint and request hook registered.
+    The desktop entry point (app.main) passes the built UI directory; benchmarks and
+    other headless callers can leave it out and use only the API.
+    """
+    # Imported here so that importing a model module doesn't pull in every route.
+    from .models import sql_tracing
+    from . import metrics, compression
+    from .routes.units_routes import bp as units_bp
+    from .routes.items_routes import items_bp
+    from .routes.log_routes import bp as log_bp
+    from .routes.backup_routes import bp as backup_bp
+    from .routes.category_routes import bp as category_bp
+    from .routes.destination_routes import bp as destination_bp
+    from .routes.provider_routes import bp as provider_bp
+    from .routes.metrics_routes import bp as metrics_bp
+    from .routes.valuation_routes import bp as valuation_bp
+    from .routes.analytics_routes import bp as analytics_bp
+    from .routes.reconciliation_routes import bp as reconciliation_bp
+    from .routes.stocktake_routes import bp as stocktake_bp
+    from .routes.scan_session_routes import bp as scan_session_bp
+    from .routes.scan_socket_routes import bp as scan_socket_bp
+    from .routes.job_routes import bp as job_bp
+
+    app = flask.Flask(__name__, static_folder=static_folder, static_url_path='/')
+    # Send Arabic text as UTF-8 instead of \uXXXX escapes (about half the bytes).
+    app.json.ensure_ascii = False
+
+    app.register_blueprint(units_bp)
+    app.register_blueprint(items_bp)
+    app.register_blueprint(log_bp)
+    app.register_blueprint(backup_bp)
+    app.register_blueprint(category_bp)
+    app.register_blueprint(destination_bp)
+    app.register_blueprint(provider_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(valuation_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(reconciliation_bp)
+    app.register_blueprint(stocktake_bp)
+    app.register_blueprint(scan_session_bp)
+    app.register_blueprint(scan_socket_bp)
+    app.register_blueprint(job_bp)
+
+    sql_tracing.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app)
+
+    # --- Database Connection Management ---
+    @app.teardown_appcontext
+    def close_db(e=None):
+        db = g.pop('db', None)
+        if db is not None:
+            db.close()
+
+    return app
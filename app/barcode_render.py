@@ -0,0 +1,24 @@
+from io import BytesIO
+
+def _barcode_stack():
+    """
+    Imports python-barcode and its PIL image writer on first use.
+    PIL is one of the slowest imports in the app and only the barcode
+    routes need it, so it stays off the startup path.
+    """
+    import barcode
+    from barcode.writer import ImageWriter
+    return barcode, ImageWriter
+
+def warm_up():
+    """Loads the barcode stack ahead of the first render (called from app.main's warm-up thread)."""
+    _barcode_stack()
+
+def render_code128_png(value: str, options: dict | None = None) -> BytesIO:
+    """Renders value as a Code 128 PNG and returns the buffer rewound to the start."""
+    barcode, ImageWriter = _barcode_stack()
+    Code128 = barcode.get_barcode_class('code128')
+    buffer = BytesIO()
+    Code128(value, writer=ImageWriter()).write(buffer, options=options)
+    buffer.seek(0)
+    return buffer
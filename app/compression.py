@@ -0,0 +1,60 @@
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available.
+    brotli = None
+
+# Responses smaller than this are sent as-is; compressing them costs more than it saves.
+COMPRESSION_MIN_BYTES = int(os.getenv('WAREHOUSE_COMPRESSION_MIN_BYTES', '1024'))
+# Low levels: most of the size reduction for a fraction of the CPU time, which
+# matters more than the last few percent of bytes for a local webview.
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'image/svg+xml',
+}
+
+def choose_encoding(accept_encodings) -> str | None:
+    """Picks 'br' or 'gzip' from a parsed Accept-Encoding header, or None."""
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compresses data; best=True uses the maximum level (for build-time precompression)."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL)
+
+def init_app(app):
+    """Compresses large text responses with the best encoding the client accepts."""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
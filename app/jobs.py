@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from flask import current_app
+from . import metrics
+from .models import count_cache
+from .models.db_utils import get_db
+
+# Background jobs for the heavy operations (PDF and CSV exports, forecasts,
+# ABC classification, valuation rebuilds).
+#
+# A kind is registered once with the function that does the work. Clients
+# submit a kind and its params, get a job id back at once and poll (or stream)
+# the job's status and progress while a small pool of worker threads runs it;
+# request threads never do the work themselves. Each job runs in its own app
+# context, so model functions that use get_db() work unchanged.
+#
+# Finished results are reused: a job is keyed by (kind, params, data version),
+# where the data version is the highest movement log id plus the in-process
+# version counters of the tables the kind reads (count_cache). Submitting the
+# same kind and params again returns the finished job until one of those
+# tables changes; a matching job that is still queued or running is shared too.
+# Job records live in memory; files are kept in the app data directory until
+# MAX_JOBS newer jobs exist.
+
+# Threads rather than processes: the work is mostly SQLite, which releases the
+# GIL, and the frozen app would have to re-import everything in each process.
+JOB_WORKERS = 2
+MAX_JOBS = 50
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+_lock = threading.Lock()
+_changed = threading.Condition(_lock)
+_jobs = {}
+JOB_KINDS = {}
+
+FINISHED = ('ready', 'failed')
+
+class JobKind:
+    """
+    How to run one kind of job. run(params, progress) returns the JSON result;
+    with a file_suffix it is called as run(path, params, progress) and writes
+    the file at path. parse(data) validates submitted params (raising
+    ValueError) and returns them normalized. tables are the tables the result
+    depends on; None means the result is never reused (e.g. jobs that write).
+    """
+
+    def __init__(self, name, run, parse=None, tables=None, file_suffix=None, mimetype=None):
+        self.name = name
+        self.run = run
+        self.parse = parse
+        self.tables = tuple(tables) if tables is not None else None
+        self.file_suffix = file_suffix
+        self.mimetype = mimetype
+
+def register(name: str, run, parse=None, tables=None, file_suffix: str | None = None, mimetype: str | None = None):
+    """Registers a job kind; see JobKind."""
+    JOB_KINDS[name] = JobKind(name, run, parse, tables, file_suffix, mimetype)
+
+def get_jobs_dir() -> Path:
+    base = Path(os.getenv('APPDATA')) / 'WarehouseApp' if os.getenv('APPDATA') else Path.home() / '.warehouse_app'
+    jobs_dir = base / 'reports'
+    jobs_dir.mkdir(parents=True, exist_ok=True)
+    return jobs_dir
+
+def data_version(tables) -> tuple:
+    """High-water mark of the data a result over tables was computed from."""
+    max_log_id = get_db().execute("SELECT MAX(id) FROM movement_logs").fetchone()[0] or 0
+    return (max_log_id,) + count_cache.table_versions(tables)
+
+def _public(job):
+    return {key: value for key, value in job.items() if key not in ('path', 'result', 'key', 'version')}
+
+def _touch(job, **fields):
+    """Updates a job and wakes the clients streaming it."""
+    with _changed:
+        job.update(fields)
+        job['revision'] += 1
+        _changed.notify_all()
+
+def _prune():
+    """Drops the oldest finished jobs (and their files) beyond MAX_JOBS. Call with _lock held."""
+    finished = [job for job in _jobs.values() if job['status'] in FINISHED]
+    for job in sorted(finished, key=lambda job: job['created_at'])[:max(0, len(_jobs) - MAX_JOBS)]:
+        del _jobs[job['id']]
+        if job['path']:
+            try:
+                os.remove(job['path'])
+            except OSError:
+                pass
+
+def _run(app, job):
+    kind = JOB_KINDS[job['kind']]
+
+    def progress(**fields):
+        _touch(job, progress={**job['progress'], **fields})
+
+    _touch(job, status='running', started_at=datetime.now().isoformat(sep=' '))
+    start = time.perf_counter()
+    try:
+        with app.app_context():
+            if kind.file_suffix:
+                result = kind.run(job['path'], job['params'], progress)
+                result = dict(result or {}, size_bytes=os.path.getsize(job['path']))
+            else:
+                result = kind.run(job['params'], progress)
+        job['result'] = result
+        _touch(job, status='ready', finished_at=datetime.now().isoformat(sep=' '))
+    except Exception as e:
+        print(f"Error running job {job['id']} ({job['kind']}): {e}")
+        _touch(job, status='failed', error=str(e), finished_at=datetime.now().isoformat(sep=' '))
+        if job['path']:
+            try:
+                os.remove(job['path'])
+            except OSError:
+                pass
+    metrics.JOB_SECONDS.observe(time.perf_counter() - start, job['kind'])
+    metrics.JOBS_TOTAL.inc(job['kind'], job['status'])
+
+def _find(key, version):
+    """A job with the same key that is still usable: active, or finished ready at the same data version."""
+    for job in _jobs.values():
+        if job['key'] != key or job['status'] == 'failed':
+            continue
+        if job['status'] != 'ready' or (version is not None and job['version'] == version):
+            return job
+    return None
+
+def submit(kind_name: str, data: dict | None = None) -> tuple[dict, bool]:
+    """
+    Queues a job and returns (job, reused). reused is True when an identical
+    job (same kind, params and data version) was already finished or running,
+    in which case that job is returned instead of starting a new one.
+    """
+    kind = JOB_KINDS.get(kind_name)
+    if kind is None:
+        raise ValueError(f"Unknown job kind '{kind_name}'.")
+    params = kind.parse(data or {}) if kind.parse else dict(data or {})
+    key = (kind_name, json.dumps(params, sort_keys=True, default=str))
+    version = data_version(kind.tables) if kind.tables is not None else None
+
+    with _lock:
+        existing = _find(key, version)
+        if existing is not None:
+            metrics.JOBS_TOTAL.inc(kind_name, 'reused')
+            return _public(existing), True
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id, "kind": kind_name, "params": params, "status": "queued",
+            "created_at": datetime.now().isoformat(sep=' '), "started_at": None, "finished_at": None,
+            "progress": {}, "error": None, "has_file": bool(kind.file_suffix), "revision": 0,
+            "path": str(get_jobs_dir() / f"{kind_name}_{job_id}{kind.file_suffix}") if kind.file_suffix else None,
+            "result": None, "key": key, "version": version,
+        }
+        _jobs[job_id] = job
+        _prune()
+    _executor.submit(_run, current_app._get_current_object(), job)
+    return _public(job), False
+
+def get_job(job_id: str) -> dict | None:
+    job = _jobs.get(job_id)
+    return _public(job) if job is not None else None
+
+def list_jobs(kind: str | None = None) -> list[dict]:
+    """Jobs newest first, optionally of one kind."""
+    with _lock:
+        jobs = [job for job in _jobs.values() if kind is None or job['kind'] == kind]
+    return [_public(job) for job in sorted(jobs, key=lambda job: job['created_at'], reverse=True)]
+
+def get_result(job_id: str):
+    """(status, result) of a job; result is None until it is ready. None if the job does not exist."""
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return job['status'], job['result'] if job['status'] == 'ready' else None
+
+def get_job_file(job_id: str) -> tuple[str, str] | None:
+    """(path, mimetype) of a ready job's file, or None while there is none."""
+    job = _jobs.get(job_id)
+    if job is None or job['status'] != 'ready' or not job['path']:
+        return None
+    return job['path'], JOB_KINDS[job['kind']].mimetype or 'application/octet-stream'
+
+def wait_for_update(job_id: str, revision: int | None, timeout: float) -> dict | None:
+    """
+    Returns the job once its revision differs from revision (at once when
+    revision is None or the job is finished), or after timeout unchanged.
+    None if the job does not exist.
+    """
+    with _changed:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        _changed.wait_for(lambda: job['revision'] != revision or job['status'] in FINISHED, timeout)
+        return _public(job)
@@ -0,0 +1,15 @@
+from flask import request
+
+def wants_columnar() -> bool:
+    """True when the request asked for ?format=columnar."""
+    return request.args.get('format') == 'columnar'
+
+def to_columnar(rows: list[dict]) -> dict:
+    """
+    Converts a list of row dicts that share the same keys into
+    {"columns": [...], "rows": [[...], ...]}, so key names are sent once.
+    """
+    if not rows:
+        return {"columns": [], "rows": []}
+    columns = list(rows[0].keys())
+    return {"columns": columns, "rows": [[row[column] for column in columns] for row in rows]}
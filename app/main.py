@@ -1,29 +1,22 @@
-import flask
-from flask import g
-from flask_cors import CORS
-import webview
 import threading
 import os
 import sys
-from flask import send_from_directory
 from datetime import datetime, timedelta
 from pathlib import Path
 
 # Import model utilities first to ensure DB can be initialized
 from app.models.db_utils import initialize_database, create_timestamped_backup
+from app.models import barcode_index, valuation_model
 
-# Import API route blueprints
-from app.routes.units_routes import bp as units_bp
-from app.routes.items_routes import items_bp
-from app.routes.log_routes import bp as log_bp
-from app.routes.backup_routes import bp as backup_bp
-from app.routes.category_routes import bp as category_bp
-from app.routes.destination_routes import bp as destination_bp
-from app.routes.provider_routes import bp as provider_bp
+# Application factory (registers the API blueprints and request hooks)
+from app import create_app, static_assets, barcode_render
 
+# webview (and its GUI toolkit) and flask_cors are imported where they are
+# used, so they don't delay building the app.
 
 VITE_DEV_SERVER_URL = 'http://localhost:5173/'
-PRODUCTION_FLASK_URL = 'http://127.0.0.1:5070/'
+FLASK_PORT = 5070
+PRODUCTION_FLASK_URL = f'http://127.0.0.1:{FLASK_PORT}/'
 
 # --- Application Mode Configuration ---
 # Set this to False for production builds
@@ -35,44 +28,39 @@ else:
     script_dir = os.path.dirname(os.path.abspath(__file__))
     UI_BUILD_DIR = os.path.abspath(os.path.join(script_dir, '..', 'UI', 'dist'))
 
-if not USE_VITE_DEV_SERVER and not os.path.exists(UI_BUILD_DIR):
-    print(f"CRITICAL ERROR: UI Build Directory not found at {UI_BUILD_DIR}")
-    sys.exit(1)
-
-app = flask.Flask(__name__, static_folder=UI_BUILD_DIR, static_url_path='/')
+# The UI build itself is checked in main().
+app = create_app()
 
 if USE_VITE_DEV_SERVER:
+    from flask_cors import CORS
     CORS(app, resources={r"/api/*": {"origins": VITE_DEV_SERVER_URL.strip('/')}})
 
-
-app.register_blueprint(units_bp)
-app.register_blueprint(items_bp)
-app.register_blueprint(log_bp)
-app.register_blueprint(backup_bp)
-app.register_blueprint(category_bp)
-app.register_blueprint(destination_bp)
-app.register_blueprint(provider_bp)
-
-# --- Database Connection Management ---
-@app.teardown_appcontext
-def close_db(e=None):
-    db = g.pop('db', None)
-    if db is not None:
-        db.close()
-
 # --- SPA Catch-all Route ---
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve_spa(path):
-    potential_file_path = os.path.join(app.static_folder, path)
-    if path != "" and os.path.exists(potential_file_path) and os.path.isfile(potential_file_path):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
+# UI_BUILD_DIR is indexed once here; see app/static_assets.py for the caching rules.
+static_assets.init_app(app, UI_BUILD_DIR)
 
 # --- Application Runner ---
 def run_flask():
-    app.run(host='127.0.0.1', port=5070, use_reloader=False, debug=False)
+    app.run(host='127.0.0.1', port=FLASK_PORT, use_reloader=False, debug=False)
+
+def warm_up():
+    """
+    Brings the schema up to date and fills the caches. Runs in the background
+    while the window opens; requests that arrive first wait for the schema in
+    initialize_database() and fall back to the database for barcode lookups.
+    """
+    initialize_database()
+    print(f"Loaded {barcode_index.load()} barcode(s) into the scan index.")
+    # One-off replay of the movement history; later starts return immediately.
+    valuation_model.backfill()
+    barcode_render.warm_up()
+
+def start_backend():
+    """Starts the warm-up and Flask threads without waiting for either."""
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    flask_thread = threading.Thread(target=run_flask, daemon=True)
+    flask_thread.start()
+    return flask_thread
 
 def on_closing():
     print("Window is closing, creating automatic backup...")
@@ -83,8 +71,7 @@ def on_closing():
         print(f"Error creating automatic backup: {message}")
 
 def start_webview():
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
+    import webview
 
     target_url = VITE_DEV_SERVER_URL if USE_VITE_DEV_SERVER else PRODUCTION_FLASK_URL
     print(f"PyWebview will load URL: {target_url}")
@@ -133,9 +120,7 @@ def main():
         else:
             print(f"Found UI build files at '{UI_BUILD_DIR}'.")
 
-    print("Initializing database before starting Flask...")
-    initialize_database()
-
+    start_backend()
     start_webview()
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from flask import g, request
+
+# Observations are appended to a deque (atomic under the GIL, so request threads
+# never wait on a lock) and folded into the totals when the metrics are scraped
+# or when too many are pending.
+FOLD_THRESHOLD = 10_000
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._pending = deque()
+        self._fold_lock = threading.Lock()
+        self._values = {}
+        if not self.label_names and self.metric_type in ('counter', 'gauge'):
+            # Unlabelled series are exported as 0 before their first update.
+            self._values[()] = 0
+
+    def _observe(self, label_values: tuple, value):
+        self._pending.append((label_values, value))
+        if len(self._pending) > FOLD_THRESHOLD and self._fold_lock.acquire(blocking=False):
+            try:
+                self._fold()
+            finally:
+                self._fold_lock.release()
+
+    def _fold(self):
+        while True:
+            try:
+                label_values, value = self._pending.popleft()
+            except IndexError:
+                return
+            self._apply(label_values, value)
+
+    def _apply(self, label_values, value):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        with self._fold_lock:
+            self._fold()
+            samples = self._samples()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(f"{name}{labels} {_format_number(value)}" for name, labels, value in samples)
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    metric_type = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        self._observe(label_values, amount)
+
+    def _apply(self, label_values, value):
+        self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def _samples(self):
+        return [(self.name, _format_labels(self.label_names, labels), value)
+                for labels, value in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    """Value that can go up and down, such as requests currently in flight."""
+    metric_type = 'gauge'
+
+    def inc(self, *label_values, amount=1):
+        self._observe(label_values, amount)
+
+    def dec(self, *label_values, amount=1):
+        self._observe(label_values, -amount)
+
+    def _apply(self, label_values, value):
+        self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def _samples(self):
+        return [(self.name, _format_labels(self.label_names, labels), value)
+                for labels, value in sorted(self._values.items())]
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in cumulative buckets."""
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values):
+        self._observe(label_values, value)
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def _apply(self, label_values, value):
+        state = self._values.get(label_values)
+        if state is None:
+            state = self._values[label_values] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+        state['buckets'][bisect_left(self.buckets, value)] += 1
+        state['sum'] += value
+        state['count'] += 1
+
+    def _samples(self):
+        samples = []
+        for labels, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), state['buckets']):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                samples.append((f"{self.name}_bucket", _format_labels(self.label_names, labels, ('le', le)), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.label_names, labels), state['sum']))
+            samples.append((f"{self.name}_count", _format_labels(self.label_names, labels), state['count']))
+        return samples
+
+REQUEST_LATENCY = Histogram('warehouse_http_request_duration_seconds', 'HTTP request latency by route.', ('method', 'route'))
+REQUESTS_TOTAL = Counter('warehouse_http_requests_total', 'HTTP responses by route and status code.', ('method', 'route', 'status'))
+REQUESTS_IN_FLIGHT = Gauge('warehouse_http_requests_in_flight', 'HTTP requests currently being served.')
+DB_CONNECTIONS_OPENED = Counter('warehouse_db_connections_opened_total', 'SQLite connections opened.')
+DB_CONNECTIONS_OPEN = Gauge('warehouse_db_connections_open', 'SQLite connections currently open.')
+BARCODE_RENDER_SECONDS = Histogram('warehouse_barcode_render_seconds', 'Time spent rendering barcode images.', ('endpoint',))
+BACKUP_SECONDS = Histogram('warehouse_backup_duration_seconds', 'Time spent copying the database for a backup.',
+                           buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+SCAN_SOCKET_MESSAGE_SECONDS = Histogram('warehouse_scan_socket_message_duration_seconds',
+                                        'Time spent answering scan socket requests by op.', ('op',))
+SCAN_SOCKETS_OPEN = Gauge('warehouse_scan_sockets_open', 'Scan station sockets currently connected.')
+JOB_SECONDS = Histogram('warehouse_job_duration_seconds', 'Time spent running background jobs by kind.', ('kind',),
+                        buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0))
+JOBS_TOTAL = Counter('warehouse_jobs_total', 'Background jobs by kind and outcome (ready, failed or reused).',
+                     ('kind', 'outcome'))
+
+REGISTRY = [
+    REQUEST_LATENCY, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT,
+    DB_CONNECTIONS_OPENED, DB_CONNECTIONS_OPEN,
+    BARCODE_RENDER_SECONDS, BACKUP_SECONDS,
+    SCAN_SOCKET_MESSAGE_SECONDS, SCAN_SOCKETS_OPEN,
+    JOB_SECONDS, JOBS_TOTAL,
+]
+
+def render_metrics() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def init_app(app):
+    """Registers the request hooks that feed the HTTP metrics."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            # Use the URL rule rather than the raw path so item IDs and barcodes
+            # don't create a new time series per value.
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, route)
+            REQUESTS_TOTAL.inc(request.method, route, response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc=None):
+        if g.pop('metrics_start', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
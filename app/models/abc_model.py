@@ -0,0 +1,320 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+from .db_utils import get_db
+from . import log_archive_model
+
+# ABC (Pareto) classification of items by withdrawal value.
+#
+# Withdrawn quantity and value per item are stored per scope (period and
+# destination) in abc_item_totals. refresh_scope builds a scope from the live
+# and archived logs of its period, summed a slice of days per read into a temp
+# table without the write lock; after that only the logs newer than its
+# through_log_id are folded in, and the scope is re-ranked with window
+# functions. Refreshes run as background jobs (see analytics_routes), so a
+# read serves the last finished scope. Classes follow from the stored
+# cumulative values at read time. A main category filter ranks that
+# category's items on the fly, since shares are then relative to the category.
+
+DEFAULT_PERIOD_DAYS = 365
+DEFAULT_A_SHARE = 0.8
+DEFAULT_B_SHARE = 0.95
+# Least recently refreshed scopes beyond this many are dropped.
+MAX_SCOPES = 8
+# Days of removals summed per read while building a scope. Each read is its
+# own short statement, so writers are only held off for one slice at a time.
+BUILD_DAYS_PER_READ = 30
+
+# A removal is valued at the log's cost when one was recorded, otherwise at the
+# item's cost when the log is folded in; removals without either count as 0.
+_TOTALS_INSERT = """
+    INSERT INTO abc_item_totals (scope_id, item_id, quantity, value)
+    SELECT ?, ml.item_id, SUM(ml.quantity_changed), SUM(ml.quantity_changed * COALESCE(ml.cost_per_item, i.cost, 0))
+    FROM movement_logs ml
+    JOIN items i ON i.id = ml.item_id
+    WHERE {conditions}
+    GROUP BY ml.item_id
+"""
+
+# Code of 'Removal' in movement_logs.action_type_id, the indexed column.
+_REMOVAL_ID = "(SELECT id FROM log_action_types WHERE name = 'Removal')"
+
+# Same sums as _TOTALS_INSERT, accumulated per item while a scope is built.
+_BUILD_INSERT = """
+    INSERT INTO temp.abc_build_totals (item_id, quantity, value)
+    SELECT ml.item_id, SUM(ml.quantity_changed), SUM(ml.quantity_changed * COALESCE(ml.cost_per_item, i.cost, 0))
+    FROM {source} ml
+    JOIN items i ON i.id = ml.item_id
+    WHERE {conditions}
+    GROUP BY ml.item_id
+    ON CONFLICT(item_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        value = value + excluded.value
+"""
+_FIND_SCOPE = "SELECT id, through_log_id, refreshed_at FROM abc_scopes WHERE date_from = ? AND date_to = ? AND destination_id = ?"
+
+_RANK_WINDOWS = """
+    ROW_NUMBER() OVER by_value AS rank,
+    SUM(value) OVER (by_value ROWS UNBOUNDED PRECEDING) AS cumulative_value
+"""
+_BY_VALUE = "WINDOW by_value AS (ORDER BY value DESC, quantity DESC, item_id)"
+
+def resolve_period(date_from: str | None = None, date_to: str | None = None) -> tuple[str, str]:
+    """The (date_from, date_to) a classification covers: the last DEFAULT_PERIOD_DAYS up to today by default."""
+    date_to = date_to or date.today().isoformat()
+    date_from = date_from or (date.fromisoformat(date_to) - timedelta(days=DEFAULT_PERIOD_DAYS - 1)).isoformat()
+    return date_from, date_to
+
+def _latest_log_id(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+    return cursor.fetchone()[0]
+
+def _sum_removals(db, date_from, end, destination_id, through_log_id, archive_schemas, within_transaction):
+    """
+    Sums the period's removals per item into temp.abc_build_totals: live logs
+    up to through_log_id plus the attached archives, BUILD_DAYS_PER_READ days
+    per read. Outside a transaction each read is committed (to temp only)
+    before the next, so no lock on the live database is held between reads.
+    """
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.abc_build_totals")
+    cursor.execute("CREATE TEMP TABLE abc_build_totals (item_id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL, value REAL NOT NULL)")
+    destination_filter = " AND ml.destination_id = ?" if destination_id else ""
+    destination_params = [destination_id] if destination_id else []
+    live_sql = _BUILD_INSERT.format(
+        source="movement_logs",
+        conditions=f"ml.action_type_id = {_REMOVAL_ID} AND ml.timestamp >= ? AND ml.timestamp < ? AND ml.id <= ?{destination_filter}")
+    archive_sqls = [_BUILD_INSERT.format(
+        source=f"{schema}.movement_logs",
+        conditions=f"ml.action_type = 'Removal' AND ml.timestamp >= ? AND ml.timestamp < ?{destination_filter}")
+        for schema in archive_schemas]
+
+    slice_start = date.fromisoformat(date_from)
+    period_end = date.fromisoformat(end)
+    while slice_start < period_end:
+        slice_end = min(slice_start + timedelta(days=BUILD_DAYS_PER_READ), period_end)
+        bounds = [slice_start.isoformat(), slice_end.isoformat()]
+        cursor.execute(live_sql, bounds + [through_log_id] + destination_params)
+        for archive_sql in archive_sqls:
+            cursor.execute(archive_sql, bounds + destination_params)
+        if not within_transaction:
+            db.commit()
+        slice_start = slice_end
+
+def refresh_scope(date_from: str, date_to: str, destination_id: int | None = None) -> dict:
+    """
+    Creates or catches up the scope for the period and destination and returns its row.
+
+    A new scope is summed without the write lock up to the newest log at the
+    start (the watermark); the write lock is then held only to store it, fold
+    in the logs written since and re-rank. Archived logs of the period count
+    too. If logs were archived while it was summed, the build starts over.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    destination_id = destination_id or 0
+    scope_key = (date_from, date_to, destination_id)
+    end = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat()
+    destination_filter = " AND ml.destination_id = ?" if destination_id else ""
+    destination_params = [destination_id] if destination_id else []
+
+    latest_log_id = _latest_log_id(cursor)
+    cursor.execute(_FIND_SCOPE, scope_key)
+    scope = cursor.fetchone()
+    if scope and scope['through_log_id'] == latest_log_id:
+        return dict(scope)
+
+    archive_schemas = []
+    catalog = None
+    watermark = None
+    try:
+        if scope is None or scope['through_log_id'] > latest_log_id:
+            # ATTACH is not allowed inside a transaction, so archives are attached first.
+            catalog = log_archive_model.archive_years_for_range(date_from, date_to, db=db)
+            archive_schemas = log_archive_model.attach_archives(db, catalog)
+            watermark = latest_log_id
+            _sum_removals(db, date_from, end, destination_id, watermark, archive_schemas, within_transaction=False)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        # Re-read under the write lock: another refresh may have stored the scope meanwhile.
+        latest_log_id = _latest_log_id(cursor)
+        cursor.execute(_FIND_SCOPE, scope_key)
+        scope = cursor.fetchone()
+
+        if scope is None or scope['through_log_id'] > latest_log_id:
+            # New scope, or logs it had counted are gone (e.g. a restored backup): store the new sums.
+            if watermark is None or log_archive_model.archive_years_for_range(date_from, date_to, db=db) != catalog:
+                db.rollback()
+                log_archive_model.detach_archives(db, archive_schemas)
+                archive_schemas = []
+                return refresh_scope(date_from, date_to, destination_id)
+            if scope is not None:
+                cursor.execute("DELETE FROM abc_scopes WHERE id = ?", (scope['id'],))
+            cursor.execute("INSERT INTO abc_scopes (date_from, date_to, destination_id) VALUES (?, ?, ?)", scope_key)
+            scope_id = cursor.lastrowid
+            cursor.execute("INSERT INTO abc_item_totals (scope_id, item_id, quantity, value) SELECT ?, item_id, quantity, value FROM temp.abc_build_totals",
+                           (scope_id,))
+            from_log_id = watermark
+            totals_changed = True
+        elif scope['through_log_id'] < latest_log_id:
+            scope_id = scope['id']
+            from_log_id = scope['through_log_id']
+            totals_changed = False
+        else:
+            db.rollback()
+            return dict(scope)
+
+        if from_log_id < latest_log_id:
+            # The unary + keeps SQLite on the rowid range: the new logs are few,
+            # while the period can match most of the action_type/timestamp index.
+            conditions = f"ml.id > ? AND ml.id <= ? AND +ml.action_type_id = {_REMOVAL_ID} AND +ml.timestamp >= ? AND +ml.timestamp < ?{destination_filter}"
+            cursor.execute(_TOTALS_INSERT.format(conditions=conditions) + """
+                ON CONFLICT(scope_id, item_id) DO UPDATE SET
+                    quantity = quantity + excluded.quantity,
+                    value = value + excluded.value
+            """, [scope_id, from_log_id, latest_log_id, date_from, end] + destination_params)
+            # Only removals in the scope move the ranking; other new logs just advance the watermark.
+            totals_changed = totals_changed or cursor.rowcount > 0
+
+        if totals_changed:
+            cursor.execute(f"""
+                UPDATE abc_item_totals SET rank = ranked.rank, cumulative_value = ranked.cumulative_value
+                FROM (SELECT item_id, {_RANK_WINDOWS} FROM abc_item_totals WHERE scope_id = ? {_BY_VALUE}) AS ranked
+                WHERE abc_item_totals.scope_id = ? AND abc_item_totals.item_id = ranked.item_id
+            """, (scope_id, scope_id))
+            cursor.execute("UPDATE abc_scopes SET total_value = (SELECT COALESCE(SUM(value), 0) FROM abc_item_totals WHERE scope_id = ?) WHERE id = ?",
+                           (scope_id, scope_id))
+        cursor.execute("UPDATE abc_scopes SET through_log_id = ?, refreshed_at = ? WHERE id = ?",
+                       (latest_log_id, datetime.now(), scope_id))
+        cursor.execute("DELETE FROM abc_scopes WHERE id NOT IN (SELECT id FROM abc_scopes ORDER BY refreshed_at DESC LIMIT ?)",
+                       (MAX_SCOPES,))
+        db.commit()
+    except sqlite3.Error as e:
+        if db.in_transaction:
+            db.rollback()
+        print(f"Database error refreshing ABC scope {scope_key}: {e}")
+        raise e
+    finally:
+        try:
+            cursor.execute("DROP TABLE IF EXISTS temp.abc_build_totals")
+        except sqlite3.Error:
+            pass
+        log_archive_model.detach_archives(db, archive_schemas)
+
+    cursor.execute(_FIND_SCOPE, scope_key)
+    return dict(cursor.fetchone())
+
+# ranked yields item_id, quantity, value, rank, cumulative_value and total_value.
+_STORED_RANKING = """
+    ranked AS (
+        SELECT t.item_id, t.quantity, t.value, t.rank, t.cumulative_value, s.total_value
+        FROM abc_item_totals t
+        JOIN abc_scopes s ON s.id = t.scope_id
+        WHERE t.scope_id = ?
+    )
+"""
+_CATEGORY_RANKING = f"""
+    totals AS (
+        SELECT t.item_id, t.quantity, t.value
+        FROM abc_item_totals t
+        JOIN items i ON i.id = t.item_id
+        LEFT JOIN categories c ON c.id = i.sub_category_id
+        WHERE t.scope_id = ? AND COALESCE(c.parent_id, c.id) = ?
+    ), ranked AS (
+        SELECT totals.*, {_RANK_WINDOWS}, SUM(value) OVER () AS total_value
+        FROM totals
+        {_BY_VALUE}
+    )
+"""
+# An item belongs to the class in which its value starts, so the item that
+# crosses a threshold still counts towards the higher class.
+_CLASSIFIED = """
+    classified AS (
+        SELECT ranked.*,
+               CASE WHEN total_value <= 0 THEN 'C'
+                    WHEN cumulative_value - value < ? * total_value THEN 'A'
+                    WHEN cumulative_value - value < ? * total_value THEN 'B'
+                    ELSE 'C' END AS abc_class
+        FROM ranked
+    )
+"""
+
+def get_abc_classification(date_from: str | None = None, date_to: str | None = None,
+                           main_category_id: int | None = None, destination_id: int | None = None,
+                           a_share: float = DEFAULT_A_SHARE, b_share: float = DEFAULT_B_SHARE,
+                           abc_class: str | None = None, limit: int | None = None, offset: int = 0) -> dict:
+    """
+    Ranks items by withdrawal value over [date_from, date_to] (dates, inclusive;
+    the last DEFAULT_PERIOD_DAYS by default) and classifies them by cumulative
+    share: A up to a_share of the value, B up to b_share, C for the rest.
+
+    destination_id limits the withdrawals counted; main_category_id limits the
+    items ranked, so shares are relative to that category. Items without
+    withdrawals in the period are not listed. abc_class, limit and offset
+    filter and page the ranked list; the per-class summary covers all items.
+
+    Reads the stored scope as last refreshed (see refresh_scope) and never
+    writes: returns None when the scope has not been built yet, and stale is
+    True when logs were written after its through_log_id.
+    """
+    date_from, date_to = resolve_period(date_from, date_to)
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(_FIND_SCOPE, (date_from, date_to, destination_id or 0))
+    scope = cursor.fetchone()
+    if scope is None:
+        return None
+    latest_log_id = _latest_log_id(cursor)
+
+    if main_category_id:
+        cte = f"WITH {_CATEGORY_RANKING}, {_CLASSIFIED}"
+        params = [scope['id'], main_category_id, a_share, b_share]
+    else:
+        cte = f"WITH {_STORED_RANKING}, {_CLASSIFIED}"
+        params = [scope['id'], a_share, b_share]
+
+    cursor.execute(f"""
+        {cte}
+        SELECT abc_class, COUNT(*) AS item_count, SUM(quantity) AS quantity, ROUND(SUM(value), 2) AS value,
+               ROUND(SUM(value) / NULLIF(MAX(total_value), 0), 4) AS share
+        FROM classified
+        GROUP BY abc_class
+    """, params)
+    classes = {name: {"item_count": 0, "quantity": 0, "value": 0.0, "share": 0.0} for name in ('A', 'B', 'C')}
+    for row in cursor.fetchall():
+        classes[row['abc_class']] = {key: row[key] for key in ('item_count', 'quantity', 'value', 'share')}
+
+    class_filter = "WHERE k.abc_class = ?" if abc_class else ""
+    cursor.execute(f"""
+        {cte}
+        SELECT k.rank, k.item_id, i.name, c.name AS sub_category_name, k.quantity, ROUND(k.value, 2) AS value,
+               ROUND(k.value / NULLIF(k.total_value, 0), 4) AS share,
+               ROUND(k.cumulative_value / NULLIF(k.total_value, 0), 4) AS cumulative_share,
+               k.abc_class
+        FROM classified k
+        JOIN items i ON i.id = k.item_id
+        LEFT JOIN categories c ON c.id = i.sub_category_id
+        {class_filter}
+        ORDER BY k.rank
+        LIMIT ? OFFSET ?
+    """, params + ([abc_class] if abc_class else []) + [limit if limit is not None else -1, offset])
+    items = [dict(row) for row in cursor.fetchall()]
+    if abc_class:
+        total_count = classes[abc_class]["item_count"]
+    else:
+        total_count = sum(entry["item_count"] for entry in classes.values())
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "main_category_id": main_category_id,
+        "destination_id": destination_id,
+        "a_share": a_share,
+        "b_share": b_share,
+        "refreshed_at": scope['refreshed_at'],
+        "through_log_id": scope['through_log_id'],
+        "stale": scope['through_log_id'] != latest_log_id,
+        "total_count": total_count,
+        "total_value": round(sum(entry["value"] or 0 for entry in classes.values()), 2),
+        "classes": classes,
+        "items": items,
+    }
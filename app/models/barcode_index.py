@@ -0,0 +1,92 @@
+import threading
+from .db_utils import get_db_connection
+
+# Process-wide barcode -> item record map for the scanning path.
+# Records are stored as plain tuples (one shared column list) to keep the
+# footprint small on large catalogues, and rebuilt into the same dict shape
+# get_item_by_barcode returns. Only active items with a barcode are indexed.
+#
+# Lookups read the dict without locking; loads and write-path refreshes hold
+# _lock so a reload cannot overwrite a newer refresh.
+
+_ITEM_QUERY = """
+    SELECT i.id, i.name, i.unit_id, i.sub_category_id, i.provider_id, i.current_quantity, i.cost, i.status,
+           i.barcode, u.name as unit_name, c.name as sub_category_name
+    FROM items i
+    JOIN units u ON i.unit_id = u.id
+    LEFT JOIN categories c ON i.sub_category_id = c.id
+"""
+
+_lock = threading.Lock()
+_index = None
+_barcode_by_item_id = {}
+_columns = ()
+
+def load(db=None):
+    """(Re)builds the index from the database. Uses its own connection unless one is given."""
+    global _index, _barcode_by_item_id, _columns
+    with _lock:
+        conn = db or get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_ITEM_QUERY + " WHERE i.status = 'active' AND i.barcode IS NOT NULL")
+            columns = tuple(description[0] for description in cursor.description)
+            barcode_position = columns.index('barcode')
+            id_position = columns.index('id')
+            index = {}
+            barcode_by_item_id = {}
+            for row in cursor:
+                record = tuple(row)
+                index[record[barcode_position]] = record
+                barcode_by_item_id[record[id_position]] = record[barcode_position]
+        finally:
+            if db is None:
+                conn.close()
+        _columns = columns
+        _barcode_by_item_id = barcode_by_item_id
+        _index = index
+        return len(index)
+
+def invalidate():
+    """Drops the index; the next lookup reloads it (e.g. after a unit or category rename)."""
+    global _index
+    with _lock:
+        _index = None
+
+def is_loaded() -> bool:
+    return _index is not None
+
+def lookup(barcode: str) -> dict | None:
+    """Returns the active item with this barcode from memory, or None if it isn't indexed."""
+    index = _index
+    if index is None:
+        load()
+        index = _index
+    record = index.get(barcode) if index is not None else None
+    return dict(zip(_columns, record)) if record is not None else None
+
+def refresh_item(item: dict | None):
+    """
+    Updates the entry for an item after a committed write.
+    `item` must have the get_item_by_id / get_item_by_barcode shape.
+    """
+    if not item or 'id' not in item:
+        return
+    with _lock:
+        if _index is None:
+            return
+        old_barcode = _barcode_by_item_id.pop(item['id'], None)
+        if old_barcode is not None:
+            _index.pop(old_barcode, None)
+        if item.get('status') == 'active' and item.get('barcode'):
+            if tuple(item.keys()) != _columns:
+                # Shape changed (e.g. a new column after a migration); rebuild instead of guessing.
+                _reset_locked()
+                return
+            _index[item['barcode']] = tuple(item.values())
+            _barcode_by_item_id[item['id']] = item['barcode']
+
+def _reset_locked():
+    global _index, _barcode_by_item_id
+    _index = None
+    _barcode_by_item_id = {}
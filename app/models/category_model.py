@@ -1,5 +1,6 @@
 import sqlite3
 from .db_utils import get_db
+from . import barcode_index, count_cache
 
 def add_category(name: str, parent_id: int | None = None) -> dict | None:
     """Adds a new category to the database.
@@ -33,17 +34,18 @@ def get_categories(
     parent_id: int | None = None, 
     main_categories_only: bool = False,
     page: int = 1,
-    page_size: int = 10
+    page_size: int = 10,
+    include_total: bool = True
 ) -> dict:
     """
     Retrieves categories from the database based on criteria, with pagination.
+    total_count is None when include_total is False.
     """
     db = get_db()
     cursor = db.cursor()
     
     base_query = "FROM categories"
-    count_query = "SELECT COUNT(*) "
-    select_query = "SELECT id, name, parent_id "
+    select_query = "SELECT id, name, parent_id"
     
     params = []
     where_clauses = []
@@ -57,16 +59,15 @@ def get_categories(
     if where_clauses:
         base_query += " WHERE " + " AND ".join(where_clauses)
     
-    cursor.execute(count_query + base_query, params)
-    total_count = cursor.fetchone()[0]
-    
-    select_query += base_query + " ORDER BY name ASC LIMIT ? OFFSET ?"
-    params.extend([page_size, (page - 1) * page_size])
-    
-    cursor.execute(select_query, params)
+    # Sorting by name visits every matching row anyway, so COUNT(*) OVER() is free.
+    rows, total_count = count_cache.paged_query(
+        cursor, select_query, base_query, "ORDER BY name ASC", params,
+        page_size, (page - 1) * page_size, tables=('categories',),
+        include_total=include_total, window_total=True,
+    )
     categories = [
         {"id": row["id"], "name": row["name"], "parent_id": row["parent_id"]}
-        for row in cursor.fetchall()
+        for row in rows
     ]
     
     return {"categories": categories, "total_count": total_count}
@@ -88,6 +89,8 @@ def update_category(category_id: int, name: str) -> dict | None:
     try:
         cursor.execute("UPDATE categories SET name = ? WHERE id = ?", (name, category_id))
         db.commit()
+        # Indexed barcode records carry the unit/category name.
+        barcode_index.invalidate()
         if cursor.rowcount > 0:
             return {"id": category_id, "name": name}
         return None
@@ -0,0 +1,120 @@
+import re
+import threading
+from collections import OrderedDict
+
+# Cached COUNT(*) results for the paginated list endpoints.
+#
+# Every table has an in-process version counter. TracingConnection notes the
+# tables a transaction writes to and bumps their versions when it commits, so a
+# cached total is reused only while none of the tables it was counted over has
+# changed since.
+
+COUNT_CACHE_SIZE = 256
+
+# Writes to the key table can change rows of these tables as well
+# (ON DELETE SET NULL / CASCADE in the schema, or a view over the key table:
+# movement_logs decodes movement_log_entries).
+_DEPENDENT_TABLES = {
+    'categories': ('items',),
+    'providers': ('items', 'movement_logs'),
+    'items': ('movement_log_checkpoints',),
+    'movement_log_entries': ('movement_logs',),
+}
+
+_WRITE_TARGET_RE = re.compile(
+    r'\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(?:\w+\.)?["`\[]?(\w+)',
+    re.IGNORECASE,
+)
+
+_lock = threading.Lock()
+_table_versions = {}
+_counts = OrderedDict()
+
+def written_tables(sql: str) -> set[str]:
+    """Tables an INSERT/UPDATE/DELETE statement writes to (empty for reads)."""
+    head = sql.lstrip()[:6].upper()
+    if head.startswith('SELECT') or head.startswith('PRAGMA'):
+        return set()
+    return {match.lower() for match in _WRITE_TARGET_RE.findall(sql)}
+
+def bump_tables(tables):
+    """Marks tables as changed, invalidating every cached count over them."""
+    with _lock:
+        for table in tables:
+            for name in (table,) + _DEPENDENT_TABLES.get(table, ()):
+                _table_versions[name] = _table_versions.get(name, 0) + 1
+
+def clear():
+    """Drops every cached count (e.g. after the database file was replaced)."""
+    with _lock:
+        _counts.clear()
+
+def table_versions(tables) -> tuple:
+    """Current version counters of tables, for callers caching other derived results."""
+    with _lock:
+        return tuple(_table_versions.get(table, 0) for table in tables)
+
+def _get(key, versions):
+    with _lock:
+        entry = _counts.get(key)
+        if entry is None or entry[0] != versions:
+            return None
+        _counts.move_to_end(key)
+        return entry[1]
+
+def _put(key, versions, total):
+    with _lock:
+        _counts[key] = (versions, total)
+        _counts.move_to_end(key)
+        while len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+
+def paged_query(cursor, select_sql: str, from_sql: str, order_sql: str, params, limit: int, offset: int,
+                tables, include_total: bool = True, window_total: bool = False, count_from_sql: str | None = None):
+    """
+    Runs a LIMIT/OFFSET page query and returns (rows, total).
+
+    rows are dicts. total is None when include_total is False; otherwise it
+    comes from the cache, or is computed and cached. from_sql is the FROM/WHERE
+    part of the page query and tables lists every table the count depends on.
+    count_from_sql replaces from_sql in the COUNT(*) query when the page query
+    has joins that cannot change the row count.
+
+    With window_total the total is taken from COUNT(*) OVER() in the page query
+    itself instead of a separate COUNT(*). That saves a query when the filter is
+    selective, but it makes SQLite visit every matching row, so callers should
+    only enable it when the matching set is small or has to be sorted anyway.
+    """
+    params = list(params)
+    page_params = params + [limit, offset]
+    if not include_total:
+        cursor.execute(f"{select_sql} {from_sql} {order_sql} LIMIT ? OFFSET ?", page_params)
+        return [dict(row) for row in cursor.fetchall()], None
+
+    count_from_sql = count_from_sql or from_sql
+    key = (tuple(tables), count_from_sql, tuple(params))
+    # Read the versions before counting: a write that commits meanwhile makes
+    # this entry stale rather than letting an old count look current.
+    versions = table_versions(tables)
+    total = _get(key, versions)
+    cached = total is not None
+    rows = None
+
+    if total is None and window_total:
+        cursor.execute(f"{select_sql}, COUNT(*) OVER () AS _total_count {from_sql} {order_sql} LIMIT ? OFFSET ?", page_params)
+        rows = [dict(row) for row in cursor.fetchall()]
+        for row in rows:
+            total = row.pop('_total_count')
+        if not rows and offset == 0:
+            total = 0
+
+    if total is None:
+        cursor.execute(f"SELECT COUNT(*) {count_from_sql}", params)
+        total = cursor.fetchone()[0]
+    if not cached:
+        _put(key, versions, total)
+
+    if rows is None:
+        cursor.execute(f"{select_sql} {from_sql} {order_sql} LIMIT ? OFFSET ?", page_params)
+        rows = [dict(row) for row in cursor.fetchall()]
+    return rows, total
@@ -2,9 +2,13 @@ import sqlite3
 import os
 import shutil
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 from flask import g
+from .text_utils import normalize_name
+from .sql_tracing import TracingConnection
+from .. import metrics
 
 # Path to the database file
 # This path needs to be relative and work correctly whether the script is run
@@ -18,23 +22,81 @@ if getattr(sys, 'frozen', False):
     bundle_root = sys._MEIPASS
     DATABASE_NAME = os.path.join(bundle_root, 'database', 'warehouse.db')
     SCHEMA_PATH = os.path.join(bundle_root, 'database', 'schema.sql')
+    MIGRATIONS_DIR = os.path.join(bundle_root, 'database', 'migrations')
 else:
     
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
     DATABASE_NAME = os.path.abspath(os.path.join(script_dir, '..', '..', 'database', 'warehouse.db'))
     SCHEMA_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'database', 'schema.sql'))
+    MIGRATIONS_DIR = os.path.abspath(os.path.join(script_dir, '..', '..', 'database', 'migrations'))
+
+# schema.sql is the baseline (version 1). Every later change ships as a numbered
+# file in MIGRATIONS_DIR (e.g. 0002_items_normalized_name.sql) and is applied once;
+# the applied version is stored in the database header via PRAGMA user_version.
+BASELINE_SCHEMA_VERSION = 1
 
 DB_INITIALIZED = False
+# app.main initializes the database in a background thread while the window
+# opens; early requests wait on this lock instead of migrating concurrently.
+_init_lock = threading.Lock()
+
+def get_migrations():
+    """
+    Lists the migration files as (version, path) tuples sorted by version.
+    File names must start with the version number followed by an underscore.
+    """
+    migrations = []
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return migrations
+    for filename in os.listdir(MIGRATIONS_DIR):
+        prefix, _, _ = filename.partition('_')
+        if filename.endswith('.sql') and prefix.isdigit():
+            migrations.append((int(prefix), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+def _apply_script(conn, script: str, version: int):
+    """Runs a schema script and records its version inside one transaction."""
+    try:
+        conn.executescript(f"BEGIN;\n{script}\n;PRAGMA user_version = {int(version)};\nCOMMIT;")
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+def _check_duplicate_item_names(conn):
+    """
+    Stops migration 0012 (unique normalized item names) while items share a
+    normalized name, listing them so they can be renamed first.
+    """
+    duplicates = conn.execute("""
+        SELECT group_concat(id || ': ' || name, ', ') FROM items
+        GROUP BY normalized_name HAVING COUNT(*) > 1
+    """).fetchall()
+    if duplicates:
+        raise sqlite3.IntegrityError(
+            "Items with duplicate names must be renamed before upgrading: "
+            + "; ".join(f"[{row[0]}]" for row in duplicates))
+
+# Checks run against the database before the migration of that version is
+# applied; they raise to stop the upgrade with a clear message.
+_MIGRATION_CHECKS = {12: _check_duplicate_item_names}
 
 def initialize_database():
-    """Initializes the database by executing the schema script."""
-    global DB_INITIALIZED
+    """
+    Brings the database schema up to date.
+    A database already at the latest version is left untouched, so normal
+    launches only read PRAGMA user_version instead of re-running all DDL.
+    """
     if DB_INITIALIZED:
         return
+    with _init_lock:
+        if not DB_INITIALIZED:
+            _initialize_database()
+
+def _initialize_database():
+    global DB_INITIALIZED
 
-    print(f"Attempting to initialize database from: {DATABASE_NAME} using schema: {SCHEMA_PATH}")
-    
     # Ensure the directory for the database exists
     db_dir = os.path.dirname(DATABASE_NAME)
     if not os.path.exists(db_dir):
@@ -45,28 +107,47 @@ def initialize_database():
             print(f"Error creating database directory {db_dir}: {e}")
             return
 
-    if not os.path.exists(SCHEMA_PATH):
-        print(f"Error: Schema file not found at {SCHEMA_PATH}")
-        return
+    migrations = get_migrations()
+    latest_version = max([BASELINE_SCHEMA_VERSION] + [version for version, _ in migrations])
 
     conn = None
     try:
         conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
-            schema_script = f.read()
-        cursor.executescript(schema_script)
-        conn.commit()
+        current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if current_version >= latest_version:
+            DB_INITIALIZED = True
+            return
+
+        print(f"Upgrading database '{DATABASE_NAME}' from schema version {current_version} to {latest_version}.")
+        # Migrations may call normalize_name() to backfill derived columns.
+        conn.create_function('normalize_name', 1, normalize_name, deterministic=True)
+
+        if current_version < BASELINE_SCHEMA_VERSION:
+            if not os.path.exists(SCHEMA_PATH):
+                print(f"Error: Schema file not found at {SCHEMA_PATH}")
+                return
+            # The baseline only uses IF NOT EXISTS, so it is also safe on databases
+            # created before schema versioning was introduced.
+            with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+                _apply_script(conn, f.read(), BASELINE_SCHEMA_VERSION)
+            current_version = BASELINE_SCHEMA_VERSION
+
+        for version, path in migrations:
+            if version <= current_version:
+                continue
+            if version in _MIGRATION_CHECKS:
+                _MIGRATION_CHECKS[version](conn)
+            with open(path, 'r', encoding='utf-8') as f:
+                _apply_script(conn, f.read(), version)
+            current_version = version
+            print(f"Applied migration {os.path.basename(path)}.")
+
         DB_INITIALIZED = True
-        print(f"Database '{DATABASE_NAME}' initialized successfully using '{SCHEMA_PATH}'.")
+        print(f"Database '{DATABASE_NAME}' is at schema version {current_version}.")
     except sqlite3.Error as e:
         print(f"Database initialization error: {e}")
-        if conn:
-            conn.rollback()
     except Exception as e:
         print(f"An unexpected error occurred during database initialization: {e}")
-        if conn:
-            conn.rollback()
     finally:
         if conn:
             conn.close()
@@ -90,7 +171,8 @@ def get_db_connection():
              print(f"Critical Error: Database file still not found at {DATABASE_NAME} after re-initialization attempt.")
              return None
 
-    conn = sqlite3.connect(DATABASE_NAME)
+    # uri=True lets log_archive_model attach archive files read-only (file:...?mode=ro).
+    conn = sqlite3.connect(DATABASE_NAME, factory=TracingConnection, uri=True)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
@@ -114,7 +196,8 @@ def backup_database(target_backup_path):
         if target_dir and not os.path.exists(target_dir):
             os.makedirs(target_dir, exist_ok=True)
             
-        shutil.copy2(DATABASE_NAME, target_backup_path)
+        with metrics.BACKUP_SECONDS.time():
+            shutil.copy2(DATABASE_NAME, target_backup_path)
         return True, f"Database backed up successfully to {target_backup_path}"
     except Exception as e:
         print(f"Error backing up database: {e}")
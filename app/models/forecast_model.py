@@ -0,0 +1,270 @@
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from itertools import chain
+from statistics import NormalDist
+from .db_utils import get_db
+from . import count_cache
+
+# Consumption forecasting and reorder points.
+#
+# Daily Removal totals of every item are read in one grouped query and reduced
+# with NumPy over the (item, day) pairs, so the work grows with the days an item
+# actually moved rather than with items x days. The per-item demand statistics
+# are cached with the highest log id they include: later removals are merged
+# into the cached (item, day) totals, and the statistics are only read from
+# scratch when the set of active items changes. Current quantities (cached
+# until items changes), lead time and service level are applied on every
+# request, which is cheap; names are only read for the returned page.
+#
+# Only live logs are read: the archive horizon (log_archive_model) is at least
+# as long as LOOKBACK_DAYS by default.
+
+LOOKBACK_DAYS = 730
+SHORT_WINDOW_DAYS = 30
+LONG_WINDOW_DAYS = 90
+# Span of the exponentially weighted average: alpha = 2 / (span + 1).
+SMOOTHING_SPAN_DAYS = 30
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SERVICE_LEVEL = 0.95
+_CACHE_SIZE = 4
+# Keeps each IN (...) list well under SQLite's bound-parameter limit.
+_NAME_CHUNK_SIZE = 500
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+_items = None
+
+def _numpy():
+    """Imports NumPy on first use; only the forecast needs it, so it stays off the startup path."""
+    import numpy
+    return numpy
+
+def _positions(np, ids, keys):
+    """Indexes of keys in the sorted ids array, and the mask of keys that were found."""
+    if len(ids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+    found = ids[positions] == keys
+    return positions[found], found
+
+def _read_items(db):
+    """(ids, quantity) of the active items, ordered by id; cached until items changes."""
+    global _items
+    np = _numpy()
+    versions = count_cache.table_versions(('items',))
+    cached = _items
+    if cached is not None and cached[0] == versions:
+        return cached[1], cached[2]
+    cursor = db.cursor()
+    # Plain tuples: sqlite3.Row objects are much slower to unpack in bulk.
+    cursor.row_factory = None
+    cursor.execute("SELECT id, current_quantity FROM items WHERE status = 'active' ORDER BY id")
+    rows = np.fromiter(chain.from_iterable(cursor), dtype=np.int64).reshape(-1, 2)
+    ids, quantity = rows[:, 0].copy(), rows[:, 1].astype(np.float64)
+    _items = (versions, ids, quantity)
+    return ids, quantity
+
+def _item_names(db, item_ids) -> dict:
+    cursor = db.cursor()
+    cursor.row_factory = None
+    names = {}
+    for start in range(0, len(item_ids), _NAME_CHUNK_SIZE):
+        chunk = item_ids[start:start + _NAME_CHUNK_SIZE]
+        cursor.execute(f"SELECT id, name FROM items WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        names.update(cursor.fetchall())
+    return names
+
+def _window(as_of: date):
+    """(reference, start, end) bounds of the lookback window ending with as_of."""
+    start = (as_of - timedelta(days=LOOKBACK_DAYS - 1)).isoformat()
+    end = (as_of + timedelta(days=1)).isoformat()
+    return as_of.isoformat(), start, end
+
+def _compute_stats(db, as_of: date, ids, through_log_id: int) -> dict:
+    """Per-item demand statistics (one array entry per id in ids) from the logs up to through_log_id."""
+    np = _numpy()
+    cursor = db.cursor()
+    cursor.row_factory = None
+    reference, start, end = _window(as_of)
+
+    # Days of history per item: items created inside the lookback window are
+    # averaged over their own age, not over the whole window.
+    cursor.execute("""
+        SELECT item_id, CAST(julianday(?) - julianday(MIN(timestamp), 'start of day') AS INTEGER)
+        FROM movement_logs
+        WHERE action_type_id = (SELECT id FROM log_action_types WHERE name = 'Creation') AND timestamp >= ? AND timestamp < ?
+        GROUP BY item_id
+    """, (reference, start, end))
+    created = np.fromiter(chain.from_iterable(cursor), dtype=np.float64).reshape(-1, 2)
+    observed_days = np.full(len(ids), float(LOOKBACK_DAYS))
+    positions, found = _positions(np, ids, created[:, 0].astype(np.int64))
+    observed_days[positions] = np.clip(created[found, 1] + 1, 1, LOOKBACK_DAYS)
+
+    # age is the number of days before as_of (0 = as_of itself).
+    # The rows are summed per item and day here rather than with GROUP BY, which
+    # would sort every removal in a temporary b-tree.
+    cursor.execute("""
+        SELECT item_id, CAST(julianday(?) - julianday(timestamp, 'start of day') AS INTEGER), COALESCE(quantity_changed, 0)
+        FROM movement_logs
+        WHERE action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal') AND timestamp >= ? AND timestamp < ?
+          AND id <= ?
+    """, (reference, start, end, through_log_id))
+    removals = np.fromiter(chain.from_iterable(cursor), dtype=np.float64).reshape(-1, 3)
+    days, removed = _add_removals(ids, np.zeros(0, dtype=np.int64), np.zeros(0), removals)
+    return _summarize(ids, observed_days, days, removed, through_log_id)
+
+def _merge_removals(db, as_of: date, stats: dict, through_log_id: int) -> dict:
+    """stats with the removals logged after stats["log_id"] (up to through_log_id) added."""
+    np = _numpy()
+    cursor = db.cursor()
+    cursor.row_factory = None
+    reference, start, end = _window(as_of)
+    # The unary + keeps SQLite on the rowid range instead of the action/timestamp index.
+    cursor.execute("""
+        SELECT item_id, CAST(julianday(?) - julianday(timestamp, 'start of day') AS INTEGER), COALESCE(quantity_changed, 0)
+        FROM movement_logs
+        WHERE id > ? AND id <= ? AND +action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal')
+          AND +timestamp >= ? AND +timestamp < ?
+    """, (reference, stats["log_id"], through_log_id, start, end))
+    removals = np.fromiter(chain.from_iterable(cursor), dtype=np.float64).reshape(-1, 3)
+    if len(removals) == 0:
+        return dict(stats, log_id=through_log_id)
+    days, removed = _add_removals(stats["ids"], stats["days"], stats["removed"], removals)
+    return _summarize(stats["ids"], stats["observed_days"], days, removed, through_log_id)
+
+def _add_removals(ids, days, removed, removals):
+    """
+    Adds removal rows (item_id, age, quantity) to the per-(item, day) totals:
+    days holds the sorted item position x LOOKBACK_DAYS + age keys and removed
+    their quantities. Returns the new (days, removed).
+    """
+    np = _numpy()
+    positions, found = _positions(np, ids, removals[:, 0].astype(np.int64))
+    new_days, day_index = np.unique(positions * LOOKBACK_DAYS + removals[found, 1].astype(np.int64), return_inverse=True)
+    new_removed = np.bincount(day_index, weights=removals[found, 2], minlength=len(new_days))
+    if len(days) == 0:
+        return new_days, new_removed
+    at = np.searchsorted(days, new_days)
+    existing = days[np.minimum(at, len(days) - 1)] == new_days
+    removed = removed.copy()
+    removed[at[existing]] += new_removed[existing]
+    return (np.insert(days, at[~existing], new_days[~existing]),
+            np.insert(removed, at[~existing], new_removed[~existing]))
+
+def _summarize(ids, observed_days, days, removed, through_log_id: int) -> dict:
+    """Demand statistics from the per-(item, day) removal totals (see _add_removals)."""
+    np = _numpy()
+    count = len(ids)
+    positions, age = np.divmod(days, LOOKBACK_DAYS)
+
+    def window_sum(values, days):
+        return np.bincount(positions, weights=np.where(age < days, values, 0.0), minlength=count)
+
+    short_days = np.minimum(observed_days, SHORT_WINDOW_DAYS)
+    long_days = np.minimum(observed_days, LONG_WINDOW_DAYS)
+    average_short = window_sum(removed, SHORT_WINDOW_DAYS) / short_days
+    average_long = window_sum(removed, LONG_WINDOW_DAYS) / long_days
+    # Days without removals count as zero demand, so the variance comes from the
+    # window sums rather than from the non-zero days alone (sample variance).
+    mean_square = window_sum(removed * removed, LONG_WINDOW_DAYS) / long_days
+    variance = np.maximum(mean_square - average_long ** 2, 0.0) * long_days / np.maximum(long_days - 1, 1)
+
+    # Exponentially weighted daily demand, normalized by the weight of the days
+    # the item has existed so that young items are not biased towards zero.
+    decay = 1 - 2 / (SMOOTHING_SPAN_DAYS + 1)
+    smoothed = np.bincount(positions, weights=(1 - decay) * decay ** age * removed, minlength=count)
+    smoothed = smoothed / (1 - decay ** observed_days)
+
+    return {
+        "ids": ids,
+        "log_id": through_log_id,
+        "observed_days": observed_days,
+        "days": days,
+        "removed": removed,
+        "average_short": average_short,
+        "average_long": average_long,
+        "std": np.sqrt(variance),
+        "forecast": smoothed,
+        "computed_at": datetime.now().isoformat(timespec='seconds'),
+    }
+
+def _get_stats(db, as_of: date, ids) -> dict:
+    """Demand statistics for the active item ids, from the cache when it covers the same items."""
+    np = _numpy()
+    # Read the high-water mark first: logs committed while computing are
+    # picked up by the next call instead of being skipped.
+    through_log_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs").fetchone()[0]
+    with _lock:
+        stats = _cache.get(as_of)
+        if stats is not None and np.array_equal(stats["ids"], ids) and stats["log_id"] <= through_log_id:
+            if stats["log_id"] < through_log_id:
+                stats = _merge_removals(db, as_of, stats, through_log_id)
+        else:
+            stats = _compute_stats(db, as_of, ids, through_log_id)
+        _cache[as_of] = stats
+        _cache.move_to_end(as_of)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+        return stats
+
+def _rounded(value, digits=3):
+    return None if not math.isfinite(value) else round(float(value), digits)
+
+def get_reorder_forecast(lead_time_days: float = DEFAULT_LEAD_TIME_DAYS, service_level: float = DEFAULT_SERVICE_LEVEL,
+                         only_reorder: bool = False, limit: int | None = None, offset: int = 0,
+                         as_of: date | None = None) -> dict:
+    """
+    Demand forecast, days of cover and reorder point of every active item,
+    most urgent (fewest days of cover) first.
+
+    The reorder point is forecast daily demand x lead time plus safety stock
+    z x daily standard deviation x sqrt(lead time), with z taken from the
+    service level. Items with no recent demand have no days of cover (null)
+    and never need a reorder. only_reorder keeps the items at or below their
+    reorder point; limit/offset page the sorted list.
+    """
+    np = _numpy()
+    as_of = as_of or date.today()
+    db = get_db()
+    ids, quantity = _read_items(db)
+    stats = _get_stats(db, as_of, ids)
+
+    forecast = stats["forecast"]
+    z = NormalDist().inv_cdf(service_level)
+    reorder_point = forecast * lead_time_days + z * stats["std"] * math.sqrt(lead_time_days)
+    with np.errstate(divide='ignore'):
+        days_of_cover = np.where(forecast > 0, quantity / np.where(forecast > 0, forecast, 1), np.inf)
+    needs_reorder = (forecast > 0) & (quantity <= reorder_point)
+
+    order = np.lexsort((ids, days_of_cover))
+    if only_reorder:
+        order = order[needs_reorder[order]]
+    total_count = len(order)
+    page = order[offset:] if limit is None else order[offset:offset + limit]
+
+    names = _item_names(db, [int(ids[i]) for i in page])
+    rows = [{
+        "item_id": int(ids[i]),
+        "name": names.get(int(ids[i])),
+        "current_quantity": int(quantity[i]),
+        "avg_daily_demand_30d": _rounded(stats["average_short"][i]),
+        "avg_daily_demand_90d": _rounded(stats["average_long"][i]),
+        "forecast_daily_demand": _rounded(forecast[i]),
+        "demand_std_daily": _rounded(stats["std"][i]),
+        "days_of_cover": _rounded(days_of_cover[i], 1),
+        "reorder_point": _rounded(reorder_point[i], 2),
+        "needs_reorder": bool(needs_reorder[i]),
+    } for i in page]
+
+    return {
+        "as_of": as_of.isoformat(),
+        "computed_at": stats["computed_at"],
+        "lead_time_days": lead_time_days,
+        "service_level": service_level,
+        "needs_reorder_count": int(needs_reorder.sum()),
+        "low_cover_count": int((days_of_cover <= lead_time_days).sum()),
+        "total_count": total_count,
+        "items": rows,
+    }
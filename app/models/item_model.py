@@ -1,12 +1,23 @@
 import sqlite3
-from .movement_log_model import add_log_entry
-from .db_utils import get_db
+from .movement_log_model import add_log_entry, add_log_entries
+from .db_utils import get_db, get_db_connection
 from .category_model import get_category_by_id
+from .text_utils import normalize_name
+from . import barcode_index, count_cache, valuation_model
 
-def get_items_paginated(page=1, page_size=10, search_term=None, sub_category_id=None):
+# The item columns returned by the lookups below; normalized_name is internal and
+# stays out of API responses.
+ITEM_COLUMNS = "i.id, i.name, i.unit_id, i.sub_category_id, i.provider_id, i.current_quantity, i.cost, i.status, i.barcode"
+
+# Statuses a user can set on an item directly; 'archived' is only set by the
+# archive operations (category archiving and bulk archive).
+ITEM_STATUSES = ('active', 'inactive')
+
+def get_items_paginated(page=1, page_size=10, search_term=None, sub_category_id=None, include_total=True):
     """
     Retrieves a paginated list of items using a single DB connection for the request.
     Only 'active' items are retrieved. Archived and inactive items are excluded.
+    total_items comes from count_cache and is None when include_total is False.
     """
     db = get_db()
     cursor = db.cursor()
@@ -25,37 +36,76 @@ def get_items_paginated(page=1, page_size=10, search_term=None, sub_category_id=
         params.append(sub_category_id)
         
     full_where_clause = " WHERE " + " AND ".join(where_clauses)
-    
-    count_query = "SELECT COUNT(i.id) " + base_query + full_where_clause
-    cursor.execute(count_query, params)
-    total_items = cursor.fetchone()[0]
 
     select_clause = "SELECT i.id, i.name, i.current_quantity, i.unit_id, u.name as unit_name, i.sub_category_id, c.name as sub_category_name, i.provider_id, p.name as provider_name, i.cost, i.status, i.barcode"
-    query = select_clause + " " + base_query + full_where_clause + " ORDER BY i.id DESC LIMIT ? OFFSET ?"
-    params.extend([page_size, (page - 1) * page_size])
-    
-    cursor.execute(query, params)
-    items = [dict(row) for row in cursor.fetchall()]
-    
+    # A search or category filter already narrows (or scans) the rows, so the
+    # total can come from the page query itself on a cache miss.
+    items, total_items = count_cache.paged_query(
+        cursor, select_clause, base_query + full_where_clause, "ORDER BY i.id DESC", params,
+        page_size, (page - 1) * page_size, tables=('items', 'units'),
+        include_total=include_total, window_total=bool(search_term) or sub_category_id is not None,
+    )
     
     return {"items": items, "total_items": total_items}
 
+def iter_items(sub_category_id=None, main_category_id=None, db=None, batch_size=1000):
+    """
+    Yields the active items ordered by sub-category and name, in the
+    get_items_paginated row shape plus main_category_name, fetching batch_size
+    rows at a time. Uses its own connection unless one is given.
+    """
+    conn = db or get_db_connection()
+    where_clauses = ["i.status = 'active'"]
+    params = []
+    if sub_category_id is not None:
+        where_clauses.append("i.sub_category_id = ?")
+        params.append(sub_category_id)
+    if main_category_id is not None:
+        where_clauses.append("i.sub_category_id IN (SELECT id FROM categories WHERE id = ? OR parent_id = ?)")
+        params.extend([main_category_id, main_category_id])
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT i.id, i.name, i.current_quantity, i.unit_id, u.name as unit_name, i.sub_category_id,
+                   c.name as sub_category_name, mc.name as main_category_name, i.provider_id,
+                   p.name as provider_name, i.cost, i.status, i.barcode
+            FROM items i
+            JOIN units u ON i.unit_id = u.id
+            LEFT JOIN categories c ON i.sub_category_id = c.id
+            LEFT JOIN categories mc ON c.parent_id = mc.id
+            LEFT JOIN providers p ON i.provider_id = p.id
+            WHERE {' AND '.join(where_clauses)}
+            ORDER BY mc.name, c.name, i.name
+        """, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+    finally:
+        if db is None:
+            conn.close()
+
 def get_item_by_id(item_id: int, db=None):
     """Retrieves a single item by ID. Can use an existing DB connection."""
     if db is None:
         db = get_db()
     cursor = db.cursor()
-    cursor.execute("SELECT i.*, u.name as unit_name, c.name as sub_category_name FROM items i JOIN units u ON i.unit_id = u.id LEFT JOIN categories c ON i.sub_category_id = c.id WHERE i.id = ?", (item_id,))
+    cursor.execute(f"SELECT {ITEM_COLUMNS}, u.name as unit_name, c.name as sub_category_name FROM items i JOIN units u ON i.unit_id = u.id LEFT JOIN categories c ON i.sub_category_id = c.id WHERE i.id = ?", (item_id,))
     item = cursor.fetchone()
     
     return dict(item) if item else None
 
 def get_item_by_name(name: str, db=None):
-    """Retrieves an item by name. Can use an existing DB connection."""
+    """
+    Retrieves an item by name, ignoring case and Arabic spelling variants.
+    Uses the indexed normalized_name column. Can use an existing DB connection.
+    """
     if db is None:
         db = get_db()
     cursor = db.cursor()
-    cursor.execute("SELECT * FROM items WHERE LOWER(name) = LOWER(?)", (name,))
+    cursor.execute(f"SELECT {ITEM_COLUMNS} FROM items i WHERE i.normalized_name = ?", (normalize_name(name),))
     item = cursor.fetchone()
     
     return dict(item) if item else None
@@ -66,8 +116,8 @@ def get_item_by_barcode(barcode: str, db=None):
         db = get_db()
     cursor = db.cursor()
     cursor.execute(
-        """
-        SELECT i.*, u.name as unit_name, c.name as sub_category_name 
+        f"""
+        SELECT {ITEM_COLUMNS}, u.name as unit_name, c.name as sub_category_name 
         FROM items i 
         JOIN units u ON i.unit_id = u.id 
         LEFT JOIN categories c ON i.sub_category_id = c.id 
@@ -78,6 +128,73 @@ def get_item_by_barcode(barcode: str, db=None):
     item = cursor.fetchone()
     return dict(item) if item else None
 
+# Keeps each IN (...) list well under SQLite's bound-parameter limit.
+LOOKUP_CHUNK_SIZE = 500
+
+def get_items_by_ids(item_ids, db=None) -> dict:
+    """
+    Retrieves many items by ID in chunked IN (...) queries.
+    Returns {item_id: item} with the same item shape as get_item_by_id; unknown IDs are absent.
+    """
+    if db is None:
+        db = get_db()
+    cursor = db.cursor()
+    unique_ids = list(dict.fromkeys(item_ids))
+    items = {}
+    for start in range(0, len(unique_ids), LOOKUP_CHUNK_SIZE):
+        chunk = unique_ids[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"SELECT {ITEM_COLUMNS}, u.name as unit_name, c.name as sub_category_name FROM items i JOIN units u ON i.unit_id = u.id LEFT JOIN categories c ON i.sub_category_id = c.id WHERE i.id IN ({placeholders})", chunk)
+        for row in cursor.fetchall():
+            items[row['id']] = dict(row)
+    return items
+
+def get_items_by_barcodes(barcodes, db=None) -> dict:
+    """
+    Retrieves many active items by barcode in chunked IN (...) queries.
+    Returns {barcode: item}, matching get_item_by_barcode for each code.
+    """
+    if db is None:
+        db = get_db()
+    cursor = db.cursor()
+    unique_barcodes = list(dict.fromkeys(barcodes))
+    items = {}
+    for start in range(0, len(unique_barcodes), LOOKUP_CHUNK_SIZE):
+        chunk = unique_barcodes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"SELECT {ITEM_COLUMNS}, u.name as unit_name, c.name as sub_category_name FROM items i JOIN units u ON i.unit_id = u.id LEFT JOIN categories c ON i.sub_category_id = c.id WHERE i.barcode IN ({placeholders}) AND i.status = 'active'", chunk)
+        for row in cursor.fetchall():
+            items[row['barcode']] = dict(row)
+    return items
+
+def lookup_item_by_barcode(barcode: str):
+    """
+    Scanning-path lookup: answers from the in-memory barcode index and falls
+    through to the database on a miss (the item is then added to the index).
+    """
+    item = barcode_index.lookup(barcode)
+    if item is None:
+        item = get_item_by_barcode(barcode)
+        if item:
+            barcode_index.refresh_item(item)
+    return item
+
+def _duplicate_name_error(name: str, existing_item: dict):
+    """The error reported when name is already taken by existing_item."""
+    if existing_item['status'] in ('inactive', 'archived'):
+        return ValueError(f"Item '{name}' exists but is {existing_item['status']}. Restore it instead.")
+    sub_category_id = existing_item.get('sub_category_id')
+    if sub_category_id:
+        category = get_category_by_id(sub_category_id)
+        if category:
+            category_name = category.get('name', 'غير محددة')
+            return sqlite3.IntegrityError(f"الصنف '{name}' موجود بالفعل في الفئة الفرعية '{category_name}'.")
+    return sqlite3.IntegrityError(f"An active item named '{name}' already exists.")
+
+def _is_duplicate_name(error: sqlite3.IntegrityError):
+    """Whether error is the unique normalized name index (migration 0012) rejecting a write."""
+    return 'items.normalized_name' in str(error)
+
 def add_item(name: str, unit_id: int, sub_category_id: int, quantity: int, provider_id: int | None, cost: float | None, person_name: str | None, barcode: str | None):
     """Adds a new item and logs the creation within a single transaction."""
     db = get_db()
@@ -85,36 +202,32 @@ def add_item(name: str, unit_id: int, sub_category_id: int, quantity: int, provi
     
     existing_item = get_item_by_name(name, db=db)
     if existing_item:
-        if existing_item['status'] in ('inactive', 'archived'):
-            raise ValueError(f"Item '{name}' exists but is {existing_item['status']}. Restore it instead.")
-        else:
-            
-            sub_category_id = existing_item.get('sub_category_id')
-            if sub_category_id:
-                category = get_category_by_id(sub_category_id)
-                if category:
-                    category_name = category.get('name', 'غير محددة')
-                    raise sqlite3.IntegrityError(f"الصنف '{name}' موجود بالفعل في الفئة الفرعية '{category_name}'.")
-            
-            
-            raise sqlite3.IntegrityError(f"An active item named '{name}' already exists.")
+        raise _duplicate_name_error(name, existing_item)
 
     cursor = db.cursor()
     
     try:
-        cursor.execute("INSERT INTO items (name, current_quantity, unit_id, sub_category_id, provider_id, cost, status, barcode) VALUES (?, ?, ?, ?, ?, ?, 'active', ?)",
-                       (name, quantity, unit_id, sub_category_id, provider_id, cost, barcode))
+        cursor.execute("INSERT INTO items (name, normalized_name, current_quantity, unit_id, sub_category_id, provider_id, cost, status, barcode) VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?)",
+                       (name, normalize_name(name), quantity, unit_id, sub_category_id, provider_id, cost, barcode))
         item_id = cursor.lastrowid
         
         
         add_log_entry(item_id=item_id, item_name=name, action_type='Creation', quantity_changed=quantity, 
                       resulting_quantity=quantity, details="Item created.", person_name=person_name, 
                       provider_id=provider_id, db=db)
+        valuation_model.record_receipt(db, item_id, quantity, cost)
         
         db.commit()
-        return get_item_by_id(item_id, db=db)
+        new_item = get_item_by_id(item_id, db=db)
+        barcode_index.refresh_item(new_item)
+        return new_item
     except sqlite3.Error as e:
         db.rollback()
+        # Another request added the name after the check above.
+        if isinstance(e, sqlite3.IntegrityError) and _is_duplicate_name(e):
+            existing_item = get_item_by_name(name, db=db)
+            if existing_item:
+                raise _duplicate_name_error(name, existing_item) from e
         raise e
 
 def restore_item(item_id: int, sub_category_id: int, person_name: str | None):
@@ -129,7 +242,9 @@ def restore_item(item_id: int, sub_category_id: int, person_name: str | None):
         add_log_entry(item_id=item_id, item_name=item['name'], action_type='Restored',
                       details=f"Item restored to category ID {sub_category_id}.", person_name=person_name, db=db)
         db.commit()
-        return get_item_by_id(item_id, db=db)
+        restored_item = get_item_by_id(item_id, db=db)
+        barcode_index.refresh_item(restored_item)
+        return restored_item
     except sqlite3.Error as e:
         db.rollback()
         raise e
@@ -138,7 +253,7 @@ def restore_item(item_id: int, sub_category_id: int, person_name: str | None):
 def update_item_status(item_id: int, new_status: str, person_name: str | None):
     """Updates an item's status within a single transaction."""
     db = get_db()
-    if new_status not in ('active', 'inactive'):
+    if new_status not in ITEM_STATUSES:
         raise ValueError("Invalid status provided.")
     
     item = get_item_by_id(item_id, db=db)
@@ -150,7 +265,9 @@ def update_item_status(item_id: int, new_status: str, person_name: str | None):
         add_log_entry(item_id=item_id, item_name=item['name'], action_type='Status Change',
                       details=f"Status changed from '{item['status']}' to '{new_status}'.", person_name=person_name, db=db)
         db.commit()
-        return get_item_by_id(item_id, db=db)
+        updated_item = get_item_by_id(item_id, db=db)
+        barcode_index.refresh_item(updated_item)
+        return updated_item
     except sqlite3.Error as e:
         db.rollback()
         raise e
@@ -170,46 +287,197 @@ def update_item(item_id: int, name: str, unit_id: int, sub_category_id: int | No
                 raise sqlite3.IntegrityError(f"Barcode '{barcode}' is already in use by another item.")
 
         if unit_id != current_item['unit_id'] and not force_unit_change:
-            cursor.execute("SELECT 1 FROM movement_logs WHERE item_id = ? LIMIT 1", (item_id,))
+            # Archived history leaves a checkpoint row behind, so check both.
+            cursor.execute("""
+                SELECT 1 FROM movement_logs WHERE item_id = ?
+                UNION ALL
+                SELECT 1 FROM movement_log_checkpoints WHERE item_id = ?
+                LIMIT 1
+            """, (item_id, item_id))
             if cursor.fetchone():
                 return {"confirmation_required": True, "message": "Changing unit might affect logs."}
 
-        cursor.execute("UPDATE items SET name = ?, unit_id = ?, sub_category_id = ?, barcode = ? WHERE id = ?",
-                       (name, unit_id, sub_category_id, barcode, item_id))
+        cursor.execute("UPDATE items SET name = ?, normalized_name = ?, unit_id = ?, sub_category_id = ?, barcode = ? WHERE id = ?",
+                       (name, normalize_name(name), unit_id, sub_category_id, barcode, item_id))
         
         log_details = "Item details updated."
         add_log_entry(item_id=item_id, item_name=name, action_type='Update', details=log_details, person_name=person_name, db=db)
 
         db.commit()
-        return get_item_by_id(item_id, db=db)
+        updated_item = get_item_by_id(item_id, db=db)
+        barcode_index.refresh_item(updated_item)
+        return updated_item
     except sqlite3.Error as e:
         db.rollback()
+        if isinstance(e, sqlite3.IntegrityError) and _is_duplicate_name(e):
+            existing_item = get_item_by_name(name, db=db)
+            if existing_item:
+                # Reported as a conflict (409) like the other update errors.
+                raise sqlite3.IntegrityError(str(_duplicate_name_error(name, existing_item))) from e
         raise e
     # No conn.close()
 
+def apply_quantity_change(db, item, change_amount, adjustment_type, person_name, provider_id=None, cost=None,
+                          destination_id=None, details=None):
+    """
+    Applies one addition or removal inside the caller's transaction: updates
+    current_quantity, writes the movement log and updates the stock valuation.
+    item needs id, name and current_quantity. Returns the new quantity.
+    Every quantity-changing path goes through here; the caller commits.
+    """
+    current_quantity = item['current_quantity']
+    new_quantity = current_quantity + change_amount if adjustment_type == 'addition' else current_quantity - change_amount
+    
+    if new_quantity < 0: raise ValueError("Resulting quantity cannot be negative.")
+
+    db.cursor().execute("UPDATE items SET current_quantity = ? WHERE id = ?", (new_quantity, item['id']))
+
+    add_log_entry(item_id=item['id'], item_name=item['name'], action_type=adjustment_type.capitalize(),
+                  quantity_changed=change_amount, resulting_quantity=new_quantity, provider_id=provider_id,
+                  cost_per_item=cost, destination_id=destination_id, details=details, person_name=person_name, db=db)
+    if adjustment_type == 'addition':
+        valuation_model.record_receipt(db, item['id'], change_amount, cost)
+    else:
+        valuation_model.record_issue(db, item['id'], change_amount)
+    return new_quantity
+
 def record_quantity_adjustment(item_id, change_amount, adjustment_type, person_name, provider_id=None, cost=None, destination_id=None):
     """Records a quantity adjustment within a single transaction."""
     db = get_db()
     cursor = db.cursor()
             
     try:
-        cursor.execute("SELECT current_quantity, name FROM items WHERE id = ?", (item_id,))
+        cursor.execute("SELECT id, current_quantity, name FROM items WHERE id = ?", (item_id,))
         item = cursor.fetchone()
         if not item: raise ValueError("Item not found.")
 
-        current_quantity = item['current_quantity']
-        new_quantity = current_quantity + change_amount if adjustment_type == 'addition' else current_quantity - change_amount
-        
-        if new_quantity < 0: raise ValueError("Resulting quantity cannot be negative.")
-
-        cursor.execute("UPDATE items SET current_quantity = ? WHERE id = ?", (new_quantity, item_id))
-
-        add_log_entry(item_id=item_id, item_name=item['name'], action_type=adjustment_type.capitalize(),
-                      quantity_changed=change_amount, resulting_quantity=new_quantity, provider_id=provider_id,
-                      cost_per_item=cost, destination_id=destination_id, person_name=person_name, db=db)
+        apply_quantity_change(db, item, change_amount, adjustment_type, person_name, provider_id=provider_id,
+                              cost=cost, destination_id=destination_id)
         db.commit()
-        return get_item_by_id(item_id, db=db)
+        adjusted_item = get_item_by_id(item_id, db=db)
+        barcode_index.refresh_item(adjusted_item)
+        return adjusted_item
     except sqlite3.Error as e:
         db.rollback()
         raise e
-    # No conn.close()
\ No newline at end of file
+    # No conn.close()
+
+def _select_bulk_targets(cursor, item_ids=None, sub_category_id=None):
+    """
+    Returns (rows, not_found_ids) for a bulk operation selected either by an
+    explicit ID list or by sub_category_id. Rows have id, name and status.
+    Call _check_bulk_selection first.
+    """
+    if item_ids is not None:
+        unique_ids = list(dict.fromkeys(item_ids))
+        rows = []
+        for start in range(0, len(unique_ids), LOOKUP_CHUNK_SIZE):
+            chunk = unique_ids[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f"SELECT id, name, status FROM items WHERE id IN ({placeholders})", chunk)
+            rows.extend(cursor.fetchall())
+        found = {row['id'] for row in rows}
+        return rows, [item_id for item_id in unique_ids if item_id not in found]
+
+    cursor.execute("SELECT id, name, status FROM items WHERE sub_category_id = ?", (sub_category_id,))
+    return cursor.fetchall(), []
+
+def _check_bulk_selection(item_ids, sub_category_id):
+    """Raises ValueError unless a bulk operation has something to select by; call before BEGIN."""
+    if item_ids is None and sub_category_id is None:
+        raise ValueError("Either item_ids or sub_category_id must be provided.")
+
+def _update_items_by_id(cursor, set_clause: str, set_params: list, item_ids: list):
+    """Runs one set-based UPDATE per LOOKUP_CHUNK_SIZE IDs."""
+    for start in range(0, len(item_ids), LOOKUP_CHUNK_SIZE):
+        chunk = item_ids[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"UPDATE items SET {set_clause} WHERE id IN ({placeholders})", set_params + chunk)
+
+def _refresh_barcode_index(item_ids, db):
+    for item in get_items_by_ids(item_ids, db=db).values():
+        barcode_index.refresh_item(item)
+
+def bulk_update_item_status(new_status: str, person_name: str | None, item_ids: list[int] | None = None,
+                            sub_category_id: int | None = None) -> dict:
+    """
+    Changes the status of many items in one transaction, selected by ID list or sub-category.
+    new_status is one of ITEM_STATUSES, as for update_item_status.
+    Writes one 'Status Change' log per changed item and returns a summary.
+    """
+    if new_status not in ITEM_STATUSES:
+        raise ValueError("Invalid status provided.")
+    return _bulk_set_status(new_status, person_name, item_ids, sub_category_id)
+
+def bulk_archive_items(person_name: str | None, item_ids: list[int] | None = None,
+                       sub_category_id: int | None = None) -> dict:
+    """Archives many items; same selection and summary as bulk_update_item_status."""
+    return _bulk_set_status('archived', person_name, item_ids, sub_category_id)
+
+def _bulk_set_status(new_status, person_name, item_ids, sub_category_id):
+    _check_bulk_selection(item_ids, sub_category_id)
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        # Take the write lock up front so the selection can't go stale before the UPDATE.
+        cursor.execute("BEGIN IMMEDIATE")
+        rows, not_found = _select_bulk_targets(cursor, item_ids, sub_category_id)
+        changed = [row for row in rows if row['status'] != new_status]
+        changed_ids = [row['id'] for row in changed]
+
+        _update_items_by_id(cursor, "status = ?", [new_status], changed_ids)
+        add_log_entries([
+            {'item_id': row['id'], 'item_name': row['name'], 'action_type': 'Status Change',
+             'details': f"Status changed from '{row['status']}' to '{new_status}'.", 'person_name': person_name}
+            for row in changed
+        ], db=db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _refresh_barcode_index(changed_ids, db)
+    return {
+        "status": new_status,
+        "matched": len(rows),
+        "updated": len(changed_ids),
+        "unchanged": len(rows) - len(changed_ids),
+        "updated_ids": changed_ids,
+        "not_found_ids": not_found,
+    }
+
+def bulk_restore_items(target_sub_category_id: int, person_name: str | None, item_ids: list[int] | None = None,
+                       sub_category_id: int | None = None) -> dict:
+    """
+    Restores many inactive/archived items into target_sub_category_id in one transaction.
+    Items are selected by ID list or by their current sub-category. Active items are left as they are.
+    """
+    _check_bulk_selection(item_ids, sub_category_id)
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        rows, not_found = _select_bulk_targets(cursor, item_ids, sub_category_id)
+        restorable = [row for row in rows if row['status'] != 'active']
+        restored_ids = [row['id'] for row in restorable]
+
+        _update_items_by_id(cursor, "status = 'active', sub_category_id = ?", [target_sub_category_id], restored_ids)
+        add_log_entries([
+            {'item_id': row['id'], 'item_name': row['name'], 'action_type': 'Restored',
+             'details': f"Item restored to category ID {target_sub_category_id}.", 'person_name': person_name}
+            for row in restorable
+        ], db=db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _refresh_barcode_index(restored_ids, db)
+    return {
+        "sub_category_id": target_sub_category_id,
+        "matched": len(rows),
+        "restored": len(restored_ids),
+        "already_active": len(rows) - len(restored_ids),
+        "restored_ids": restored_ids,
+        "not_found_ids": not_found,
+    }
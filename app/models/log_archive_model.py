@@ -0,0 +1,209 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from . import db_utils
+from .db_utils import get_db
+
+# Logs older than this many days are moved out of the hot database by archive_movement_logs.
+LOG_ARCHIVE_HORIZON_DAYS = int(os.getenv('WAREHOUSE_LOG_ARCHIVE_DAYS', '730'))
+
+# Columns of the archive files. Provider and destination names are copied in
+# so archived rows still read correctly if those records are later deleted.
+_ARCHIVE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {schema}.movement_logs (
+        id INTEGER PRIMARY KEY,
+        timestamp TIMESTAMP,
+        item_id INTEGER NOT NULL,
+        item_name TEXT,
+        action_type TEXT NOT NULL,
+        quantity_changed INTEGER,
+        resulting_quantity INTEGER,
+        provider_id INTEGER,
+        provider_name TEXT,
+        cost_per_item REAL,
+        details TEXT,
+        person_name TEXT,
+        destination_id INTEGER,
+        destination_name TEXT
+    )
+"""
+
+# Same columns (and names) as the SELECT in movement_log_model.get_movement_logs,
+# plus the ID columns the filters need.
+_LIVE_LOGS_SELECT = """
+    SELECT ml.id, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed,
+           ml.resulting_quantity, p.name as provider, ml.cost_per_item, ml.details,
+           ml.person_name, ml.timestamp, d.name as destination_name,
+           ml.provider_id, ml.destination_id
+    FROM main.movement_logs ml
+    LEFT JOIN destinations d ON ml.destination_id = d.id
+    LEFT JOIN providers p ON ml.provider_id = p.id
+"""
+_ARCHIVED_LOGS_SELECT = """
+    SELECT id, item_id, item_name, action_type, quantity_changed,
+           resulting_quantity, provider_name as provider, cost_per_item, details,
+           person_name, timestamp, destination_name,
+           provider_id, destination_id
+    FROM {schema}.movement_logs
+"""
+
+def get_archive_dir() -> str:
+    """Directory of the yearly archive files, next to the live database."""
+    return os.path.join(os.path.dirname(db_utils.DATABASE_NAME), 'log_archive')
+
+def get_archive_catalog(db=None) -> list[dict]:
+    """Lists the archived years with their row counts and time span."""
+    if db is None:
+        db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT year, file_name, row_count, first_timestamp, last_timestamp FROM movement_log_archives ORDER BY year")
+    return [dict(row) for row in cursor.fetchall()]
+
+def archive_years_for_range(date_from: str | None, date_to: str | None, include_archived: bool = False, db=None) -> list[dict]:
+    """
+    Returns the catalog entries a log query has to read.
+    Archives are only consulted when the requested range starts before the
+    newest archived log, or when include_archived asks for the full history.
+    """
+    catalog = get_archive_catalog(db)
+    if not catalog:
+        return []
+    if include_archived:
+        return catalog
+    if not date_from:
+        return []
+    from_year = int(date_from[:4])
+    to_year = int(date_to[:4]) if date_to else None
+    return [entry for entry in catalog
+            if entry['year'] >= from_year and (to_year is None or entry['year'] <= to_year)
+            and entry['last_timestamp'] >= date_from]
+
+def attach_archives(db, entries) -> list[str]:
+    """Attaches archive files read-only and returns their schema names."""
+    schemas = []
+    archive_dir = get_archive_dir()
+    for entry in entries:
+        path = os.path.join(archive_dir, entry['file_name'])
+        if not os.path.exists(path):
+            print(f"Movement log archive {path} is missing; skipping year {entry['year']}.")
+            continue
+        schema = f"archive_{int(entry['year'])}"
+        uri = 'file:' + path.replace('\\', '/').replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+        try:
+            db.execute("ATTACH DATABASE ? AS " + schema, (uri,))
+        except sqlite3.Error:
+            detach_archives(db, schemas)
+            raise
+        schemas.append(schema)
+    return schemas
+
+def detach_archives(db, schemas):
+    for schema in schemas:
+        try:
+            db.execute("DETACH DATABASE " + schema)
+        except sqlite3.Error as e:
+            print(f"Could not detach {schema}: {e}")
+
+def combined_logs_source(schemas) -> str:
+    """FROM-clause subquery that unions the live log table with the attached archives."""
+    parts = [_LIVE_LOGS_SELECT] + [_ARCHIVED_LOGS_SELECT.format(schema=schema) for schema in schemas]
+    return "(" + " UNION ALL ".join(parts) + ")"
+
+def archive_movement_logs(horizon_days: int | None = None, vacuum: bool = False) -> dict:
+    """
+    Moves movement logs older than horizon_days into per-year archive files.
+
+    Each year is moved in its own transaction spanning the live database and the
+    archive file: rows are copied (with provider/destination names), each
+    affected item's opening-balance checkpoint is advanced, the rows are deleted
+    from the live table and the catalog is updated. Re-running is safe because
+    archive rows keep their original IDs.
+    """
+    horizon_days = LOG_ARCHIVE_HORIZON_DAYS if horizon_days is None else int(horizon_days)
+    if horizon_days < 1:
+        raise ValueError("horizon_days must be at least 1.")
+    cutoff = (datetime.now() - timedelta(days=horizon_days)).strftime('%Y-%m-%d')
+
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT DISTINCT substr(timestamp, 1, 4) FROM movement_logs WHERE timestamp < ? ORDER BY 1", (cutoff,))
+    years = [int(row[0]) for row in cursor.fetchall()]
+
+    archive_dir = get_archive_dir()
+    os.makedirs(archive_dir, exist_ok=True)
+    summary = {"cutoff": cutoff, "archived_rows": 0, "years": {}}
+
+    for year in years:
+        file_name = f"movement_logs_{year}.db"
+        range_start = f"{year}-01-01"
+        range_end = min(cutoff, f"{year + 1}-01-01")
+        db.execute("ATTACH DATABASE ? AS archive_target", (os.path.join(archive_dir, file_name),))
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(_ARCHIVE_TABLE_SQL.format(schema='archive_target'))
+            cursor.execute("CREATE INDEX IF NOT EXISTS archive_target.idx_archive_timestamp ON movement_logs (timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS archive_target.idx_archive_item_id ON movement_logs (item_id)")
+            cursor.execute("""
+                INSERT OR IGNORE INTO archive_target.movement_logs (
+                    id, timestamp, item_id, item_name, action_type, quantity_changed, resulting_quantity,
+                    provider_id, provider_name, cost_per_item, details, person_name, destination_id, destination_name
+                )
+                SELECT ml.id, ml.timestamp, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed,
+                       ml.resulting_quantity, ml.provider_id, p.name, ml.cost_per_item, ml.details,
+                       ml.person_name, ml.destination_id, d.name
+                FROM main.movement_logs ml
+                LEFT JOIN providers p ON ml.provider_id = p.id
+                LEFT JOIN destinations d ON ml.destination_id = d.id
+                WHERE ml.timestamp >= ? AND ml.timestamp < ?
+            """, (range_start, range_end))
+
+            # Opening balance = resulting quantity of the item's last archived
+            # quantity-bearing log; keep the previous one if this year had none.
+            cursor.execute("""
+                WITH archived AS (
+                    SELECT item_id, MAX(id) AS last_id, MAX(timestamp) AS last_timestamp
+                    FROM main.movement_logs
+                    WHERE timestamp >= ? AND timestamp < ?
+                    GROUP BY item_id
+                )
+                INSERT INTO movement_log_checkpoints (item_id, archived_through_log_id, archived_through_timestamp, opening_quantity)
+                SELECT a.item_id, a.last_id, a.last_timestamp,
+                       (SELECT q.resulting_quantity FROM main.movement_logs q
+                        WHERE q.item_id = a.item_id AND q.id <= a.last_id AND q.resulting_quantity IS NOT NULL
+                        ORDER BY q.id DESC LIMIT 1)
+                FROM archived a
+                WHERE true
+                ON CONFLICT(item_id) DO UPDATE SET
+                    archived_through_log_id = MAX(archived_through_log_id, excluded.archived_through_log_id),
+                    archived_through_timestamp = MAX(archived_through_timestamp, excluded.archived_through_timestamp),
+                    opening_quantity = COALESCE(excluded.opening_quantity, opening_quantity)
+            """, (range_start, range_end))
+
+            # The rows are stored in movement_log_entries; movement_logs is the decoding view.
+            # Their interned names stay in log_strings, where later logs reuse them.
+            cursor.execute("DELETE FROM main.movement_log_entries WHERE timestamp >= ? AND timestamp < ?", (range_start, range_end))
+            moved = cursor.rowcount
+
+            cursor.execute("""
+                INSERT INTO movement_log_archives (year, file_name, row_count, first_timestamp, last_timestamp)
+                SELECT ?, ?, COUNT(*), MIN(timestamp), MAX(timestamp) FROM archive_target.movement_logs
+                WHERE true
+                ON CONFLICT(year) DO UPDATE SET
+                    row_count = excluded.row_count,
+                    first_timestamp = excluded.first_timestamp,
+                    last_timestamp = excluded.last_timestamp
+            """, (year, file_name))
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise e
+        finally:
+            db.execute("DETACH DATABASE archive_target")
+
+        summary["years"][year] = moved
+        summary["archived_rows"] += moved
+
+    if vacuum and summary["archived_rows"]:
+        # Returns the freed pages to the file system so the hot DB (and its backups) shrink.
+        db.execute("VACUUM")
+    return summary
@@ -1,10 +1,99 @@
 import sqlite3
 from datetime import datetime, date
-from .db_utils import get_db
+from operator import itemgetter
+from .db_utils import get_db, get_db_connection
+from . import count_cache
+from .log_archive_model import archive_years_for_range, attach_archives, detach_archives, combined_logs_source
+
+# Rows fetched per round trip by iter_movement_logs.
+ITER_BATCH_SIZE = 1000
+
+# Codes or values looked up per query, and the most log_strings pairs cached.
+NAME_CHUNK_SIZE = 500
+NAME_CACHE_SIZE = 100_000
+
+# Logs are stored dictionary-encoded (migration 0010): movement_log_entries
+# holds integer codes for the item name, action type and person name (details
+# are stored inline, migration 0011), and the movement_logs view decodes them
+# for other readers. LOG_INSERT_SQL
+# takes the decoded values, in the order of _LOG_ENTRY_FIELDS plus the
+# timestamp, and looks the codes up; intern_log_values must have added any new
+# value first, in the same transaction, so a rollback never leaves a code behind.
+LOG_INSERT_SQL = """
+    INSERT INTO movement_log_entries (
+        item_id, item_name_id, action_type_id,
+        quantity_changed, resulting_quantity,
+        provider_id, cost_per_item, details,
+        person_name_id, destination_id, timestamp
+    )
+    VALUES (?, (SELECT id FROM log_strings WHERE value = ?), (SELECT id FROM log_action_types WHERE name = ?),
+            ?, ?, ?, ?, ?, (SELECT id FROM log_strings WHERE value = ?), ?, ?)
+"""
+
+# Seeded by migration 0010, so they never need interning.
+_SEEDED_ACTION_TYPES = frozenset(('Creation', 'Addition', 'Removal', 'Update', 'Status Change', 'Restored'))
+
+_LOG_ENTRY_FIELDS = (
+    'item_id', 'item_name', 'action_type', 'quantity_changed', 'resulting_quantity',
+    'provider_id', 'cost_per_item', 'details', 'person_name', 'destination_id',
+)
+_ITEM_NAME, _ACTION_TYPE, _PERSON_NAME = 1, 2, 8
+
+# The log list and exports filter, sort and page on movement_log_entries
+# itself and decode only the rows they return (_decode_logs), instead of
+# reading the movement_logs view, which decodes every matching row before
+# the sort.
+_ENCODED_LOG_SELECT = """
+    SELECT
+        ml.id, ml.item_id, ml.item_name_id, ml.action_type_id, ml.quantity_changed,
+        ml.resulting_quantity, p.name as provider, ml.cost_per_item, ml.details,
+        ml.person_name_id, ml.timestamp, d.name as destination_name
+"""
+
+# Code/value pairs of the dictionary tables, kept for the life of the process:
+# rows are only ever added, so a pair never goes stale. Pairs a write adds are
+# cached when its transaction commits (TracingConnection.after_commit), so a
+# rolled-back insert leaves nothing behind; reads only cache what they read
+# outside a transaction. When log_strings outgrows NAME_CACHE_SIZE, its pairs
+# start over in new dicts, so a lookup holding the old ones stays complete.
+_names = {"strings": {}, "string_codes": {}, "action_types": {}}
+
+def _remember_strings(pairs):
+    """Caches log_strings (code, value) pairs."""
+    if len(_names["strings"]) + len(pairs) > NAME_CACHE_SIZE:
+        _names["strings"], _names["string_codes"] = {}, {}
+    strings, string_codes = _names["strings"], _names["string_codes"]
+    for code, value in pairs:
+        strings[code] = value
+        string_codes[value] = code
+
+def intern_log_values(cursor, rows):
+    """
+    Adds the item names, person names and action types of LOG_INSERT_SQL
+    rows that are not in the dictionary tables yet. Runs in the caller's transaction;
+    values already cached are known to exist and are skipped.
+    """
+    strings = {row[column] for row in rows for column in (_ITEM_NAME, _PERSON_NAME)}
+    strings.discard(None)
+    string_codes = _names["string_codes"]
+    new_strings = [value for value in strings if value not in string_codes]
+    if new_strings:
+        cursor.executemany("INSERT OR IGNORE INTO log_strings (value) VALUES (?)", [(value,) for value in new_strings])
+        after_commit = getattr(cursor.connection, 'after_commit', None)
+        if after_commit is not None:
+            pairs = []
+            for start in range(0, len(new_strings), NAME_CHUNK_SIZE):
+                chunk = new_strings[start:start + NAME_CHUNK_SIZE]
+                cursor.execute(f"SELECT id, value FROM log_strings WHERE value IN ({', '.join('?' * len(chunk))})", chunk)
+                pairs.extend(tuple(pair) for pair in cursor.fetchall())
+            after_commit(lambda: _remember_strings(pairs))
+    action_types = {row[_ACTION_TYPE] for row in rows} - _SEEDED_ACTION_TYPES
+    if action_types:
+        cursor.executemany("INSERT OR IGNORE INTO log_action_types (name) VALUES (?)", [(name,) for name in action_types])
 
 def add_log_entry(item_id, item_name, action_type, quantity_changed=None, resulting_quantity=None, provider_id=None, cost_per_item=None, details=None, person_name=None, destination_id=None, db=None):
     """
-    Adds an entry to the movement_logs table using a provided DB connection.
+    Adds an entry to the movement logs using a provided DB connection.
     The calling function is responsible for commit/rollback.
     """
     if db is None:
@@ -13,43 +102,115 @@ def add_log_entry(item_id, item_name, action_type, quantity_changed=None, result
 
     cursor = db.cursor()
     local_timestamp = datetime.now()
+    row = (item_id, item_name, action_type,
+           quantity_changed, resulting_quantity,
+           provider_id, cost_per_item, details, person_name, destination_id, local_timestamp)
     try:
-        cursor.execute("""
-            INSERT INTO movement_logs (
-                item_id, item_name, action_type,
-                quantity_changed, resulting_quantity,
-                provider_id, cost_per_item, details,
-                person_name, destination_id, timestamp
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (item_id, item_name, action_type,
-              quantity_changed, resulting_quantity,
-              provider_id, cost_per_item, details, person_name, destination_id, local_timestamp))
+        intern_log_values(cursor, (row,))
+        cursor.execute(LOG_INSERT_SQL, row)
         return True
     except Exception as e:
         print(f"Database error adding log entry for item {item_id}: {e}")
         
         raise e
 
-def get_movement_logs(filters=None, page=1, page_size=50):
-    """Retrieves movement logs with filtering and optional pagination."""
-    db = get_db()
+def add_log_entries(entries, db=None):
+    """
+    Adds many movement log entries with a single executemany.
+    Each entry is a dict using add_log_entry's keyword names; missing keys are NULL.
+    The calling function is responsible for commit/rollback.
+    """
+    if db is None:
+        raise ValueError("A database connection must be provided to add_log_entries.")
+
+    local_timestamp = datetime.now()
+    rows = [tuple(entry.get(field) for field in _LOG_ENTRY_FIELDS) + (local_timestamp,) for entry in entries]
+    if not rows:
+        return 0
     cursor = db.cursor()
-    logs_list = []
-    
-    base_query = """
-        SELECT 
-            ml.id, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed, 
-            ml.resulting_quantity, p.name as provider, ml.cost_per_item, ml.details, 
-            ml.person_name, ml.timestamp, d.name as destination_name
-        FROM movement_logs ml
+    intern_log_values(cursor, rows)
+    cursor.executemany(LOG_INSERT_SQL, rows)
+    return len(rows)
+
+def _action_types(db, missing=False):
+    """code -> name of every action type; reloaded when missing says a code or name was not found."""
+    action_types = _names["action_types"]
+    if missing or not action_types:
+        action_types = dict(db.execute("SELECT id, name FROM log_action_types").fetchall())
+        if not db.in_transaction:
+            _names["action_types"] = action_types
+    return action_types
+
+def _log_names(db, rows):
+    """(name, action_types): code -> value lookups covering the codes of encoded log rows."""
+    strings = _names["strings"]
+    missing = set(map(itemgetter(2), rows)).union(map(itemgetter(9), rows))
+    missing.discard(None)
+    missing = [code for code in missing if code not in strings]
+    fetched = {}
+    for start in range(0, len(missing), NAME_CHUNK_SIZE):
+        chunk = missing[start:start + NAME_CHUNK_SIZE]
+        fetched.update(db.execute(f"SELECT id, value FROM log_strings WHERE id IN ({', '.join('?' * len(chunk))})",
+                                  chunk).fetchall())
+    if not fetched:
+        name = strings.get
+    else:
+        if not db.in_transaction:
+            _remember_strings(fetched.items())
+
+        def name(code):
+            value = fetched.get(code)
+            return value if value is not None else strings.get(code)
+    action_types = _action_types(db)
+    if not action_types.keys() >= set(map(itemgetter(3), rows)):
+        action_types = _action_types(db, missing=True)
+    return name, action_types
+
+def _decode_logs(db, rows):
+    """
+    Turns rows of _ENCODED_LOG_SELECT (tuples, in its column order) into dicts
+    with the names, as the movement_logs view shows them.
+    """
+    name, action_types = _log_names(db, rows)
+    return [{
+        "id": log_id, "item_id": item_id, "item_name": name(item_name_id),
+        "action_type": action_types[action_type_id], "quantity_changed": quantity_changed,
+        "resulting_quantity": resulting_quantity, "provider": provider, "cost_per_item": cost_per_item,
+        "details": details, "person_name": name(person_name_id), "timestamp": timestamp,
+        "destination_name": destination_name,
+    } for (log_id, item_id, item_name_id, action_type_id, quantity_changed, resulting_quantity, provider,
+           cost_per_item, details, person_name_id, timestamp, destination_name) in rows]
+
+def _action_type_codes(db, names):
+    """Codes of the named action types; [None] (matching nothing) when none exist."""
+    by_name = {name: code for code, name in _action_types(db).items()}
+    if any(name not in by_name for name in names):
+        by_name = {name: code for code, name in _action_types(db, missing=True).items()}
+    return [by_name[name] for name in names if name in by_name] or [None]
+
+def _build_log_query(filters, db):
+    """
+    Builds the SELECT and FROM parts shared by get_movement_logs and
+    iter_movement_logs. The caller detaches the returned archive_schemas and,
+    when encoded is True, decodes the rows with _decode_logs.
+    """
+    # Date filters compare the raw timestamp text ('YYYY-MM-DD HH:MM:SS...') against
+    # day boundaries so idx_mov_log_timestamp can be used; date(ml.timestamp) cannot.
+    select_query = _ENCODED_LOG_SELECT
+    from_query = """
+        FROM movement_log_entries ml
         LEFT JOIN destinations d ON ml.destination_id = d.id
         LEFT JOIN providers p ON ml.provider_id = p.id
     """
-    count_query = "SELECT COUNT(*) FROM movement_logs ml"
+    # The LEFT JOINs only add names, so the live count skips them.
+    count_query = "FROM movement_log_entries ml"
+    count_tables = ('movement_logs',)
     
     where_clauses = []
     params = []
+    action_types = []
+    date_from = None
+    date_to = None
 
     if filters:
         if filters.get('item_id'):
@@ -57,65 +218,118 @@ def get_movement_logs(filters=None, page=1, page_size=50):
             params.append(filters['item_id'])
         if filters.get('action_type'):
             action_types = [action.strip() for action in filters['action_type'].split(',') if action.strip()]
-            if action_types:
-                placeholders = ', '.join('?' * len(action_types))
-                where_clauses.append(f"ml.action_type IN ({placeholders})")
-                params.extend(action_types)
         if filters.get('provider_id'):
             where_clauses.append("ml.provider_id = ?")
             params.append(filters['provider_id'])
         if filters.get('date_from'):
             try:
                 datetime.strptime(filters['date_from'], '%Y-%m-%d')
-                where_clauses.append("date(ml.timestamp) >= date(?)")
+                where_clauses.append("ml.timestamp >= ?")
                 params.append(filters['date_from'])
+                date_from = filters['date_from']
             except ValueError:
                 print(f"Invalid date_from format: {filters['date_from']}. Should be YYYY-MM-DD.")
         if filters.get('date_to'):
             try:
                 datetime.strptime(filters['date_to'], '%Y-%m-%d')
-                where_clauses.append("date(ml.timestamp) <= date(?)")
+                where_clauses.append("ml.timestamp < date(?, '+1 day')")
                 params.append(filters['date_to'])
+                date_to = filters['date_to']
             except ValueError:
                 print(f"Invalid date_to format: {filters['date_to']}. Should be YYYY-MM-DD.")
         if filters.get('destination_id'):
             where_clauses.append("ml.destination_id = ?")
             params.append(filters['destination_id'])
 
+    archive_schemas = []
+    try:
+        include_archived = bool(filters and filters.get('include_archived'))
+        archives = archive_years_for_range(date_from, date_to, include_archived, db=db)
+        if archives:
+            archive_schemas = attach_archives(db, archives)
+    except Exception as e:
+        print(f"Could not open movement log archives: {e}")
+    if archive_schemas:
+        # The union already carries the provider/destination names.
+        source = combined_logs_source(archive_schemas)
+        select_query = """
+            SELECT ml.id, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed,
+                   ml.resulting_quantity, ml.provider, ml.cost_per_item, ml.details,
+                   ml.person_name, ml.timestamp, ml.destination_name
+        """
+        from_query = f"FROM {source} ml"
+        count_query = from_query
+        count_tables = ('movement_logs', 'movement_log_archives')
+
+    if action_types:
+        if archive_schemas:
+            where_clauses.append(f"ml.action_type IN ({', '.join('?' * len(action_types))})")
+            params.extend(action_types)
+        else:
+            # The codes are bound rather than looked up in a subquery: a single
+            # code is an equality, so idx_mov_log_action_timestamp returns the
+            # page in timestamp order without sorting every match.
+            codes = _action_type_codes(db, action_types)
+            where_clauses.append(f"ml.action_type_id IN ({', '.join('?' * len(codes))})")
+            params.extend(codes)
+
     if where_clauses:
-        base_query += " WHERE " + " AND ".join(where_clauses)
+        from_query += " WHERE " + " AND ".join(where_clauses)
         count_query += " WHERE " + " AND ".join(where_clauses)
+    return {
+        "select": select_query, "from": from_query, "count_from": count_query,
+        "count_tables": count_tables, "params": params, "archive_schemas": archive_schemas,
+        "encoded": not archive_schemas,
+    }
 
-    base_query += " ORDER BY ml.timestamp DESC"
+def get_movement_logs(filters=None, page=1, page_size=50, include_total=True):
+    """
+    Retrieves movement logs with filtering and optional pagination.
+    Archived years are attached and unioned in only when date_from reaches
+    into them or filters['include_archived'] is set. Page totals come from
+    count_cache; total_records is None when include_total is False.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    logs_list = []
+    query = _build_log_query(filters, db)
+    select_query, from_query, params = query['select'], query['from'], query['params']
+    count_query, count_tables, archive_schemas = query['count_from'], query['count_tables'], query['archive_schemas']
+
+    order_query = "ORDER BY ml.timestamp DESC"
     
     try:
         if page is not None and page_size is not None:
             
             offset = (page - 1) * page_size
-            paginated_query = base_query + " LIMIT ? OFFSET ?"
-            query_params = params + [page_size, offset]
-            
-            cursor.execute(count_query, params)
-            total_records = cursor.fetchone()[0]
-            
-            cursor.execute(paginated_query, query_params)
-            logs = cursor.fetchall()
-            for log_entry in logs:
-                logs_list.append(dict(log_entry))
+            # Only a per-item history is small enough for COUNT(*) OVER() to beat
+            # the separate (index-only) COUNT(*) on a cache miss.
+            logs_list, total_records = count_cache.paged_query(
+                cursor, select_query, from_query, order_query, params, page_size, offset,
+                tables=count_tables, include_total=include_total,
+                window_total=bool(filters and filters.get('item_id')), count_from_sql=count_query,
+            )
+            if query['encoded']:
+                logs_list = _decode_logs(db, [tuple(row.values()) for row in logs_list])
             
             return {
                 "logs": logs_list,
                 "total_records": total_records,
                 "page": page,
                 "page_size": page_size,
-                "total_pages": (total_records + page_size - 1) // page_size
+                "total_pages": (total_records + page_size - 1) // page_size if total_records is not None else None
             }
         else:
             
-            cursor.execute(base_query, params)
+            if query['encoded']:
+                cursor.row_factory = None
+            cursor.execute(f"{select_query} {from_query} {order_query}", params)
             logs = cursor.fetchall()
-            for log_entry in logs:
-                logs_list.append(dict(log_entry))
+            if query['encoded']:
+                logs_list = _decode_logs(db, logs)
+            else:
+                for log_entry in logs:
+                    logs_list.append(dict(log_entry))
             
             return {"logs": logs_list}
 
@@ -123,6 +337,35 @@ def get_movement_logs(filters=None, page=1, page_size=50):
         print(f"Database error retrieving movement logs: {e}")
         
         return {"logs": [], "error": str(e), "total_records": 0, "page": page, "total_pages": 0}
+    finally:
+        detach_archives(db, archive_schemas)
+
+def iter_movement_logs(filters=None, db=None, batch_size=ITER_BATCH_SIZE):
+    """
+    Yields the filtered logs newest first, in get_movement_logs' row shape,
+    fetching batch_size rows at a time so memory stays flat however many rows
+    match. Uses its own connection unless one is given (e.g. from a worker thread).
+    """
+    conn = db or get_db_connection()
+    query = _build_log_query(filters, conn)
+    try:
+        cursor = conn.cursor()
+        if query['encoded']:
+            cursor.row_factory = None
+        cursor.execute(f"{query['select']} {query['from']} ORDER BY ml.timestamp DESC", query['params'])
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            if query['encoded']:
+                yield from _decode_logs(conn, rows)
+            else:
+                for row in rows:
+                    yield dict(row)
+    finally:
+        detach_archives(conn, query['archive_schemas'])
+        if db is None:
+            conn.close()
 
 def get_daily_movement_summary():
     """
@@ -137,16 +380,16 @@ def get_daily_movement_summary():
         cursor.execute("""
             SELECT COUNT(*) 
             FROM movement_logs
-            WHERE action_type = 'Addition' AND DATE(timestamp) = ?
-        """, (today_str,))
+            WHERE action_type_id = (SELECT id FROM log_action_types WHERE name = 'Addition') AND timestamp >= ? AND timestamp < date(?, '+1 day')
+        """, (today_str, today_str))
         additions_today = cursor.fetchone()[0]
 
         # Count withdrawals today
         cursor.execute("""
             SELECT COUNT(*)
             FROM movement_logs
-            WHERE action_type = 'Removal' AND DATE(timestamp) = ?
-        """, (today_str,))
+            WHERE action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal') AND timestamp >= ? AND timestamp < date(?, '+1 day')
+        """, (today_str, today_str))
         withdrawals_today = cursor.fetchone()[0]
         
         return {
@@ -0,0 +1,220 @@
+import sqlite3
+from datetime import datetime
+from .db_utils import get_db, get_db_connection
+from . import log_archive_model
+
+# Stock / ledger reconciliation.
+#
+# Every Creation, Addition and Removal log carries the quantity it left
+# (resulting_quantity), so each item's logs form a chain: Creation sets the
+# quantity, an Addition adds quantity_changed and a Removal subtracts it. A run
+# walks the logs newer than the global watermark in id order (the table's own
+# order, so nothing is sorted), BATCH_SIZE logs per read, following every
+# item's chain from its checkpoint and recording the breaks, then compares the
+# end of every chain with items.current_quantity.
+#
+# A break is reported once: the chain continues from the logged value. Items
+# whose older logs were archived start from the archive's opening_quantity.
+
+WATERMARK_STATE_KEY = 'reconciliation_through_log_id'
+LAST_RUN_STATE_KEY = 'reconciliation_last_run_at'
+BATCH_SIZE = 10_000
+# Items whose checkpoints one IN (...) query reads; well under SQLite's bound-parameter limit.
+CHECKPOINT_CHUNK_SIZE = 500
+
+def _expected_quantity(action_type, quantity_changed, previous):
+    """resulting_quantity a log should carry, or None when it cannot be checked."""
+    if action_type == 'Creation':
+        return quantity_changed
+    if previous is None or quantity_changed is None:
+        return None
+    if action_type == 'Addition':
+        return previous + quantity_changed
+    if action_type == 'Removal':
+        return previous - quantity_changed
+    return None
+
+def _get_state(cursor, key):
+    cursor.execute("SELECT value FROM system_state WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _set_state(cursor, key, value):
+    cursor.execute("INSERT OR REPLACE INTO system_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+def _sweep(conn, chains, breaks, from_log_id, through_log_id, full, now) -> int:
+    """
+    Follows the chains through the logs in (from_log_id, through_log_id],
+    BATCH_SIZE logs per read, updating chains (item_id -> [last log id,
+    quantity after it]) and appending the breaks. Returns the logs checked.
+    """
+    # Plain tuples: the sweep can cover millions of rows.
+    read_cursor = conn.cursor()
+    read_cursor.row_factory = None
+
+    def start_chains(item_ids):
+        # The chains a batch starts, from their checkpoints: a reconciliation
+        # checkpoint wins over the archive's opening quantity (sorted last). A
+        # full run starts every chain over, so only the opening quantity counts.
+        starts = dict.fromkeys(item_ids)
+        for start in range(0, len(item_ids), CHECKPOINT_CHUNK_SIZE):
+            chunk = item_ids[start:start + CHECKPOINT_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            read_cursor.execute(f"""
+                SELECT item_id, opening_quantity, 0 AS rank FROM movement_log_checkpoints
+                WHERE item_id IN ({placeholders}) AND opening_quantity IS NOT NULL
+                UNION ALL
+                SELECT item_id, last_quantity, 1 AS rank FROM reconciliation_checkpoints
+                WHERE item_id IN ({placeholders}) AND last_quantity IS NOT NULL AND NOT ?
+                ORDER BY rank
+            """, (*chunk, *chunk, full))
+            starts.update((item_id, quantity) for item_id, quantity, _ in read_cursor.fetchall())
+        for item_id, quantity in starts.items():
+            chains[item_id] = [None, quantity]
+
+    checked = 0
+    while from_log_id < through_log_id:
+        read_cursor.execute("""
+            SELECT id, item_id, action_type, quantity_changed, resulting_quantity
+            FROM movement_logs
+            WHERE id > ? AND id <= ? AND resulting_quantity IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+        """, (from_log_id, through_log_id, BATCH_SIZE))
+        logs = read_cursor.fetchall()
+        if not logs:
+            break
+        start_chains([item_id for item_id in dict.fromkeys(log[1] for log in logs) if item_id not in chains])
+        for log_id, item_id, action_type, quantity_changed, resulting_quantity in logs:
+            chain = chains[item_id]
+            expected = _expected_quantity(action_type, quantity_changed, chain[1])
+            if expected is not None and expected != resulting_quantity:
+                breaks.append((item_id, log_id, expected, resulting_quantity, now))
+            chain[0] = log_id
+            chain[1] = resulting_quantity
+        checked += len(logs)
+        from_log_id = logs[-1][0]
+    return checked
+
+def run_reconciliation(full: bool = False, db=None) -> dict:
+    """
+    Checks the logs added since the last run (all logs when full is True or
+    on the first run) and refreshes the quantity mismatches of every item.
+
+    Logs are append-only, so the logs up to the newest one at the start are
+    swept without the write lock, one batch per read. The write lock is then
+    held only to check the logs added meanwhile, store the results and compare
+    with current_quantity, so no adjustment can land between the end of the
+    chains and that comparison. If another run finished or logs were archived
+    meanwhile, the run starts over. Uses its own connection unless one is
+    given. Returns counts for the run.
+    """
+    conn = db or get_db_connection()
+    cursor = conn.cursor()
+    try:
+        watermark = 0 if full else int(_get_state(cursor, WATERMARK_STATE_KEY) or 0)
+        catalog = log_archive_model.get_archive_catalog(conn)
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+        swept_through = cursor.fetchone()[0]
+        now = datetime.now()
+
+        chains = {}
+        breaks = []
+        checked = _sweep(conn, chains, breaks, watermark, swept_through, watermark == 0, now)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        if (not full and int(_get_state(cursor, WATERMARK_STATE_KEY) or 0) != watermark) \
+                or log_archive_model.get_archive_catalog(conn) != catalog:
+            conn.rollback()
+            return run_reconciliation(full=full, db=conn)
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+        latest_log_id = cursor.fetchone()[0]
+        # Logs added during the sweep; checked before the write lock is released.
+        checked += _sweep(conn, chains, breaks, swept_through, latest_log_id, watermark == 0, now)
+
+        if watermark == 0:
+            cursor.execute("DELETE FROM reconciliation_checkpoints")
+            cursor.execute("DELETE FROM reconciliation_issues")
+        for start in range(0, len(breaks), BATCH_SIZE):
+            cursor.executemany("""
+                INSERT INTO reconciliation_issues (item_id, log_id, issue_type, expected_quantity, actual_quantity, detected_at)
+                VALUES (?, ?, 'chain_break', ?, ?, ?)
+            """, breaks[start:start + BATCH_SIZE])
+
+        checkpoints = [(item_id, last_log_id, quantity) for item_id, (last_log_id, quantity) in chains.items()]
+        for start in range(0, len(checkpoints), BATCH_SIZE):
+            cursor.executemany("""
+                INSERT INTO reconciliation_checkpoints (item_id, last_log_id, last_quantity) VALUES (?, ?, ?)
+                ON CONFLICT(item_id) DO UPDATE SET last_log_id = excluded.last_log_id, last_quantity = excluded.last_quantity
+            """, checkpoints[start:start + BATCH_SIZE])
+
+        # The end of the chain is the last checked quantity, or the archive's
+        # opening quantity for items whose live logs carry no quantity.
+        cursor.execute("DELETE FROM reconciliation_issues WHERE issue_type = 'quantity_mismatch'")
+        cursor.execute("""
+            INSERT INTO reconciliation_issues (item_id, issue_type, expected_quantity, actual_quantity, detected_at)
+            SELECT i.id, 'quantity_mismatch', COALESCE(rc.last_quantity, mc.opening_quantity, 0), i.current_quantity, ?
+            FROM items i
+            LEFT JOIN reconciliation_checkpoints rc ON rc.item_id = i.id
+            LEFT JOIN movement_log_checkpoints mc ON mc.item_id = i.id
+            WHERE i.current_quantity IS NOT COALESCE(rc.last_quantity, mc.opening_quantity, 0)
+        """, (now,))
+        mismatches = cursor.rowcount
+
+        _set_state(cursor, WATERMARK_STATE_KEY, latest_log_id)
+        _set_state(cursor, LAST_RUN_STATE_KEY, now.isoformat())
+        conn.commit()
+        result = {"full": watermark == 0, "from_log_id": watermark, "through_log_id": latest_log_id,
+                  "logs_checked": checked, "quantity_mismatches": mismatches}
+        print(f"Reconciliation checked {checked} log(s) through id {latest_log_id}; {mismatches} quantity mismatch(es).")
+        return result
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.rollback()
+        print(f"Database error in reconciliation: {e}")
+        raise e
+    finally:
+        if db is None:
+            conn.close()
+
+def get_reconciliation_report(issue_type: str | None = None, item_id: int | None = None,
+                              limit: int = 100, offset: int = 0) -> dict:
+    """Open discrepancies (newest first) with the state of the last run."""
+    db = get_db()
+    cursor = db.cursor()
+    conditions, params = [], []
+    if issue_type:
+        conditions.append("issue_type = ?")
+        params.append(issue_type)
+    if item_id:
+        conditions.append("item_id = ?")
+        params.append(item_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cursor.execute("SELECT issue_type, COUNT(*) AS count FROM reconciliation_issues GROUP BY issue_type")
+    counts = {"chain_break": 0, "quantity_mismatch": 0}
+    counts.update({row['issue_type']: row['count'] for row in cursor.fetchall()})
+
+    # The page is picked from reconciliation_issues first, so only its rows are joined.
+    cursor.execute(f"""
+        SELECT r.id, r.item_id, i.name AS item_name, r.log_id, ml.timestamp AS log_timestamp, ml.action_type,
+               r.issue_type, r.expected_quantity, r.actual_quantity, r.detected_at
+        FROM (SELECT * FROM reconciliation_issues {where} ORDER BY id DESC LIMIT ? OFFSET ?) r
+        JOIN items i ON i.id = r.item_id
+        LEFT JOIN movement_logs ml ON ml.id = r.log_id
+        ORDER BY r.id DESC
+    """, params + [limit, offset])
+    issues = [dict(row) for row in cursor.fetchall()]
+
+    watermark = _get_state(cursor, WATERMARK_STATE_KEY)
+    return {
+        "last_run_at": _get_state(cursor, LAST_RUN_STATE_KEY),
+        "through_log_id": int(watermark) if watermark is not None else None,
+        "counts": counts,
+        "issues": issues,
+    }
+
+if __name__ == '__main__':
+    # For scheduled (e.g. nightly) runs outside the app: python -m app.models.reconciliation_model [--full]
+    import sys
+    run_reconciliation(full='--full' in sys.argv)
@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from .db_utils import get_db
+from . import barcode_index, item_model
+
+# Scan sessions for the dispatch and receiving desks.
+#
+# Scans are kept in memory and aggregated per item: scanning a barcode ten
+# times only bumps one counter, with no database write. Closing the session
+# applies one addition or removal per item (one movement log row each) in a
+# single transaction. Open sessions do not survive an application restart.
+
+ADJUSTMENT_TYPES = ('addition', 'removal')
+
+_lock = threading.Lock()
+# session id -> session dict; each session's 'lines' maps item_id -> line dict.
+_sessions = {}
+
+def _public(session):
+    lines = list(session['lines'].values())
+    return {
+        **{key: value for key, value in session.items() if key not in ('lines', 'closing')},
+        "item_count": len(lines),
+        "total_quantity": sum(line['quantity'] for line in lines),
+        "lines": [dict(line) for line in lines],
+    }
+
+def _get_open(session_id):
+    session = _sessions.get(session_id)
+    if session is not None and session['closing']:
+        raise ValueError("The scan session is being closed.")
+    return session
+
+def create_session(adjustment_type: str, person_name: str | None, destination_id: int | None = None,
+                   provider_id: int | None = None) -> dict:
+    """Opens a session whose scans become additions (from provider_id) or removals (to destination_id)."""
+    if adjustment_type not in ADJUSTMENT_TYPES:
+        raise ValueError("adjustment_type must be 'addition' or 'removal'.")
+    session = {
+        "id": uuid.uuid4().hex,
+        "adjustment_type": adjustment_type,
+        "person_name": person_name,
+        "destination_id": destination_id if adjustment_type == 'removal' else None,
+        "provider_id": provider_id if adjustment_type == 'addition' else None,
+        "created_at": datetime.now().isoformat(sep=' '),
+        "scan_count": 0,
+        "closing": False,
+        "lines": {},
+    }
+    with _lock:
+        _sessions[session['id']] = session
+        return _public(session)
+
+def list_sessions() -> list[dict]:
+    """Open sessions with their totals, oldest first (without lines)."""
+    with _lock:
+        sessions = [_public(session) for session in _sessions.values()]
+    for session in sessions:
+        del session['lines']
+    return sessions
+
+def get_session(session_id: str) -> dict | None:
+    with _lock:
+        session = _sessions.get(session_id)
+        return _public(session) if session is not None else None
+
+def add_scan(session_id: str, barcode: str, quantity: int = 1) -> dict | None:
+    """
+    Adds quantity (1 per scan; negative to undo) of the item with this
+    barcode to the session and returns its line. Looks the barcode up in the
+    in-memory index. Removals are checked against the stock on hand so the
+    desk hears about a shortage at the scan, not when the session closes.
+    Returns None when the session does not exist.
+    """
+    item = item_model.lookup_item_by_barcode(barcode)
+    if item is None:
+        raise ValueError(f"No active item has the barcode '{barcode}'.")
+    with _lock:
+        session = _get_open(session_id)
+        if session is None:
+            return None
+        line = session['lines'].get(item['id'])
+        total = (line['quantity'] if line else 0) + quantity
+        if total < 0:
+            raise ValueError(f"'{item['name']}' has only {total - quantity} scanned in this session.")
+        if session['adjustment_type'] == 'removal' and total > item['current_quantity']:
+            raise ValueError(f"Only {item['current_quantity']} of '{item['name']}' in stock.")
+        if line is None:
+            line = session['lines'][item['id']] = {
+                "item_id": item['id'], "name": item['name'], "barcode": item['barcode'],
+                "unit_name": item.get('unit_name'), "quantity": 0, "scan_count": 0,
+            }
+        line['quantity'] = total
+        line['scan_count'] += 1
+        line['current_quantity'] = item['current_quantity']
+        session['scan_count'] += 1
+        result = dict(line)
+        if total == 0:
+            del session['lines'][item['id']]
+        return result
+
+def discard_session(session_id: str) -> bool:
+    """Drops a session and its scans without touching stock."""
+    with _lock:
+        session = _get_open(session_id)
+        if session is None:
+            return False
+        del _sessions[session_id]
+        return True
+
+def close_session(session_id: str) -> dict | None:
+    """
+    Applies the session: one adjustment and one movement log row per scanned
+    item, all in one transaction, then drops the session. If any item lacks
+    stock nothing is applied and the session stays open.
+    """
+    with _lock:
+        session = _get_open(session_id)
+        if session is None:
+            return None
+        session['closing'] = True
+        lines = list(session['lines'].values())
+
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        items = item_model.get_items_by_ids([line['item_id'] for line in lines], db=db)
+        for line in lines:
+            item = items.get(line['item_id'])
+            if item is None or item['status'] != 'active':
+                raise ValueError(f"'{line['name']}' is no longer active.")
+            try:
+                item_model.apply_quantity_change(
+                    db, item, line['quantity'], session['adjustment_type'], session['person_name'],
+                    provider_id=session['provider_id'], destination_id=session['destination_id'],
+                    details=f"Scan session: {line['scan_count']} scan(s).")
+            except ValueError:
+                raise ValueError(f"Only {item['current_quantity']} of '{item['name']}' in stock, {line['quantity']} scanned.")
+        db.commit()
+    except (sqlite3.Error, ValueError) as e:
+        if db.in_transaction:
+            db.rollback()
+        with _lock:
+            session['closing'] = False
+        raise e
+
+    with _lock:
+        _sessions.pop(session_id, None)
+    adjusted = item_model.get_items_by_ids([line['item_id'] for line in lines], db=db)
+    for item in adjusted.values():
+        barcode_index.refresh_item(item)
+    return {**_public(session), "closed_at": datetime.now().isoformat(sep=' '), "items": list(adjusted.values())}
@@ -0,0 +1,173 @@
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from flask import g, has_app_context, has_request_context, request
+from .. import metrics
+from . import count_cache
+
+# Statements slower than this are written to the slow-query log.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('WAREHOUSE_SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+# Number of slowest statements reported per request.
+SLOWEST_STATEMENTS = 3
+
+_slow_query_logger = None
+
+def _get_slow_query_logger():
+    """Creates the rotating slow-query logger on first use."""
+    global _slow_query_logger
+    if _slow_query_logger is None:
+        if os.getenv('APPDATA'):
+            log_dir = Path(os.getenv('APPDATA')) / 'WarehouseApp' / 'logs'
+        else:
+            log_dir = Path.home() / '.warehouse_app' / 'logs'
+        log_dir.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(log_dir / 'slow_queries.log', maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                      backupCount=SLOW_QUERY_LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        logger = logging.getLogger('warehouse.slow_queries')
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _slow_query_logger = logger
+    return _slow_query_logger
+
+def _record_statement(sql: str, duration: float):
+    """Adds a finished statement to the current request's stats and the slow-query log."""
+    if has_app_context():
+        stats = g.get('sql_stats')
+        if stats is not None:
+            stats['count'] += 1
+            stats['total'] += duration
+            entry = (duration, stats['count'], sql)
+            if len(stats['slowest']) < SLOWEST_STATEMENTS:
+                heapq.heappush(stats['slowest'], entry)
+            elif duration > stats['slowest'][0][0]:
+                heapq.heapreplace(stats['slowest'], entry)
+
+    if duration * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        try:
+            endpoint = f"{request.method} {request.path}" if has_request_context() else "-"
+            _get_slow_query_logger().warning("%.1f ms [%s] %s", duration * 1000, endpoint, " ".join(sql.split()))
+        except OSError as e:
+            print(f"Could not write slow-query log: {e}")
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that times every statement it executes and notes the tables it writes."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - start)
+            self.connection._note_writes(sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - start)
+            self.connection._note_writes(sql)
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursors (including the execute() shortcuts) are traced."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_open = True
+        # Tables written by the open transaction; their count_cache versions are
+        # bumped on commit and the set is dropped on rollback.
+        self._pending_writes = set()
+        # Callbacks waiting for the open transaction to commit (see after_commit).
+        self._commit_callbacks = []
+        metrics.DB_CONNECTIONS_OPENED.inc()
+        metrics.DB_CONNECTIONS_OPEN.inc()
+
+    def _note_writes(self, sql):
+        self._pending_writes |= count_cache.written_tables(sql)
+        # Outside a transaction the statement (or a literal COMMIT) is already durable.
+        if not self.in_transaction:
+            self._flush_writes()
+
+    def _flush_writes(self):
+        if self._pending_writes:
+            count_cache.bump_tables(self._pending_writes)
+            self._pending_writes = set()
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback):
+        """Runs callback once the open transaction commits (now, outside one); a rollback drops it."""
+        if self.in_transaction:
+            self._commit_callbacks.append(callback)
+        else:
+            callback()
+
+    def commit(self):
+        super().commit()
+        self._flush_writes()
+
+    def rollback(self):
+        super().rollback()
+        self._pending_writes = set()
+        self._commit_callbacks = []
+
+    def executescript(self, sql_script):
+        try:
+            return super().executescript(sql_script)
+        finally:
+            # Scripts commit on their own; treat whatever they touched as changed.
+            self._pending_writes |= count_cache.written_tables(sql_script)
+            self._flush_writes()
+
+    def close(self):
+        self._pending_writes = set()
+        self._commit_callbacks = []
+        super().close()
+        if self._metrics_open:
+            self._metrics_open = False
+            metrics.DB_CONNECTIONS_OPEN.dec()
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _describe(sql: str) -> str:
+    """Short ASCII label for a statement, safe to put in a header."""
+    label = " ".join(sql.split())[:60]
+    return re.sub(r'[^A-Za-z0-9_ .,()*=<>?-]', '', label)
+
+def server_timing_header(stats: dict) -> str:
+    """Formats the request's SQL stats as a Server-Timing header value."""
+    metrics = [f'db;desc="{stats["count"]} queries";dur={stats["total"] * 1000:.2f}']
+    for rank, (duration, _, sql) in enumerate(sorted(stats['slowest'], reverse=True), start=1):
+        metrics.append(f'sql-{rank};desc="{_describe(sql)}";dur={duration * 1000:.2f}')
+    return ", ".join(metrics)
+
+def init_app(app):
+    """Registers the hooks that collect SQL stats for each request."""
+
+    @app.before_request
+    def start_sql_stats():
+        g.sql_stats = {'count': 0, 'total': 0.0, 'slowest': []}
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.get('sql_stats')
+        if stats is not None and stats['count']:
+            response.headers.add('Server-Timing', server_timing_header(stats))
+        return response
@@ -0,0 +1,305 @@
+import sqlite3
+from datetime import datetime
+from .db_utils import get_db
+from . import barcode_index, item_model
+
+# Stocktake (cycle count) sessions.
+#
+# Opening a session snapshots the expected quantity of every item in scope
+# together with the newest movement log id. Counting can go on while the
+# warehouse keeps operating: an item's book quantity at the moment it was
+# counted is its snapshot plus the Additions and Removals logged after the
+# snapshot up to counted_at, so movements during the count window are not
+# mistaken for variances. Variances are computed for all lines in one query
+# and posted as ordinary adjustments in one transaction.
+
+COUNT_MODES = ('set', 'add')
+
+_NET_MOVEMENT = "CASE ml.action_type WHEN 'Addition' THEN ml.quantity_changed WHEN 'Removal' THEN -ml.quantity_changed ELSE 0 END"
+
+# Parameters: snapshot_log_id, session_id (movements), session_id (lines), then {conditions}.
+_VARIANCES = f"""
+    SELECT l.item_id, i.name, i.barcode, l.expected_quantity, l.counted_quantity, l.counted_at, l.counted_by,
+           COALESCE(moved.net_quantity, 0) AS movements_since_snapshot,
+           l.expected_quantity + COALESCE(moved.net_quantity, 0) AS book_quantity,
+           l.counted_quantity - (l.expected_quantity + COALESCE(moved.net_quantity, 0)) AS variance,
+           i.current_quantity
+    FROM stocktake_lines l
+    JOIN items i ON i.id = l.item_id
+    LEFT JOIN (
+        SELECT ml.item_id, SUM({_NET_MOVEMENT}) AS net_quantity
+        FROM stocktake_lines counted
+        JOIN movement_logs ml ON ml.item_id = counted.item_id AND ml.id > ? AND ml.timestamp <= counted.counted_at
+        WHERE counted.session_id = ? AND counted.counted_at IS NOT NULL
+        GROUP BY ml.item_id
+    ) moved ON moved.item_id = l.item_id
+    WHERE l.session_id = ? {{conditions}}
+"""
+
+def _get_session_row(cursor, session_id):
+    cursor.execute("SELECT * FROM stocktake_sessions WHERE id = ?", (session_id,))
+    return cursor.fetchone()
+
+def _require_open(cursor, session_id):
+    session = _get_session_row(cursor, session_id)
+    if session is None:
+        return None
+    if session['status'] != 'open':
+        raise ValueError(f"Stocktake {session_id} is {session['status']}.")
+    return session
+
+def create_session(name: str, person_name: str | None, sub_category_id: int | None = None,
+                   main_category_id: int | None = None, item_ids: list[int] | None = None) -> dict:
+    """
+    Opens a session over the active items of a sub-category, a main category,
+    an explicit ID list, or all active items, and snapshots their quantities.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    conditions, params = ["i.status = 'active'"], []
+    if sub_category_id is not None:
+        conditions.append("i.sub_category_id = ?")
+        params.append(sub_category_id)
+    if main_category_id is not None:
+        conditions.append("i.sub_category_id IN (SELECT id FROM categories WHERE id = ? OR parent_id = ?)")
+        params.extend([main_category_id, main_category_id])
+    snapshot = f"""
+        INSERT INTO stocktake_lines (session_id, item_id, expected_quantity)
+        SELECT ?, i.id, i.current_quantity FROM items i WHERE {' AND '.join(conditions)}
+    """
+    try:
+        # The write lock keeps the quantities and snapshot_log_id consistent with each other.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+        snapshot_log_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO stocktake_sessions (name, snapshot_log_id, created_at, created_by) VALUES (?, ?, ?, ?)",
+                       (name, snapshot_log_id, datetime.now(), person_name))
+        session_id = cursor.lastrowid
+        if item_ids is not None:
+            unique_ids = list(dict.fromkeys(item_ids))
+            for start in range(0, len(unique_ids), item_model.LOOKUP_CHUNK_SIZE):
+                chunk = unique_ids[start:start + item_model.LOOKUP_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f"{snapshot} AND i.id IN ({placeholders})", [session_id] + params + chunk)
+        else:
+            cursor.execute(snapshot, [session_id] + params)
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise e
+    return get_session(session_id)
+
+def list_sessions(status: str | None = None) -> list[dict]:
+    """Sessions, newest first, with their line and counted line totals."""
+    db = get_db()
+    cursor = db.cursor()
+    where = "WHERE s.status = ?" if status else ""
+    cursor.execute(f"""
+        SELECT s.*, COUNT(l.item_id) AS line_count, COUNT(l.counted_quantity) AS counted_count
+        FROM stocktake_sessions s
+        LEFT JOIN stocktake_lines l ON l.session_id = s.id
+        {where}
+        GROUP BY s.id
+        ORDER BY s.id DESC
+    """, (status,) if status else ())
+    return [dict(row) for row in cursor.fetchall()]
+
+def get_session(session_id: int) -> dict | None:
+    db = get_db()
+    cursor = db.cursor()
+    session = _get_session_row(cursor, session_id)
+    if session is None:
+        return None
+    cursor.execute("""
+        SELECT COUNT(*) AS line_count, COUNT(counted_quantity) AS counted_count
+        FROM stocktake_lines WHERE session_id = ?
+    """, (session_id,))
+    return {**dict(session), **dict(cursor.fetchone())}
+
+def record_counts(session_id: int, counts: list[dict], person_name: str | None, mode: str = 'set') -> dict | None:
+    """
+    Records counted quantities for many lines at once. Each count names the
+    item by item_id or barcode. mode 'set' replaces the counted quantity
+    (counted_at may be given for counts taken earlier, e.g. an uploaded
+    sheet; a UTC offset is converted to local time); mode 'add' adds to it, one scan at a time. Returns None when the
+    session does not exist; items outside the session are reported, not added.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"mode must be one of {', '.join(COUNT_MODES)}.")
+    db = get_db()
+    cursor = db.cursor()
+    session = _require_open(cursor, session_id)
+    if session is None:
+        return None
+
+    now = datetime.now()
+    created_at = datetime.fromisoformat(str(session['created_at']))
+    barcodes = [count['barcode'] for count in counts if count.get('item_id') is None and count.get('barcode')]
+    by_barcode = item_model.get_items_by_barcodes(barcodes, db=db) if barcodes else {}
+
+    updates, unknown_barcodes = [], []
+    for count in counts:
+        item_id = count.get('item_id')
+        if item_id is None:
+            item = by_barcode.get(count.get('barcode'))
+            if item is None:
+                unknown_barcodes.append(count.get('barcode'))
+                continue
+            item_id = item['id']
+        quantity = count.get('counted_quantity', 1 if mode == 'add' else None)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or (quantity < 0 and mode == 'set'):
+            raise ValueError(f"Invalid counted_quantity for item {item_id}.")
+        counted_at = now
+        if count.get('counted_at') and mode == 'set':
+            counted_at = datetime.fromisoformat(str(count['counted_at']))
+            if counted_at.tzinfo is not None:
+                # Session and log timestamps are naive local time.
+                counted_at = counted_at.astimezone().replace(tzinfo=None)
+            if counted_at < created_at or counted_at > now:
+                raise ValueError(f"counted_at for item {item_id} must fall between the session start and now.")
+        updates.append((quantity, counted_at, person_name, session_id, int(item_id)))
+
+    in_session = set()
+    item_ids = list(dict.fromkeys(update[4] for update in updates))
+    for start in range(0, len(item_ids), item_model.LOOKUP_CHUNK_SIZE):
+        chunk = item_ids[start:start + item_model.LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f"SELECT item_id FROM stocktake_lines WHERE session_id = ? AND item_id IN ({placeholders})",
+                       [session_id] + chunk)
+        in_session.update(row['item_id'] for row in cursor.fetchall())
+    updates = [update for update in updates if update[4] in in_session]
+
+    quantity_expression = "COALESCE(counted_quantity, 0) + ?" if mode == 'add' else "?"
+    try:
+        cursor.executemany(f"""
+            UPDATE stocktake_lines SET counted_quantity = {quantity_expression}, counted_at = ?, counted_by = ?
+            WHERE session_id = ? AND item_id = ?
+        """, updates)
+        if mode == 'add':
+            cursor.execute("""
+                SELECT item_id FROM stocktake_lines WHERE session_id = ? AND counted_quantity < 0
+            """, (session_id,))
+            negative = [row['item_id'] for row in cursor.fetchall()]
+            if negative:
+                raise ValueError(f"Counted quantity cannot go below zero (items {negative}).")
+        db.commit()
+    except (sqlite3.Error, ValueError) as e:
+        db.rollback()
+        raise e
+
+    return {
+        "recorded": len(updates),
+        "not_in_session": [item_id for item_id in item_ids if item_id not in in_session],
+        "unknown_barcodes": list(dict.fromkeys(unknown_barcodes)),
+    }
+
+def get_variances(session_id: int, only_differences: bool = False, include_uncounted: bool = False,
+                  limit: int | None = None, offset: int = 0) -> dict | None:
+    """
+    Expected, book and counted quantity with the variance of every line,
+    largest absolute variance first. The book quantity follows the movements
+    logged between the snapshot and each count; posted sessions return the
+    values that were posted.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    session = _get_session_row(cursor, session_id)
+    if session is None:
+        return None
+
+    conditions = []
+    if not include_uncounted:
+        conditions.append("l.counted_quantity IS NOT NULL")
+    if session['status'] == 'posted':
+        query = """
+            SELECT l.item_id, i.name, i.barcode, l.expected_quantity, l.counted_quantity, l.counted_at, l.counted_by,
+                   l.book_quantity - l.expected_quantity AS movements_since_snapshot,
+                   l.book_quantity, l.variance, i.current_quantity
+            FROM stocktake_lines l JOIN items i ON i.id = l.item_id
+            WHERE l.session_id = ? {conditions}
+        """
+        params = [session_id]
+        if only_differences:
+            conditions.append("l.variance != 0")
+    else:
+        query = _VARIANCES
+        params = [session['snapshot_log_id'], session_id, session_id]
+        if only_differences:
+            conditions.append("l.counted_quantity != l.expected_quantity + COALESCE(moved.net_quantity, 0)")
+    where = "".join(f" AND {condition}" for condition in conditions)
+
+    cursor.execute(f"""
+        SELECT COUNT(*) AS line_count, COALESCE(SUM(ABS(variance)), 0) AS absolute_variance,
+               COALESCE(SUM(variance), 0) AS net_variance,
+               COALESCE(SUM(CASE WHEN variance != 0 THEN 1 ELSE 0 END), 0) AS lines_with_variance
+        FROM ({query.format(conditions=where)})
+    """, params)
+    summary = dict(cursor.fetchone())
+    cursor.execute(f"""
+        {query.format(conditions=where)}
+        ORDER BY ABS(variance) DESC, l.item_id
+        LIMIT ? OFFSET ?
+    """, params + [limit if limit is not None else -1, offset])
+    return {"session": dict(session), "summary": summary, "lines": [dict(row) for row in cursor.fetchall()]}
+
+def post_session(session_id: int, person_name: str | None) -> dict | None:
+    """
+    Posts the variance of every counted line as an Addition or Removal (with
+    its movement log and valuation update) and closes the session, all in one
+    transaction. Uncounted lines are left untouched.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    adjusted_ids = []
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        session = _require_open(cursor, session_id)
+        if session is None:
+            db.rollback()
+            return None
+        cursor.execute(_VARIANCES.format(conditions="AND l.counted_quantity IS NOT NULL"),
+                       (session['snapshot_log_id'], session_id, session_id))
+        lines = cursor.fetchall()
+
+        details = f"Stocktake #{session_id} ({session['name']})"
+        for line in lines:
+            variance = line['variance']
+            if variance == 0:
+                continue
+            item = {'id': line['item_id'], 'name': line['name'], 'current_quantity': line['current_quantity']}
+            try:
+                item_model.apply_quantity_change(
+                    db, item, abs(variance), 'addition' if variance > 0 else 'removal', person_name,
+                    details=f"{details}: counted {line['counted_quantity']}, book {line['book_quantity']}.")
+            except ValueError as e:
+                raise ValueError(f"Cannot post variance {variance} for item {line['item_id']} ({line['name']}): {e}")
+            adjusted_ids.append(line['item_id'])
+
+        cursor.executemany("UPDATE stocktake_lines SET book_quantity = ?, variance = ? WHERE session_id = ? AND item_id = ?",
+                           [(line['book_quantity'], line['variance'], session_id, line['item_id']) for line in lines])
+        cursor.execute("UPDATE stocktake_sessions SET status = 'posted', posted_at = ?, posted_by = ? WHERE id = ?",
+                       (datetime.now(), person_name, session_id))
+        db.commit()
+    except (sqlite3.Error, ValueError) as e:
+        if db.in_transaction:
+            db.rollback()
+        raise e
+
+    for item in item_model.get_items_by_ids(adjusted_ids, db=db).values():
+        barcode_index.refresh_item(item)
+    return {
+        "session": get_session(session_id),
+        "counted_lines": len(lines),
+        "adjusted_items": len(adjusted_ids),
+        "net_variance": sum(line['variance'] for line in lines),
+    }
+
+def cancel_session(session_id: int) -> dict | None:
+    """Closes an open session without posting anything."""
+    db = get_db()
+    cursor = db.cursor()
+    if _require_open(cursor, session_id) is None:
+        return None
+    cursor.execute("UPDATE stocktake_sessions SET status = 'cancelled' WHERE id = ?", (session_id,))
+    db.commit()
+    return get_session(session_id)
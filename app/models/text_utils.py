@@ -0,0 +1,27 @@
+import re
+
+# Arabic diacritics (tashkeel), superscript alef and tatweel carry no meaning
+# for matching item names and are frequently typed inconsistently.
+_ARABIC_MARKS = re.compile(r'[\u064B-\u0652\u0670\u0640]')
+_ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+})
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_name(name: str | None) -> str | None:
+    """
+    Returns the key used to compare item names for duplicates.
+    Case-folds Latin text, strips Arabic diacritics/tatweel, unifies the common
+    alef/yeh/teh marbuta spelling variants and collapses whitespace.
+    """
+    if name is None:
+        return None
+    normalized = _ARABIC_MARKS.sub('', name)
+    normalized = normalized.translate(_ARABIC_LETTER_VARIANTS)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return normalized.casefold()
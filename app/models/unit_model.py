@@ -1,5 +1,6 @@
 import sqlite3
 from .db_utils import get_db
+from . import barcode_index
 
 def add_unit(name: str) -> dict | None:
     """Adds a new unit to the database.
@@ -48,6 +49,8 @@ def update_unit(unit_id: int, name: str) -> dict | None:
     try:
         cursor.execute("UPDATE units SET name = ? WHERE id = ?", (name, unit_id))
         db.commit()
+        # Indexed barcode records carry the unit/category name.
+        barcode_index.invalidate()
         if cursor.rowcount > 0:
             return {"id": unit_id, "name": name}
         return None
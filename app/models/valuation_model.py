@@ -0,0 +1,352 @@
+import sqlite3
+from collections import deque
+from datetime import datetime
+from .db_utils import get_db, get_db_connection
+from . import log_archive_model
+
+# Stock valuation, maintained incrementally.
+#
+# Every receipt (item Creation or Addition) opens a FIFO cost layer and moves
+# the item's weighted average cost; every Removal consumes the oldest layers.
+# item_valuation holds the per-item running totals, so stock value is a sum
+# over one row per item instead of a replay of the movement log.
+#
+# Receipt cost is the log's cost_per_item, or items.cost for the Creation row.
+# A receipt without a known cost opens an unvalued layer and leaves the
+# average unchanged.
+
+BACKFILL_STATE_KEY = 'valuation_backfilled_at'
+# Items whose history one replay read covers. Each read is its own short
+# statement, so writers are only held off for one range at a time.
+BACKFILL_ITEMS_PER_READ = 1000
+
+def _next_average(quantity, average_cost, received, unit_cost):
+    """Weighted average cost after receiving `received` units at unit_cost onto `quantity` units."""
+    if unit_cost is None:
+        return average_cost
+    if average_cost is None or quantity <= 0:
+        return unit_cost
+    return (quantity * average_cost + received * unit_cost) / (quantity + received)
+
+# The backfill state key is never removed once committed, so a True answer is
+# kept for the process and every later write skips the system_state lookup.
+# Only an answer read outside a transaction (or the backfill's own commit) sets
+# it: inside one, the key may be the backfill's uncommitted write.
+_backfilled = False
+
+def is_backfilled(db=None) -> bool:
+    """Whether backfill() has run; the read functions below need it. Uses get_db() unless given a connection."""
+    global _backfilled
+    if _backfilled:
+        return True
+    if db is None:
+        db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT 1 FROM system_state WHERE key = ?", (BACKFILL_STATE_KEY,))
+    backfilled = cursor.fetchone() is not None
+    if backfilled and not db.in_transaction:
+        _backfilled = True
+    return backfilled
+
+def _get_state(cursor, item_id):
+    cursor.execute("SELECT quantity, average_cost, fifo_value, unvalued_quantity FROM item_valuation WHERE item_id = ?", (item_id,))
+    row = cursor.fetchone()
+    return tuple(row) if row else (0, None, 0.0, 0)
+
+def _save_state(cursor, item_id, quantity, average_cost, fifo_value, unvalued_quantity):
+    cursor.execute("""
+        INSERT INTO item_valuation (item_id, quantity, average_cost, fifo_value, unvalued_quantity, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(item_id) DO UPDATE SET
+            quantity = excluded.quantity,
+            average_cost = excluded.average_cost,
+            fifo_value = excluded.fifo_value,
+            unvalued_quantity = excluded.unvalued_quantity,
+            updated_at = excluded.updated_at
+    """, (item_id, quantity, average_cost, fifo_value, unvalued_quantity, datetime.now()))
+
+def record_receipt(db, item_id: int, quantity: int, unit_cost: float | None, received_at=None):
+    """
+    Adds received units to the item's valuation within the caller's transaction.
+    Does nothing until the backfill has run; the backfill replays the log instead.
+    """
+    if not is_backfilled(db):
+        return
+    cursor = db.cursor()
+    on_hand, average_cost, fifo_value, unvalued_quantity = _get_state(cursor, item_id)
+    average_cost = _next_average(on_hand, average_cost, quantity, unit_cost)
+    if quantity > 0:
+        cursor.execute(
+            "INSERT INTO cost_layers (item_id, received_at, unit_cost, original_quantity, remaining_quantity) VALUES (?, ?, ?, ?, ?)",
+            (item_id, received_at or datetime.now(), unit_cost, quantity, quantity))
+        if unit_cost is None:
+            unvalued_quantity += quantity
+        else:
+            fifo_value += quantity * unit_cost
+    _save_state(cursor, item_id, on_hand + quantity, average_cost, fifo_value, unvalued_quantity)
+
+def record_issue(db, item_id: int, quantity: int):
+    """
+    Removes units from the item's valuation, consuming the oldest cost layers first,
+    within the caller's transaction. Does nothing until the backfill has run.
+    """
+    if not is_backfilled(db):
+        return
+    cursor = db.cursor()
+    on_hand, average_cost, fifo_value, unvalued_quantity = _get_state(cursor, item_id)
+    cursor.execute("SELECT id, unit_cost, remaining_quantity FROM cost_layers WHERE item_id = ? ORDER BY id", (item_id,))
+    outstanding = quantity
+    emptied = []
+    for layer_id, unit_cost, remaining in cursor.fetchall():
+        if outstanding <= 0:
+            break
+        taken = min(remaining, outstanding)
+        outstanding -= taken
+        if unit_cost is None:
+            unvalued_quantity -= taken
+        else:
+            fifo_value -= taken * unit_cost
+        if taken == remaining:
+            emptied.append((layer_id,))
+        else:
+            cursor.execute("UPDATE cost_layers SET remaining_quantity = ? WHERE id = ?", (remaining - taken, layer_id))
+    if emptied:
+        cursor.executemany("DELETE FROM cost_layers WHERE id = ?", emptied)
+    # Rounding drift from repeated float subtraction must not leave tiny negative values.
+    fifo_value = max(fifo_value, 0.0)
+    _save_state(cursor, item_id, max(on_hand - quantity, 0), average_cost, fifo_value, unvalued_quantity)
+
+_REPLAY_SQL = """
+    SELECT ml.item_id, ml.action_type, ml.quantity_changed, ml.timestamp,
+           COALESCE(ml.cost_per_item, CASE WHEN ml.action_type = 'Creation' THEN i.cost END) AS unit_cost
+    FROM {source} ml
+    JOIN items i ON i.id = ml.item_id
+    WHERE ml.action_type IN ('Creation', 'Addition', 'Removal') AND ml.quantity_changed IS NOT NULL
+      AND {where}
+    ORDER BY {order}
+"""
+
+def _replay(conn, source, watermark, within_transaction) -> int:
+    """
+    Replays the history of every item up to log id watermark (all of it when
+    None) into the temp tables valuation_replay_layers/_items, BACKFILL_ITEMS_PER_READ
+    items per read. Outside a transaction each read's results are committed
+    (to temp only) before the next read, so no lock on the live database is
+    held between reads. Returns the number of items valued.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.valuation_replay_layers")
+    cursor.execute("DROP TABLE IF EXISTS temp.valuation_replay_items")
+    cursor.execute("""
+        CREATE TEMP TABLE valuation_replay_layers (
+            item_id INTEGER, received_at TIMESTAMP, unit_cost REAL, original_quantity INTEGER, remaining_quantity INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TEMP TABLE valuation_replay_items (
+            item_id INTEGER, quantity INTEGER, average_cost REAL, fifo_value REAL, unvalued_quantity INTEGER, updated_at TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT id FROM items ORDER BY id")
+    item_ids = [row[0] for row in cursor.fetchall()]
+    where = "ml.item_id BETWEEN ? AND ?" + (" AND ml.id <= ?" if watermark is not None else "")
+    replay_sql = _REPLAY_SQL.format(source=source, where=where, order="ml.item_id, ml.id")
+
+    now = datetime.now()
+    item_count = 0
+    for start in range(0, len(item_ids), BACKFILL_ITEMS_PER_READ):
+        chunk = item_ids[start:start + BACKFILL_ITEMS_PER_READ]
+        params = [chunk[0], chunk[-1]] + ([watermark] if watermark is not None else [])
+        cursor.execute(replay_sql, params)
+        logs = cursor.fetchall()
+
+        layer_rows = []
+        valuation_rows = []
+
+        def flush(item_id, on_hand, average_cost, layers):
+            fifo_value = 0.0
+            unvalued_quantity = 0
+            for received_at, unit_cost, original, remaining in layers:
+                layer_rows.append((item_id, received_at, unit_cost, original, remaining))
+                if unit_cost is None:
+                    unvalued_quantity += remaining
+                else:
+                    fifo_value += remaining * unit_cost
+            valuation_rows.append((item_id, on_hand, average_cost, fifo_value, unvalued_quantity, now))
+
+        current_item = None
+        on_hand, average_cost, layers = 0, None, deque()
+        for item_id, action_type, quantity, timestamp, unit_cost in logs:
+            if item_id != current_item:
+                if current_item is not None:
+                    flush(current_item, on_hand, average_cost, layers)
+                current_item = item_id
+                on_hand, average_cost, layers = 0, None, deque()
+
+            if action_type == 'Removal':
+                outstanding = quantity
+                while outstanding > 0 and layers:
+                    layer = layers[0]
+                    taken = min(layer[3], outstanding)
+                    layer[3] -= taken
+                    outstanding -= taken
+                    if layer[3] == 0:
+                        layers.popleft()
+                on_hand = max(on_hand - quantity, 0)
+            else:
+                average_cost = _next_average(on_hand, average_cost, quantity, unit_cost)
+                if quantity > 0:
+                    layers.append([timestamp, unit_cost, quantity, quantity])
+                on_hand += quantity
+        if current_item is not None:
+            flush(current_item, on_hand, average_cost, layers)
+
+        cursor.executemany("INSERT INTO temp.valuation_replay_layers VALUES (?, ?, ?, ?, ?)", layer_rows)
+        cursor.executemany("INSERT INTO temp.valuation_replay_items VALUES (?, ?, ?, ?, ?, ?)", valuation_rows)
+        if not within_transaction:
+            conn.commit()
+        item_count += len(valuation_rows)
+    return item_count
+
+def backfill(rebuild: bool = False, db=None) -> dict:
+    """
+    Builds cost layers and item_valuation from the full movement history
+    (live and archived logs), item by item in (item_id, id) order.
+
+    Runs once: later calls return immediately unless rebuild is True. The
+    history up to the newest log id at the start (the watermark) is replayed
+    without the write lock, into temp tables. Then, holding the write lock,
+    the result replaces the valuation tables and the logs written since the
+    watermark are applied on top, so no adjustment can slip between the replay
+    and the switch to incremental updates. If logs were archived during the
+    replay it is redone under the lock. Uses its own connection unless one is given.
+    """
+    global _backfilled
+    conn = db or get_db_connection()
+    cursor = conn.cursor()
+    archive_schemas = []
+    try:
+        if not rebuild and is_backfilled(conn):
+            return {"rebuilt": False}
+
+        # ATTACH is not allowed inside a transaction, so archives are attached first.
+        catalog = log_archive_model.get_archive_catalog(conn)
+        archive_schemas = log_archive_model.attach_archives(conn, catalog)
+        source = log_archive_model.combined_logs_source(archive_schemas) if archive_schemas else "movement_logs"
+
+        # Logs only grow (ids from AUTOINCREMENT), so everything after the
+        # watermark can be applied later in id order.
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+        watermark = cursor.fetchone()[0]
+        item_count = _replay(conn, source, watermark, within_transaction=False)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        if not rebuild and is_backfilled(conn):
+            conn.rollback()
+            return {"rebuilt": False}
+        if log_archive_model.get_archive_catalog(conn) != catalog:
+            # Rows moved to an archive mid-replay may have been missed; replay again, locked.
+            item_count = _replay(conn, source, None, within_transaction=True)
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movement_logs")
+            watermark = cursor.fetchone()[0]
+
+        cursor.execute("DELETE FROM cost_layers")
+        cursor.execute("DELETE FROM item_valuation")
+        cursor.execute("""
+            INSERT INTO cost_layers (item_id, received_at, unit_cost, original_quantity, remaining_quantity)
+            SELECT item_id, received_at, unit_cost, original_quantity, remaining_quantity
+            FROM temp.valuation_replay_layers ORDER BY rowid
+        """)
+        cursor.execute("""
+            INSERT INTO item_valuation (item_id, quantity, average_cost, fifo_value, unvalued_quantity, updated_at)
+            SELECT item_id, quantity, average_cost, fifo_value, unvalued_quantity, updated_at FROM temp.valuation_replay_items
+        """)
+        now = datetime.now()
+        cursor.execute("INSERT OR REPLACE INTO system_state (key, value) VALUES (?, ?)", (BACKFILL_STATE_KEY, now.isoformat()))
+
+        # Logs written during the replay, applied as the incremental path would have.
+        cursor.execute(_REPLAY_SQL.format(source="movement_logs", where="ml.id > ?", order="ml.id"), (watermark,))
+        caught_up = cursor.fetchall()
+        for item_id, action_type, quantity, timestamp, unit_cost in caught_up:
+            if action_type == 'Removal':
+                record_issue(conn, item_id, quantity)
+            else:
+                record_receipt(conn, item_id, quantity, unit_cost, received_at=timestamp)
+        conn.commit()
+        _backfilled = True
+        print(f"Stock valuation backfilled for {item_count} item(s).")
+        return {"rebuilt": True, "items": item_count}
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.rollback()
+        print(f"Database error in valuation backfill: {e}")
+        raise e
+    finally:
+        try:
+            conn.execute("DROP TABLE IF EXISTS temp.valuation_replay_layers")
+            conn.execute("DROP TABLE IF EXISTS temp.valuation_replay_items")
+        except sqlite3.Error:
+            pass
+        log_archive_model.detach_archives(conn, archive_schemas)
+        if db is None:
+            conn.close()
+
+_VALUE_COLUMNS = """
+    COUNT(*) AS item_count,
+    COALESCE(SUM(v.quantity), 0) AS quantity,
+    ROUND(COALESCE(SUM(v.fifo_value), 0), 2) AS fifo_value,
+    ROUND(COALESCE(SUM(v.quantity * v.average_cost), 0), 2) AS average_value,
+    COALESCE(SUM(v.unvalued_quantity), 0) AS unvalued_quantity
+"""
+
+# The reads below show the valuation tables as they are; until is_backfilled()
+# they are empty or partial, and the routes start the backfill job instead.
+
+def get_valuation_summary() -> dict:
+    """Total stock value under both FIFO and weighted-average costing."""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(f"SELECT {_VALUE_COLUMNS} FROM item_valuation v WHERE v.quantity > 0")
+    return dict(cursor.fetchone())
+
+def get_category_valuation(level: str = 'sub') -> list[dict]:
+    """
+    Stock value per sub-category (level='sub') or per main category (level='main').
+    Items without a category are grouped under a null id.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    if level == 'main':
+        group = "COALESCE(pc.id, c.id)"
+        select = f"{group} AS category_id, COALESCE(pc.name, c.name) AS category_name"
+    else:
+        group = "c.id"
+        select = "c.id AS category_id, c.name AS category_name, pc.id AS main_category_id, pc.name AS main_category_name"
+    cursor.execute(f"""
+        SELECT {select}, {_VALUE_COLUMNS}
+        FROM item_valuation v
+        JOIN items i ON i.id = v.item_id
+        LEFT JOIN categories c ON c.id = i.sub_category_id
+        LEFT JOIN categories pc ON pc.id = c.parent_id
+        WHERE v.quantity > 0
+        GROUP BY {group}
+        ORDER BY fifo_value DESC
+    """)
+    return [dict(row) for row in cursor.fetchall()]
+
+def get_item_valuation(item_id: int) -> dict | None:
+    """One item's valuation with its open cost layers (oldest first)."""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT i.id AS item_id, i.name, v.quantity, v.average_cost, v.fifo_value, v.unvalued_quantity, v.updated_at
+        FROM items i LEFT JOIN item_valuation v ON v.item_id = i.id
+        WHERE i.id = ?
+    """, (item_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    result = dict(row)
+    cursor.execute("SELECT received_at, unit_cost, original_quantity, remaining_quantity FROM cost_layers WHERE item_id = ? ORDER BY id", (item_id,))
+    result["layers"] = [dict(layer) for layer in cursor.fetchall()]
+    return result
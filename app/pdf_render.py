@@ -0,0 +1,364 @@
+import hashlib
+import os
+import sys
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+
+# Streaming PDF writer for long tabular reports.
+#
+# Each page is written to the file as soon as it is finished; only the byte
+# offset of every object is kept (a few bytes per page), so memory stays flat
+# however many rows a report has. Text uses the bundled Arial as a CID font
+# addressed by its glyph ids (Identity-H); at close only the glyphs the report
+# drew are embedded, renumbered in the subset through a CIDToGIDMap. Arabic is
+# shaped into its presentation forms and put in visual order before drawing.
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 portrait, in points
+MARGIN = 36
+
+_CATALOG_ID, _PAGES_ID, _FONT_ID, _CID_FONT_ID, _DESCRIPTOR_ID, _FONT_FILE_ID, _TO_UNICODE_ID, _INFO_ID = range(1, 9)
+_FIRST_PAGE_OBJECT_ID = 9
+
+def _font_path():
+    # The spec bundles the font as assets/arial.ttf.
+    base = sys._MEIPASS if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, 'assets', 'arial.ttf')
+
+def _text_stack():
+    """
+    Imports the TrueType parser and the Arabic shaping/bidi libraries on first
+    use; only report rendering needs them.
+    """
+    from reportlab.pdfbase.ttfonts import TTFontFile
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+    return TTFontFile, arabic_reshaper, get_display
+
+class _Font:
+    def __init__(self, path):
+        TTFontFile, arabic_reshaper, get_display = _text_stack()
+        self.path = path
+        self.file = TTFontFile(path, validate=0)
+        self._reshape = arabic_reshaper.reshape
+        self._get_display = get_display
+        self._scale = 1000 / self.file.unitsPerEm
+        # character -> (glyph id, advance in 1/1000 em), filled as characters are met.
+        self._glyphs = {}
+        # The parser reads through a shared file position; reports run on several job threads.
+        self._subset_lock = threading.Lock()
+
+    def _glyph(self, char):
+        entry = self._glyphs.get(char)
+        if entry is None:
+            glyph_id = self.file.charToGlyph.get(ord(char), 0)
+            entry = self._glyphs[char] = (glyph_id, self.advance(glyph_id))
+        return entry
+
+    def advance(self, glyph_id):
+        metrics = self.file.hmetrics
+        return metrics[min(glyph_id, len(metrics) - 1)][0] * self._scale
+
+    def visual(self, text):
+        if text.isascii():
+            return text
+        # Names, people and destinations repeat across rows, so shaping is cached.
+        return _shape(self._reshape, self._get_display, text)
+
+    def width(self, visual_text, size):
+        glyph = self._glyph
+        return sum(glyph(char)[1] for char in visual_text) * size / 1000
+
+    def encode(self, visual_text, used):
+        """Hex glyph ids for a content stream; notes each glyph in used (glyph id -> character)."""
+        codes = []
+        for char in visual_text:
+            glyph_id = self._glyph(char)[0]
+            if glyph_id not in used:
+                used[glyph_id] = char
+            codes.append(f"{glyph_id:04X}")
+        return "".join(codes)
+
+    def subset(self, used):
+        """
+        A TrueType font holding only the glyphs in used (glyph id -> character),
+        and the subset's glyph id for each of them. Glyph 0 stays 0; composite
+        glyphs bring their parts along after the drawn glyphs.
+        """
+        glyph_ids = [glyph_id for glyph_id in sorted(used) if glyph_id]
+        with self._subset_lock:
+            data = self.file.makeSubset([ord(used[glyph_id]) for glyph_id in glyph_ids])
+        new_ids = {glyph_id: new_id for new_id, glyph_id in enumerate(glyph_ids, start=1)}
+        new_ids[0] = 0
+        return data, new_ids
+
+@lru_cache(maxsize=65536)
+def _shape(reshape, get_display, text):
+    return get_display(reshape(text))
+
+@lru_cache(maxsize=1)
+def _load_font(path):
+    return _Font(path)
+
+def _number(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+class PageCanvas:
+    """Collects the drawing operators of one page (coordinates from the bottom left, in points)."""
+
+    def __init__(self, font, used):
+        self.font = font
+        self.used = used
+        self.ops = []
+
+    def text(self, text, x, y, size, align='right', width=None):
+        """
+        Draws text anchored at x: its right edge for 'right', its centre for
+        'center', its left edge for 'left'. Text wider than width is shortened.
+        """
+        if text is None or text == '':
+            return
+        text = str(text)
+        visual = self.font.visual(text)
+        text_width = self.font.width(visual, size)
+        if width is not None and text_width > width:
+            visual = self._fit(text, size, width)
+            text_width = self.font.width(visual, size)
+        if align == 'right':
+            x -= text_width
+        elif align == 'center':
+            x -= text_width / 2
+        self.ops.append(f"BT /F1 {_number(size)} Tf {_number(x)} {_number(y)} Td <{self.font.encode(visual, self.used)}> Tj ET")
+
+    def _fit(self, text, size, width):
+        """The visual form of text, shortened with an ellipsis to fit width."""
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.font.width(self.font.visual(text[:middle] + '…'), size) <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return self.font.visual(text[:low] + '…')
+
+    def rect(self, x, y, width, height, gray):
+        self.ops.append(f"{_number(gray)} g {_number(x)} {_number(y)} {_number(width)} {_number(height)} re f 0 g")
+
+    def line(self, x1, y1, x2, y2, gray=0.75, width=0.5):
+        self.ops.append(f"{_number(gray)} G {_number(width)} w {_number(x1)} {_number(y1)} m {_number(x2)} {_number(y2)} l S")
+
+class StreamingPdf:
+    """Writes a PDF page by page. Use as a context manager, or call close()."""
+
+    def __init__(self, path, title=''):
+        self.font = _load_font(_font_path())
+        # Glyphs drawn so far (glyph id -> character), for the font widths and ToUnicode map.
+        self.used = {}
+        self.title = title
+        self.page_count = 0
+        self._file = open(path, 'wb')
+        # Byte offset of each object, indexed by object id (0 is the free-list head).
+        self._offsets = array('q', [0] * _FIRST_PAGE_OBJECT_ID)
+        self._page_ids = array('l')
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+    def _write_object(self, object_id, body: bytes, stream: bytes | None = None):
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n".encode('ascii') + body)
+        if stream is not None:
+            self._file.write(b"\nstream\n" + stream + b"\nendstream")
+        self._file.write(b"\nendobj\n")
+
+    def _new_object_id(self):
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def new_page(self) -> PageCanvas:
+        return PageCanvas(self.font, self.used)
+
+    def add_page(self, page: PageCanvas):
+        content = zlib.compress("\n".join(page.ops).encode('ascii'))
+        content_id = self._new_object_id()
+        self._write_object(content_id, f"<< /Length {len(content)} /Filter /FlateDecode >>".encode('ascii'), content)
+        page_id = self._new_object_id()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent {_PAGES_ID} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {_FONT_ID} 0 R >> >> /Contents {content_id} 0 R >>").encode('ascii'))
+        self._page_ids.append(page_id)
+        self.page_count += 1
+
+    def _write_font(self):
+        font = self.font
+        font_file = font.file
+        raw, new_ids = font.subset(self.used)
+        packed = zlib.compress(raw)
+        name = font_file.name.decode('ascii', 'replace') if isinstance(font_file.name, bytes) else font_file.name
+        glyph_ids = sorted(self.used)
+        # A subset is named with a tag derived from its glyphs, as the PDF spec asks.
+        tag = "".join(chr(65 + byte % 26) for byte in hashlib.md5(str(glyph_ids).encode('ascii')).digest()[:6])
+        name = f"{tag}+{name}"
+        # The pages were written with the full font's glyph ids as CIDs; this maps them into the subset.
+        gid_map = array('H', [0] * (max(glyph_ids, default=0) + 1))
+        for glyph_id, new_id in new_ids.items():
+            gid_map[glyph_id] = new_id
+        if sys.byteorder == 'little':
+            gid_map.byteswap()
+        packed_map = zlib.compress(gid_map.tobytes())
+        gid_map_id = self._new_object_id()
+        self._write_object(gid_map_id, f"<< /Length {len(packed_map)} /Filter /FlateDecode >>".encode('ascii'), packed_map)
+        widths = " ".join(f"{glyph_id} [{_number(font.advance(glyph_id))}]" for glyph_id in glyph_ids)
+        self._write_object(_FONT_ID, (
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H "
+            f"/DescendantFonts [{_CID_FONT_ID} 0 R] /ToUnicode {_TO_UNICODE_ID} 0 R >>").encode('ascii'))
+        self._write_object(_CID_FONT_ID, (
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} "
+            f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {_DESCRIPTOR_ID} 0 R /CIDToGIDMap {gid_map_id} 0 R /DW 1000 /W [{widths}] >>").encode('ascii'))
+        bbox = " ".join(_number(value) for value in font_file.bbox)
+        self._write_object(_DESCRIPTOR_ID, (
+            f"<< /Type /FontDescriptor /FontName /{name} /Flags 32 /FontBBox [{bbox}] "
+            f"/ItalicAngle {_number(font_file.italicAngle)} /Ascent {_number(font_file.ascent)} "
+            f"/Descent {_number(font_file.descent)} /CapHeight {_number(font_file.capHeight)} "
+            f"/StemV {font_file.stemV} /FontFile2 {_FONT_FILE_ID} 0 R >>").encode('ascii'))
+        self._write_object(_FONT_FILE_ID, f"<< /Length {len(packed)} /Length1 {len(raw)} /Filter /FlateDecode >>".encode('ascii'), packed)
+
+        mappings = []
+        for glyph_id in glyph_ids:
+            units = self.used[glyph_id].encode('utf-16-be').hex().upper()
+            mappings.append(f"<{glyph_id:04X}> <{units}>")
+        blocks = [f"{len(mappings[i:i + 100])} beginbfchar\n" + "\n".join(mappings[i:i + 100]) + "\nendbfchar"
+                  for i in range(0, len(mappings), 100)]
+        cmap = ("/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+                "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+                "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+                "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+                + "\n".join(blocks) +
+                "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend").encode('ascii')
+        self._write_object(_TO_UNICODE_ID, f"<< /Length {len(cmap)} >>".encode('ascii'), cmap)
+
+    def close(self):
+        if self.page_count == 0:
+            self.add_page(self.new_page())
+        self._write_font()
+        self._offsets[_PAGES_ID] = self._file.tell()
+        self._file.write(f"{_PAGES_ID} 0 obj\n<< /Type /Pages /Count {self.page_count} /Kids [".encode('ascii'))
+        for start in range(0, len(self._page_ids), 1000):
+            self._file.write(" ".join(f"{page_id} 0 R" for page_id in self._page_ids[start:start + 1000]).encode('ascii') + b"\n")
+        self._file.write(b"] >>\nendobj\n")
+        self._write_object(_CATALOG_ID, f"<< /Type /Catalog /Pages {_PAGES_ID} 0 R >>".encode('ascii'))
+        title = self.title.encode('utf-16-be').hex().upper()
+        self._write_object(_INFO_ID, f"<< /Title <FEFF{title}> /Producer (Warehouse Management System) >>".encode('ascii'))
+
+        xref_offset = self._file.tell()
+        self._file.write(f"xref\n0 {len(self._offsets)}\n0000000000 65535 f \n".encode('ascii'))
+        for start in range(1, len(self._offsets), 1000):
+            self._file.write("".join(f"{offset:010d} 00000 n \n" for offset in self._offsets[start:start + 1000]).encode('ascii'))
+        self._file.write((f"trailer\n<< /Size {len(self._offsets)} /Root {_CATALOG_ID} 0 R /Info {_INFO_ID} 0 R >>\n"
+                          f"startxref\n{xref_offset}\n%%EOF\n").encode('ascii'))
+        self._file.close()
+
+class TableReport:
+    """
+    Lays out an RTL table over as many pages as the rows need: a title and
+    subtitle on every page, a shaded header row, and a footer with the page's
+    totals, the running totals so far and the page number.
+
+    columns: (header, width in points, row -> cell text, align) from right to left.
+    totals: (label, row -> number) summed per page and cumulatively.
+    """
+
+    FONT_SIZE = 8.5
+    ROW_HEIGHT = 15
+    HEADER_HEIGHT = 18
+    PADDING = 3
+
+    def __init__(self, pdf: StreamingPdf, title, subtitle, columns, totals=()):
+        self.pdf = pdf
+        self.title = title
+        self.subtitle = subtitle
+        self.columns = columns
+        self.totals = totals
+        self.running = [0] * len(totals)
+        self.row_count = 0
+        table_width = sum(column[1] for column in columns)
+        self.right = PAGE_WIDTH - MARGIN
+        self.left = self.right - table_width
+        self.table_top = PAGE_HEIGHT - MARGIN - 48
+        footer_height = 14 * (2 if totals else 0) + 16
+        self.rows_per_page = int((self.table_top - self.HEADER_HEIGHT - MARGIN - footer_height) // self.ROW_HEIGHT)
+        self._page = None
+
+    def _start_page(self):
+        page = self.pdf.new_page()
+        page.text(self.title, PAGE_WIDTH / 2, PAGE_HEIGHT - MARGIN - 14, 15, align='center')
+        page.text(self.subtitle, self.right, PAGE_HEIGHT - MARGIN - 34, 8.5, width=self.right - MARGIN)
+        top = self.table_top
+        page.rect(self.left, top - self.HEADER_HEIGHT, self.right - self.left, self.HEADER_HEIGHT, 0.9)
+        x = self.right
+        for header, width, _, _ in self.columns:
+            page.text(header, x - width / 2, top - self.HEADER_HEIGHT + 5.5, self.FONT_SIZE + 0.5, align='center', width=width - 2 * self.PADDING)
+            x -= width
+        self._page = page
+        self._page_sums = [0] * len(self.totals)
+        self._y = top - self.HEADER_HEIGHT
+        self._rows_on_page = 0
+
+    def _finish_page(self):
+        page = self._page
+        x = self.right
+        page.line(self.left, self.table_top, self.right, self.table_top)
+        for _, width, _, _ in self.columns:
+            page.line(x, self.table_top, x, self._y)
+            x -= width
+        page.line(self.left, self.table_top, self.left, self._y)
+        page.line(self.left, self._y, self.right, self._y)
+
+        y = self._y - 16
+        if self.totals:
+            page_line = "   ".join(f"{label}: {_number(value)}" for (label, _), value in zip(self.totals, self._page_sums))
+            running_line = "   ".join(f"{label}: {_number(value)}" for (label, _), value in zip(self.totals, self.running))
+            page.text(f"مجموع الصفحة — {page_line}", self.right, y, self.FONT_SIZE)
+            page.text(f"المجموع حتى هذه الصفحة — {running_line}", self.right, y - 14, self.FONT_SIZE)
+        page.text(f"صفحة {self.pdf.page_count + 1}", PAGE_WIDTH / 2, MARGIN - 14, 8, align='center')
+        self.pdf.add_page(page)
+        self._page = None
+
+    def add_row(self, row):
+        if self._page is None:
+            self._start_page()
+        page = self._page
+        y = self._y - self.ROW_HEIGHT
+        if self._rows_on_page % 2:
+            page.rect(self.left, y, self.right - self.left, self.ROW_HEIGHT, 0.97)
+        x = self.right
+        for _, width, cell, align in self.columns:
+            anchor = {'right': x - self.PADDING, 'center': x - width / 2, 'left': x - width + self.PADDING}[align]
+            page.text(cell(row), anchor, y + 4.5, self.FONT_SIZE, align=align, width=width - 2 * self.PADDING)
+            x -= width
+        page.line(self.left, y, self.right, y, gray=0.88, width=0.3)
+        for index, (_, value) in enumerate(self.totals):
+            amount = value(row) or 0
+            self._page_sums[index] += amount
+            self.running[index] += amount
+        self._y = y
+        self._rows_on_page += 1
+        self.row_count += 1
+        if self._rows_on_page == self.rows_per_page:
+            self._finish_page()
+
+    def finish(self):
+        """Closes the last page; an empty report still gets one page with its header."""
+        if self._page is None and self.row_count == 0:
+            self._start_page()
+        if self._page is not None:
+            self._finish_page()
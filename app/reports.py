@@ -0,0 +1,136 @@
+import csv
+from datetime import datetime
+from . import jobs
+
+# Server-side exports, run as background jobs (app.jobs).
+#
+# A renderer streams rows from the database straight into app.pdf_render (or
+# a CSV writer), so neither the request thread nor the webview holds the rows.
+# Clients submit the kind through /api/jobs, poll or stream its progress and
+# download the file once it is ready.
+
+_ACTION_TYPES_AR = {'Addition': 'دخول', 'Removal': 'خروج', 'Creation': 'إنشاء', 'Update': 'تعديل',
+                    'Status Change': 'تغيير الحالة', 'Restored': 'استعادة'}
+
+# Tables whose changes can alter an export, for reusing finished results.
+_LOG_TABLES = ('movement_logs', 'movement_log_archives', 'providers', 'destinations')
+_ITEM_TABLES = ('items', 'units', 'categories', 'providers')
+
+_LOG_CSV_COLUMNS = ('id', 'timestamp', 'item_id', 'item_name', 'action_type', 'quantity_changed',
+                    'resulting_quantity', 'cost_per_item', 'provider', 'destination_name', 'person_name', 'details')
+
+def _dash(value):
+    return '-' if value is None or value == '' else value
+
+def _format_timestamp(value):
+    return str(value)[:19] if value else '-'
+
+def _int_params(data, keys):
+    params = {}
+    for key in keys:
+        value = data.get(key)
+        if value in (None, ''):
+            continue
+        try:
+            params[key] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {key} format. Must be an integer.")
+    return params
+
+def _movement_log_params(data):
+    """The /api/movement-logs/all_filtered filters; raises ValueError with a message."""
+    params = _int_params(data, ('item_id', 'provider_id', 'destination_id'))
+    for key in ('date_from', 'date_to'):
+        if data.get(key):
+            try:
+                datetime.strptime(data[key], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {key} format. Must be YYYY-MM-DD.")
+            params[key] = data[key]
+    if data.get('action_type'):
+        params['action_type'] = str(data['action_type'])
+    if data.get('include_archived'):
+        params['include_archived'] = True
+    return params
+
+def _item_params(data):
+    return _int_params(data, ('sub_category_id', 'main_category_id'))
+
+def _render_movement_logs(path, params, progress):
+    from . import pdf_render
+    from .models import movement_log_model
+
+    period = f"من {params.get('date_from') or 'البداية'} إلى {params.get('date_to') or 'اليوم'}"
+    columns = [
+        ('الصنف', 150, lambda log: f"{log['item_name']} #{log['item_id']}" if log['item_name'] else 'N/A', 'right'),
+        ('الوجهة', 75, lambda log: _dash(log['destination_name']), 'right'),
+        ('التاريخ والوقت', 90, lambda log: _format_timestamp(log['timestamp']), 'center'),
+        ('بواسطة', 65, lambda log: _dash(log['person_name']), 'right'),
+        ('نوع الحركة', 55, lambda log: _ACTION_TYPES_AR.get(log['action_type'], log['action_type']), 'center'),
+        ('الكمية', 45, lambda log: _dash(log['quantity_changed']), 'center'),
+        ('الرصيد', 43, lambda log: _dash(log['resulting_quantity']), 'center'),
+    ]
+    totals = [
+        ('دخول', lambda log: log['quantity_changed'] if log['action_type'] == 'Addition' else 0),
+        ('خروج', lambda log: log['quantity_changed'] if log['action_type'] == 'Removal' else 0),
+    ]
+    title = 'تقرير حركة المخزن'
+    with pdf_render.StreamingPdf(path, title=title) as pdf:
+        table = pdf_render.TableReport(pdf, title, f"{period} — أعد في {datetime.now():%Y-%m-%d %H:%M}", columns, totals)
+        for log in movement_log_model.iter_movement_logs(params):
+            table.add_row(log)
+            if table.row_count % 1000 == 0:
+                progress(rows=table.row_count, pages=pdf.page_count)
+        table.finish()
+    return {"rows": table.row_count, "pages": pdf.page_count}
+
+def _render_items(path, params, progress):
+    from . import pdf_render
+    from .models import item_model
+
+    def stock_value(item):
+        return round(item['current_quantity'] * item['cost'], 2) if item['cost'] is not None else None
+
+    columns = [
+        ('الصنف', 150, lambda item: f"{item['name']} #{item['id']}", 'right'),
+        ('الفئة', 100, lambda item: _dash(item['sub_category_name']), 'right'),
+        ('الباركود', 80, lambda item: _dash(item['barcode']), 'center'),
+        ('الوحدة', 50, lambda item: _dash(item['unit_name']), 'center'),
+        ('الكمية', 50, lambda item: item['current_quantity'], 'center'),
+        ('التكلفة', 45, lambda item: _dash(item['cost']), 'center'),
+        ('القيمة', 48, lambda item: _dash(stock_value(item)), 'center'),
+    ]
+    totals = [('الكمية', lambda item: item['current_quantity']), ('القيمة', lambda item: stock_value(item) or 0)]
+    title = 'تقرير الأصناف'
+    with pdf_render.StreamingPdf(path, title=title) as pdf:
+        table = pdf_render.TableReport(pdf, title, f"الأصناف النشطة — أعد في {datetime.now():%Y-%m-%d %H:%M}", columns, totals)
+        items = item_model.iter_items(sub_category_id=params.get('sub_category_id'),
+                                      main_category_id=params.get('main_category_id'))
+        for item in items:
+            table.add_row(item)
+            if table.row_count % 1000 == 0:
+                progress(rows=table.row_count, pages=pdf.page_count)
+        table.finish()
+    return {"rows": table.row_count, "pages": pdf.page_count}
+
+def _export_movement_logs_csv(path, params, progress):
+    from .models import movement_log_model
+
+    rows = 0
+    # utf-8-sig so spreadsheet programs detect the Arabic text.
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(_LOG_CSV_COLUMNS)
+        for log in movement_log_model.iter_movement_logs(params):
+            writer.writerow([log[column] for column in _LOG_CSV_COLUMNS])
+            rows += 1
+            if rows % 10000 == 0:
+                progress(rows=rows)
+    return {"rows": rows}
+
+jobs.register('movement_logs_pdf', _render_movement_logs, parse=_movement_log_params, tables=_LOG_TABLES,
+              file_suffix='.pdf', mimetype='application/pdf')
+jobs.register('movement_logs_csv', _export_movement_logs_csv, parse=_movement_log_params, tables=_LOG_TABLES,
+              file_suffix='.csv', mimetype='text/csv')
+jobs.register('items_pdf', _render_items, parse=_item_params, tables=_ITEM_TABLES,
+              file_suffix='.pdf', mimetype='application/pdf')
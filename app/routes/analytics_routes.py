@@ -0,0 +1,171 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from app import jobs
+from app.models import forecast_model, abc_model
+from app.json_format import wants_columnar, to_columnar
+
+bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+# Number of items listed by the Dashboard reorder widget.
+DASHBOARD_REORDER_ITEMS = 5
+
+def _forecast_params(args):
+    """Parses the forecast parameters shared by the reorder endpoints and job; raises ValueError with a message."""
+    try:
+        lead_time_days = float(args.get('lead_time_days', forecast_model.DEFAULT_LEAD_TIME_DAYS))
+        service_level = float(args.get('service_level', forecast_model.DEFAULT_SERVICE_LEVEL))
+    except (TypeError, ValueError):
+        raise ValueError('lead_time_days and service_level must be numbers.')
+    if lead_time_days <= 0:
+        raise ValueError('lead_time_days must be positive.')
+    if not 0 < service_level < 1:
+        raise ValueError('service_level must be between 0 and 1 (exclusive).')
+    as_of = args.get('as_of')
+    if as_of:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except (TypeError, ValueError):
+            raise ValueError('as_of must be a date in YYYY-MM-DD format.')
+    return {"lead_time_days": lead_time_days, "service_level": service_level, "as_of": as_of or None}
+
+@bp.route('/reorder', methods=['GET'])
+def get_reorder_forecast():
+    """
+    Returns the demand forecast and reorder point of every active item, fewest
+    days of cover first. Query: lead_time_days, service_level, as_of,
+    only_reorder=true, limit, offset, format=columnar.
+    """
+    try:
+        params = _forecast_params(request.args)
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if (limit is not None and limit < 1) or offset < 0:
+            raise ValueError('limit must be positive and offset must not be negative.')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    only_reorder = request.args.get('only_reorder', 'false').lower() == 'true'
+    try:
+        data = forecast_model.get_reorder_forecast(only_reorder=only_reorder, limit=limit, offset=offset, **params)
+        if wants_columnar():
+            data["items"] = to_columnar(data["items"])
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute reorder forecast: {e}'}), 500
+
+@bp.route('/reorder/dashboard', methods=['GET'])
+def get_reorder_dashboard():
+    """Feed for the Dashboard reorder widget: counts plus the most urgent items to reorder."""
+    try:
+        params = _forecast_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        data = forecast_model.get_reorder_forecast(only_reorder=True, limit=DASHBOARD_REORDER_ITEMS, **params)
+        return jsonify({
+            "as_of": data["as_of"],
+            "computed_at": data["computed_at"],
+            "needs_reorder_count": data["needs_reorder_count"],
+            "low_cover_count": data["low_cover_count"],
+            "items": data["items"],
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute reorder forecast: {e}'}), 500
+
+def _abc_params(args):
+    """Parses the ABC classification parameters of the endpoint and job; raises ValueError with a message."""
+    params = {}
+    for key in ('date_from', 'date_to'):
+        value = args.get(key)
+        if value:
+            try:
+                params[key] = date.fromisoformat(value).isoformat()
+            except (TypeError, ValueError):
+                raise ValueError(f'{key} must be a date in YYYY-MM-DD format.')
+    if 'date_from' in params and 'date_to' in params and params['date_from'] > params['date_to']:
+        raise ValueError('date_from must not be after date_to.')
+    for key in ('main_category_id', 'destination_id'):
+        value = args.get(key)
+        if value not in (None, ''):
+            try:
+                params[key] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'{key} must be an integer.')
+    try:
+        params['a_share'] = float(args.get('a_share', abc_model.DEFAULT_A_SHARE))
+        params['b_share'] = float(args.get('b_share', abc_model.DEFAULT_B_SHARE))
+    except (TypeError, ValueError):
+        raise ValueError('a_share and b_share must be numbers.')
+    if not 0 < params['a_share'] < params['b_share'] <= 1:
+        raise ValueError('Shares must satisfy 0 < a_share < b_share <= 1.')
+    abc_class = args.get('abc_class')
+    if abc_class is not None:
+        params['abc_class'] = str(abc_class).upper()
+        if params['abc_class'] not in ('A', 'B', 'C'):
+            raise ValueError("abc_class must be 'A', 'B' or 'C'.")
+    return params
+
+def _abc_scope_params(args):
+    """The scope part (period and destination) of the ABC parameters, with the default period resolved."""
+    params = _abc_params(args)
+    date_from, date_to = abc_model.resolve_period(params.get('date_from'), params.get('date_to'))
+    return {"date_from": date_from, "date_to": date_to, "destination_id": params.get('destination_id')}
+
+@bp.route('/abc', methods=['GET'])
+def get_abc_classification():
+    """
+    Returns items ranked by withdrawal value with their A/B/C class. Query:
+    date_from, date_to, main_category_id, destination_id, a_share, b_share,
+    abc_class, limit, offset, format=columnar.
+
+    Serves the scope as last refreshed; a missing or stale scope is refreshed
+    by an 'abc_refresh' job. Until a new scope is built the response is 202
+    with that job; a stale one is returned with its refresh_job_id.
+    """
+    try:
+        params = _abc_params(request.args)
+        scope_params = _abc_scope_params(request.args)
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if (limit is not None and limit < 1) or offset < 0:
+            raise ValueError('limit must be positive and offset must not be negative.')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        data = abc_model.get_abc_classification(limit=limit, offset=offset, **{**params, **scope_params})
+        job = None
+        if data is None or data["stale"]:
+            job, _ = jobs.submit('abc_refresh', scope_params)
+        if data is None:
+            return jsonify({"status": "building", "job": job}), 202
+        data["refresh_job_id"] = job["id"] if job else None
+        if wants_columnar():
+            data["items"] = to_columnar(data["items"])
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute ABC classification: {e}'}), 500
+
+# The job parsers resolve the default dates, so that a job key names the
+# period it covers and yesterday's result isn't reused today.
+def _forecast_job_params(data):
+    params = _forecast_params(data)
+    params['only_reorder'] = bool(data.get('only_reorder'))
+    params['as_of'] = (params['as_of'] or date.today()).isoformat()
+    return params
+
+def _run_forecast_job(params, progress):
+    return forecast_model.get_reorder_forecast(**{**params, 'as_of': date.fromisoformat(params['as_of'])})
+
+# The full (unpaged) results as background jobs, for exports and slow databases.
+jobs.register('reorder_forecast', _run_forecast_job, parse=_forecast_job_params, tables=('items', 'movement_logs'))
+def _abc_job_params(data):
+    params = _abc_params(data)
+    params.update(_abc_scope_params(data))
+    return params
+
+def _run_abc_job(params, progress):
+    abc_model.refresh_scope(params['date_from'], params['date_to'], params['destination_id'])
+    return abc_model.get_abc_classification(**params)
+
+jobs.register('abc_classification', _run_abc_job, parse=_abc_job_params, tables=('items', 'categories', 'movement_logs'))
+jobs.register('abc_refresh', lambda params, progress: abc_model.refresh_scope(**params),
+              parse=_abc_scope_params, tables=('movement_logs',))
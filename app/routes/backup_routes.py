@@ -1,8 +1,6 @@
 from flask import Blueprint, jsonify
 from ..models.db_utils import create_timestamped_backup
-import barcode
-from barcode.writer import ImageWriter
-import io
+from .. import metrics, barcode_render
 import base64
 import os
 import sys
@@ -42,12 +40,8 @@ def generate_barcode_image(barcode_value):
         # Define the font path
         font_path = get_resource_path(os.path.join('assets', 'arial.ttf'))
 
-        Code128 = barcode.get_barcode_class('code128')
-        code128 = Code128(barcode_value, writer=ImageWriter())
-        
-        buffer = io.BytesIO()
-        code128.write(buffer, options={"font_path": font_path})
-        buffer.seek(0)
+        with metrics.BARCODE_RENDER_SECONDS.time('backup.generate_barcode_image'):
+            buffer = barcode_render.render_code128_png(barcode_value, options={"font_path": font_path})
 
         # Encode the image to Base64
         encoded_string = base64.b64encode(buffer.read()).decode('utf-8')
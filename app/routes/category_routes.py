@@ -61,7 +61,9 @@ def get_categories_route():
             parent_id=parent_id, 
             main_categories_only=main_categories_only,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            # The main-category list response carries no total.
+            include_total=not main_categories_only and request.args.get('include_total', 'true').lower() not in ('0', 'false', 'no')
         )
         
         
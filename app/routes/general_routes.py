@@ -1,8 +1,6 @@
 from flask import Blueprint, render_template, jsonify, send_file
 from ..models.db_utils import get_db_connection
-import barcode
-from barcode.writer import ImageWriter
-import io
+from .. import barcode_render
 
 # Using Blueprint for routes modularity
 bp = Blueprint('general', __name__)
@@ -26,13 +24,7 @@ def generate_barcode_image(barcode_value):
     """
     try:
         
-        Code128 = barcode.get_barcode_class('code128')
-        code128 = Code128(barcode_value, writer=ImageWriter())
-        
-        
-        buffer = io.BytesIO()
-        code128.write(buffer)
-        buffer.seek(0)
+        buffer = barcode_render.render_code128_png(barcode_value)
         
         return send_file(
             buffer,
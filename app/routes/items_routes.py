@@ -1,20 +1,53 @@
 from flask import Blueprint, request, jsonify, send_file
 import sqlite3
 from app.models import item_model
-import barcode
-from barcode.writer import ImageWriter
-from io import BytesIO
+from app import metrics, barcode_render
+from app.json_format import wants_columnar, to_columnar
 
 items_bp = Blueprint('items_bp', __name__, url_prefix='/api/items')
 
+# Upper bound on IDs + barcodes resolved by one batch lookup request.
+MAX_BATCH_LOOKUP = 5000
+
+def _batch_lookup_response(item_ids, barcodes):
+    """Resolves IDs and barcodes in bulk and builds the batch lookup payload."""
+    if len(item_ids) + len(barcodes) > MAX_BATCH_LOOKUP:
+        return jsonify({"error": f"At most {MAX_BATCH_LOOKUP} ids and barcodes can be looked up at once."}), 400
+
+    items = item_model.get_items_by_ids(item_ids) if item_ids else {}
+    items_by_barcode = item_model.get_items_by_barcodes(barcodes) if barcodes else {}
+    for item in items_by_barcode.values():
+        items.setdefault(item['id'], item)
+
+    return jsonify({
+        "items": {str(item_id): item for item_id, item in items.items()},
+        "barcodes": {code: item['id'] for code, item in items_by_barcode.items()},
+        "not_found": {
+            "ids": [item_id for item_id in dict.fromkeys(item_ids) if item_id not in items],
+            "barcodes": [code for code in dict.fromkeys(barcodes) if code not in items_by_barcode],
+        }
+    }), 200
+
+@items_bp.route('', methods=['GET'])
 @items_bp.route('/', methods=['GET'])
 def get_items_route():
     """
     Unified route for fetching items.
     Supports standard pagination (page, page_size) for tables.
     Supports offset/limit pagination and 'q' for react-select-async-paginate.
+    Supports batch lookup with ids=1,2,3 (see lookup_items_route).
     """
-    
+    ids_param = request.args.get('ids')
+    if ids_param is not None:
+        try:
+            item_ids = [int(part) for part in ids_param.split(',') if part.strip()]
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers."}), 400
+        try:
+            return _batch_lookup_response(item_ids, [])
+        except Exception as e:
+            return jsonify({"error": "Failed to retrieve items", "details": str(e)}), 500
+
     is_ranged_request = 'offset' in request.args
     
     if is_ranged_request:
@@ -29,10 +62,13 @@ def get_items_route():
         search_term = request.args.get('search', None)
 
     sub_category_id = request.args.get('sub_category_id', None, type=int)
+    # include_total=false skips the total for callers that only page forward.
+    include_total = request.args.get('include_total', 'true').lower() not in ('0', 'false', 'no')
     
     try:
-        data = item_model.get_items_paginated(page, page_size, search_term, sub_category_id)
-        
+        data = item_model.get_items_paginated(page, page_size, search_term, sub_category_id, include_total=include_total)
+        if wants_columnar():
+            data["items"] = to_columnar(data["items"])
         
         if is_ranged_request:
             return jsonify({
@@ -73,6 +109,102 @@ def add_item_route():
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
 
+@items_bp.route('/lookup', methods=['POST'])
+def lookup_items_route():
+    """
+    Resolves many items in one request: {"ids": [...], "barcodes": [...]}.
+    Items are returned keyed by ID in the same shape as GET /api/items/<id>.
+    """
+    data = request.get_json(silent=True) or {}
+    item_ids = data.get('ids') or []
+    barcodes = data.get('barcodes') or []
+    if not isinstance(item_ids, list) or not isinstance(barcodes, list):
+        return jsonify({"error": "ids and barcodes must be lists."}), 400
+    try:
+        item_ids = [int(item_id) for item_id in item_ids]
+    except (ValueError, TypeError):
+        return jsonify({"error": "ids must be integers."}), 400
+    barcodes = [str(code) for code in barcodes]
+
+    try:
+        return _batch_lookup_response(item_ids, barcodes)
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve items", "details": str(e)}), 500
+
+def _parse_bulk_selection(data):
+    """Reads item_ids / sub_category_id from a bulk request body. Returns (item_ids, sub_category_id, error)."""
+    item_ids = data.get('item_ids')
+    sub_category_id = data.get('sub_category_id')
+    if item_ids is None and sub_category_id is None:
+        return None, None, "Provide item_ids or sub_category_id."
+    try:
+        if item_ids is not None:
+            if not isinstance(item_ids, list):
+                return None, None, "item_ids must be a list."
+            item_ids = [int(item_id) for item_id in item_ids]
+        if sub_category_id is not None:
+            sub_category_id = int(sub_category_id)
+    except (ValueError, TypeError):
+        return None, None, "item_ids and sub_category_id must be integers."
+    return item_ids, sub_category_id, None
+
+@items_bp.route('/bulk/status', methods=['POST'])
+def bulk_update_status_route():
+    """Changes the status of many items: {"status", "item_ids" | "sub_category_id", "person_name"}."""
+    data = request.get_json(silent=True) or {}
+    if 'status' not in data:
+        return jsonify({'error': 'Missing status field'}), 400
+    item_ids, sub_category_id, error = _parse_bulk_selection(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        summary = item_model.bulk_update_item_status(
+            new_status=data['status'], person_name=data.get('person_name'),
+            item_ids=item_ids, sub_category_id=sub_category_id)
+        return jsonify(summary), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
+
+@items_bp.route('/bulk/archive', methods=['POST'])
+def bulk_archive_route():
+    """Archives many items: {"item_ids" | "sub_category_id", "person_name"}."""
+    data = request.get_json(silent=True) or {}
+    item_ids, sub_category_id, error = _parse_bulk_selection(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        summary = item_model.bulk_archive_items(
+            person_name=data.get('person_name'), item_ids=item_ids, sub_category_id=sub_category_id)
+        return jsonify(summary), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
+
+@items_bp.route('/bulk/restore', methods=['POST'])
+def bulk_restore_route():
+    """Restores many items: {"target_sub_category_id", "item_ids" | "sub_category_id", "person_name"}."""
+    data = request.get_json(silent=True) or {}
+    if 'target_sub_category_id' not in data:
+        return jsonify({"error": "target_sub_category_id is required"}), 400
+    item_ids, sub_category_id, error = _parse_bulk_selection(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        summary = item_model.bulk_restore_items(
+            target_sub_category_id=int(data['target_sub_category_id']), person_name=data.get('person_name'),
+            item_ids=item_ids, sub_category_id=sub_category_id)
+        return jsonify(summary), 200
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
+
 @items_bp.route('/<int:item_id>/restore', methods=['PATCH'])
 def restore_item_route(item_id):
     """Restores an inactive or archived item."""
@@ -141,7 +273,7 @@ def update_item_route(item_id):
 def get_item_by_barcode_route(barcode):
     """Gets a single active item by its barcode."""
     try:
-        item = item_model.get_item_by_barcode(barcode)
+        item = item_model.lookup_item_by_barcode(barcode)
         if item:
             return jsonify(item), 200
         else:
@@ -173,14 +305,8 @@ def get_barcode_route(item_id):
         if not barcode_value:
             return jsonify({'error': 'Item does not have a barcode'}), 404
 
-        # Generate barcode
-        code128 = barcode.get_barcode_class('code128')
-        barcode_instance = code128(barcode_value, writer=ImageWriter())
-
-        # Save barcode to a memory buffer
-        buffer = BytesIO()
-        barcode_instance.write(buffer)
-        buffer.seek(0)
+        with metrics.BARCODE_RENDER_SECONDS.time('items_bp.get_barcode_route'):
+            buffer = barcode_render.render_code128_png(barcode_value)
 
         return send_file(
             buffer,
@@ -0,0 +1,96 @@
+import json
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from app import jobs, reports  # reports registers the export kinds
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+# Seconds between keep-alive comments on an idle event stream.
+EVENT_KEEPALIVE_SECONDS = 15
+
+@bp.route('', methods=['POST'])
+def submit_job():
+    """
+    Queues a background job. Body: {"kind": ..., "params": {...}}. Returns 202
+    with the new job, or 200 with an identical job that is already finished or
+    running ("reused": true), e.g. a report whose data has not changed since.
+    """
+    data = request.get_json(silent=True) or {}
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params must be an object.'}), 400
+    try:
+        job, reused = jobs.submit(str(data.get('kind') or ''), params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue job: {e}'}), 500
+    return jsonify({**job, "reused": reused}), 200 if reused else 202
+
+@bp.route('', methods=['GET'])
+def get_jobs():
+    """Jobs newest first. Query: kind."""
+    return jsonify(jobs.list_jobs(request.args.get('kind'))), 200
+
+@bp.route('/kinds', methods=['GET'])
+def get_job_kinds():
+    return jsonify(sorted(jobs.JOB_KINDS)), 200
+
+@bp.route('/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status (queued, running, ready or failed) and progress."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+@bp.route('/<string:job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    found = jobs.get_result(job_id)
+    if found is None:
+        return jsonify({'error': 'Job not found'}), 404
+    status, result = found
+    if status != 'ready':
+        return jsonify({'error': f"Job is {status}.", 'status': status}), 409
+    return jsonify(result), 200
+
+@bp.route('/<string:job_id>/download', methods=['GET'])
+def download_job_file(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job['has_file']:
+        return jsonify({'error': 'Job has no file; read its result instead.'}), 404
+    found = jobs.get_job_file(job_id)
+    if found is None:
+        return jsonify({'error': f"Job is {job['status']}.", 'status': job['status']}), 409
+    path, mimetype = found
+    extension = path.rsplit('.', 1)[-1]
+    return send_file(path, mimetype=mimetype, as_attachment=True,
+                     download_name=f"{job['kind']}_{job['created_at'][:10]}.{extension}")
+
+@bp.route('/<string:job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-sent events: the job record each time its status or progress
+    changes, ending after it is ready or failed.
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        revision = None
+        while True:
+            job = jobs.wait_for_update(job_id, revision, EVENT_KEEPALIVE_SECONDS)
+            if job is None:
+                return
+            if job['revision'] == revision:
+                yield ": keep-alive\n\n"
+                continue
+            revision = job['revision']
+            yield f"data: {json.dumps(job, default=str)}\n\n"
+            if job['status'] in jobs.FINISHED:
+                return
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
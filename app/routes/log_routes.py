@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from app.models import movement_log_model
+from app.models import movement_log_model, log_archive_model
+from app.json_format import wants_columnar, to_columnar
 from datetime import datetime # For date validation if needed here, though model handles it
 
 bp = Blueprint('logs', __name__, url_prefix='/api/movement-logs')
@@ -57,9 +58,15 @@ def get_movement_logs_route():
             except ValueError:
                 return jsonify({"error": "Invalid date_to format. Must be YYYY-MM-DD."}), 400
 
-        result = movement_log_model.get_movement_logs(filters=filters, page=page, page_size=page_size)
+        if request.args.get('include_archived', '').lower() in ('1', 'true', 'yes'):
+            filters['include_archived'] = True
+
+        include_total = request.args.get('include_total', 'true').lower() not in ('0', 'false', 'no')
+        result = movement_log_model.get_movement_logs(filters=filters, page=page, page_size=page_size, include_total=include_total)
 
         if result is not None:
+            if wants_columnar() and 'error' not in result:
+                result['logs'] = to_columnar(result['logs'])
             return jsonify(result), 200
         else:
             return jsonify({'error': 'Failed to retrieve movement logs'}), 500
@@ -113,10 +120,15 @@ def get_all_filtered_movement_logs():
             except ValueError:
                 return jsonify({"error": "Invalid date_to format. Must be YYYY-MM-DD."}), 400
 
+        if request.args.get('include_archived', '').lower() in ('1', 'true', 'yes'):
+            filters['include_archived'] = True
+
         # Call the model function without pagination to get all records
         all_logs = movement_log_model.get_movement_logs(filters=filters, page=None, page_size=None)
 
         if 'logs' in all_logs:
+            if wants_columnar():
+                return jsonify(to_columnar(all_logs['logs'])), 200
             return jsonify(all_logs['logs']), 200
         else:
             # Handle case where result might be an error dictionary
@@ -141,4 +153,30 @@ def get_daily_summary_route():
         # The model already returns 0s in case of non-critical issues or no data, so we can proceed
 
     # If summary contains keys additions_today and withdrawals_today, it's a success or 0 counts
-    return jsonify(summary), 200 
\ No newline at end of file
+    return jsonify(summary), 200
+
+@bp.route('/archives', methods=['GET'])
+def get_log_archives_route():
+    """Lists the yearly movement log archive files."""
+    try:
+        return jsonify(log_archive_model.get_archive_catalog()), 200
+    except Exception as e:
+        print(f"Error in /api/movement-logs/archives endpoint: {e}")
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+@bp.route('/archive', methods=['POST'])
+def archive_movement_logs_route():
+    """
+    Moves logs older than the horizon into the yearly archive files.
+    Optional JSON body: {"horizon_days": int, "vacuum": bool}.
+    """
+    data = request.get_json(silent=True) or {}
+    horizon_days = data.get('horizon_days')
+    if horizon_days is not None and (not isinstance(horizon_days, int) or horizon_days < 1):
+        return jsonify({"error": "horizon_days must be a positive integer."}), 400
+    try:
+        summary = log_archive_model.archive_movement_logs(horizon_days=horizon_days, vacuum=bool(data.get('vacuum')))
+        return jsonify(summary), 200
+    except Exception as e:
+        print(f"Error archiving movement logs: {e}")
+        return jsonify({'error': 'Failed to archive movement logs', 'details': str(e)}), 500
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from app import metrics
+
+bp = Blueprint('metrics', __name__, url_prefix='/api/metrics')
+
+@bp.route('', methods=['GET'])
+def get_metrics():
+    """Exposes the in-process metrics in the Prometheus text format."""
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
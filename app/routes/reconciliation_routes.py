@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from app.models import reconciliation_model
+
+bp = Blueprint('reconciliation', __name__, url_prefix='/api/reconciliation')
+
+@bp.route('', methods=['GET'])
+def get_reconciliation_report():
+    """Returns open stock/ledger discrepancies. Query: issue_type, item_id, limit, offset."""
+    issue_type = request.args.get('issue_type')
+    if issue_type and issue_type not in ('chain_break', 'quantity_mismatch'):
+        return jsonify({'error': "issue_type must be 'chain_break' or 'quantity_mismatch'."}), 400
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset must not be negative.'}), 400
+    try:
+        report = reconciliation_model.get_reconciliation_report(
+            issue_type=issue_type, item_id=request.args.get('item_id', type=int), limit=limit, offset=offset)
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to retrieve reconciliation report: {e}'}), 500
+
+@bp.route('/run', methods=['POST'])
+def run_reconciliation():
+    """Checks the logs added since the last run; {"full": true} re-checks every log."""
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(reconciliation_model.run_reconciliation(full=bool(data.get('full')))), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to run reconciliation: {e}'}), 500
@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify
+from app.models import scan_session_model
+
+bp = Blueprint('scan_sessions', __name__, url_prefix='/api/scan-sessions')
+
+@bp.route('', methods=['POST'])
+def create_scan_session():
+    """Opens a scan session. Body: adjustment_type ('addition' | 'removal'), person_name, destination_id, provider_id."""
+    data = request.get_json(silent=True) or {}
+    try:
+        session = scan_session_model.create_session(
+            data.get('adjustment_type'), data.get('person_name'),
+            destination_id=data.get('destination_id'), provider_id=data.get('provider_id'))
+        return jsonify(session), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to open scan session: {e}'}), 500
+
+@bp.route('', methods=['GET'])
+def get_scan_sessions():
+    return jsonify(scan_session_model.list_sessions()), 200
+
+@bp.route('/<string:session_id>', methods=['GET'])
+def get_scan_session(session_id):
+    session = scan_session_model.get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Scan session not found'}), 404
+    return jsonify(session), 200
+
+@bp.route('/<string:session_id>/scans', methods=['POST'])
+def add_scan(session_id):
+    """Adds a scan to the session. Body: barcode, quantity (default 1; negative undoes scans)."""
+    data = request.get_json(silent=True) or {}
+    barcode = data.get('barcode')
+    quantity = data.get('quantity', 1)
+    if not barcode:
+        return jsonify({'error': 'barcode is required.'}), 400
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity == 0:
+        return jsonify({'error': 'quantity must be a non-zero whole number.'}), 400
+    try:
+        line = scan_session_model.add_scan(session_id, str(barcode), quantity)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to record scan: {e}'}), 500
+    if line is None:
+        return jsonify({'error': 'Scan session not found'}), 404
+    return jsonify(line), 200
+
+@bp.route('/<string:session_id>/close', methods=['POST'])
+def close_scan_session(session_id):
+    """Applies the session as one adjustment per item in a single transaction."""
+    try:
+        result = scan_session_model.close_session(session_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to close scan session: {e}'}), 500
+    if result is None:
+        return jsonify({'error': 'Scan session not found'}), 404
+    return jsonify(result), 200
+
+@bp.route('/<string:session_id>', methods=['DELETE'])
+def discard_scan_session(session_id):
+    """Drops the session and its scans without touching stock."""
+    try:
+        if not scan_session_model.discard_session(session_id):
+            return jsonify({'error': 'Scan session not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'message': 'Scan session discarded.'}), 200
@@ -0,0 +1,131 @@
+import json
+import time
+from flask import Blueprint, current_app, jsonify
+from app import metrics
+from app.models import item_model, scan_session_model
+
+# Persistent channel for scanning stations at /ws/scan.
+#
+# Each text frame is one JSON request with a client-chosen "id" and an "op":
+#   {"id": 1, "op": "lookup", "barcode": "..."}
+#   {"id": 2, "op": "adjust", "barcode": "..." | "item_id": 5, "change_amount": 1,
+#    "adjustment_type": "removal", "person_name": "...", "destination_id": 3}
+#   {"id": 3, "op": "scan", "session_id": "...", "barcode": "...", "quantity": 1}
+# and is answered with {"id": ..., "status": 200, "result": ...} or
+# {"id": ..., "status": 4xx/5xx, "error": "..."}, the status codes the REST
+# endpoints use. One loop serves each connection, so a station may send many
+# requests without waiting and the replies come back in the same order.
+#
+# flask-sock is optional (stations then use the REST endpoints) and is imported
+# on the first connection rather than at startup.
+
+bp = Blueprint('scan_socket', __name__)
+
+ADJUST_FIELDS = ('change_amount', 'adjustment_type', 'person_name', 'provider_id', 'cost', 'destination_id')
+
+class _NotFound(Exception):
+    pass
+
+def _lookup(message):
+    item = item_model.lookup_item_by_barcode(str(message.get('barcode') or ''))
+    if item is None:
+        raise _NotFound('Item not found or is not active')
+    return item
+
+def _adjust(message):
+    item_id = message.get('item_id')
+    if item_id is None:
+        item_id = _lookup(message)['id']
+    elif not isinstance(item_id, int) or isinstance(item_id, bool):
+        raise ValueError('item_id must be a whole number.')
+    elif item_model.get_item_by_id(item_id) is None:
+        raise _NotFound('Item not found')
+    if message.get('adjustment_type') not in ('addition', 'removal'):
+        raise ValueError("adjustment_type must be 'addition' or 'removal'.")
+    change_amount = message.get('change_amount')
+    if not isinstance(change_amount, int) or isinstance(change_amount, bool) or change_amount <= 0:
+        raise ValueError('change_amount must be a positive whole number.')
+    return item_model.record_quantity_adjustment(item_id=item_id, **{key: message.get(key) for key in ADJUST_FIELDS})
+
+def _scan(message):
+    quantity = message.get('quantity', 1)
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity == 0:
+        raise ValueError('quantity must be a non-zero whole number.')
+    line = scan_session_model.add_scan(str(message.get('session_id')), str(message.get('barcode') or ''), quantity)
+    if line is None:
+        raise _NotFound('Scan session not found')
+    return line
+
+_OPERATIONS = {'lookup': _lookup, 'adjust': _adjust, 'scan': _scan}
+
+def handle_message(raw) -> dict:
+    """Answers one framed request; never raises, so one bad message doesn't drop the connection."""
+    start = time.perf_counter()
+    op = None
+    try:
+        message = json.loads(raw)
+        if not isinstance(message, dict):
+            raise ValueError('A request must be a JSON object.')
+    except ValueError as e:
+        metrics.SCAN_SOCKET_MESSAGE_SECONDS.observe(time.perf_counter() - start, 'invalid')
+        return {"id": None, "status": 400, "error": f"Invalid request: {e}"}
+    reply = {"id": message.get('id')}
+    try:
+        op = message.get('op')
+        operation = _OPERATIONS.get(op)
+        if operation is None:
+            raise ValueError(f"Unknown op '{op}'.")
+        reply.update(status=200, result=operation(message))
+    except _NotFound as e:
+        reply.update(status=404, error=str(e))
+    except ValueError as e:
+        reply.update(status=400, error=str(e))
+    except Exception as e:
+        reply.update(status=500, error=f"An unexpected error occurred: {e}")
+    metrics.SCAN_SOCKET_MESSAGE_SECONDS.observe(time.perf_counter() - start, op if op in _OPERATIONS else 'invalid')
+    return reply
+
+def _serve(ws):
+    metrics.SCAN_SOCKETS_OPEN.inc()
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                return
+            ws.send(current_app.json.dumps(handle_message(raw)))
+    finally:
+        metrics.SCAN_SOCKETS_OPEN.dec()
+
+_socket_view = None
+
+def _get_socket_view():
+    """The flask-sock view serving _serve, built on first use; None without flask-sock."""
+    global _socket_view
+    if _socket_view is None:
+        try:
+            from flask_sock import Sock
+        except ImportError:
+            return None
+        views = []
+
+        # flask-sock has no public way to build its view without registering a
+        # rule. Sock.route(path, bp=...) wraps the function in the view that
+        # runs the WebSocket handshake and passes it to bp.route(path,
+        # websocket=True); _Capture stands in for the blueprint to keep that
+        # view. This relies on flask-sock 0.7.0 internals, hence the exact pin
+        # in requirements.txt; tests/test_scan_socket.py opens a real
+        # connection, so an upgrade that changes them fails there.
+        class _Capture:
+            def route(self, path, **options):
+                return views.append
+
+        Sock().route('/ws/scan', bp=_Capture())(_serve)
+        _socket_view = views[0]
+    return _socket_view
+
+@bp.route('/ws/scan', websocket=True)
+def scan_socket():
+    view = _get_socket_view()
+    if view is None:
+        return jsonify({'error': 'WebSocket support is not installed'}), 404
+    return view()
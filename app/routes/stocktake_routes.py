@@ -0,0 +1,162 @@
+import csv
+import io
+from flask import Blueprint, request, jsonify
+from app.models import stocktake_model
+from app.json_format import wants_columnar, to_columnar
+
+bp = Blueprint('stocktakes', __name__, url_prefix='/api/stocktakes')
+
+def _parse_counts_csv(text):
+    """
+    Reads an uploaded count sheet: a header row with item_id or barcode,
+    counted_quantity and optionally counted_at. Raises ValueError with a message.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip('﻿')))
+    fields = set(reader.fieldnames or [])
+    if not fields & {'item_id', 'barcode'} or 'counted_quantity' not in fields:
+        raise ValueError('The sheet needs an item_id or barcode column and a counted_quantity column.')
+    counts = []
+    for line_number, row in enumerate(reader, start=2):
+        try:
+            count = {'counted_quantity': int(row['counted_quantity'])}
+            if (row.get('item_id') or '').strip():
+                count['item_id'] = int(row['item_id'])
+        except (TypeError, ValueError):
+            raise ValueError(f'Line {line_number}: item_id and counted_quantity must be whole numbers.')
+        if 'item_id' not in count:
+            count['barcode'] = (row.get('barcode') or '').strip()
+            if not count['barcode']:
+                raise ValueError(f'Line {line_number}: an item_id or barcode is required.')
+        if (row.get('counted_at') or '').strip():
+            count['counted_at'] = row['counted_at'].strip()
+        counts.append(count)
+    return counts
+
+@bp.route('', methods=['POST'])
+def create_stocktake():
+    """
+    Opens a session and snapshots the expected quantities. Body: name,
+    person_name and at most one scope of sub_category_id, main_category_id or
+    item_ids (all active items when none is given).
+    """
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Stocktake name is required.'}), 400
+    scopes = [key for key in ('sub_category_id', 'main_category_id', 'item_ids') if data.get(key) is not None]
+    if len(scopes) > 1:
+        return jsonify({'error': 'Give at most one of sub_category_id, main_category_id and item_ids.'}), 400
+    item_ids = data.get('item_ids')
+    if item_ids is not None and (not isinstance(item_ids, list) or not all(isinstance(i, int) for i in item_ids)):
+        return jsonify({'error': 'item_ids must be a list of item IDs.'}), 400
+    try:
+        session = stocktake_model.create_session(
+            name, data.get('person_name'), sub_category_id=data.get('sub_category_id'),
+            main_category_id=data.get('main_category_id'), item_ids=item_ids)
+        return jsonify(session), 201
+    except Exception as e:
+        return jsonify({'error': f'Failed to open stocktake: {e}'}), 500
+
+@bp.route('', methods=['GET'])
+def get_stocktakes():
+    """Lists sessions, newest first. Query: status."""
+    status = request.args.get('status')
+    if status and status not in ('open', 'posted', 'cancelled'):
+        return jsonify({'error': "status must be 'open', 'posted' or 'cancelled'."}), 400
+    try:
+        return jsonify(stocktake_model.list_sessions(status)), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to retrieve stocktakes: {e}'}), 500
+
+@bp.route('/<int:session_id>', methods=['GET'])
+def get_stocktake(session_id):
+    try:
+        session = stocktake_model.get_session(session_id)
+        if session is None:
+            return jsonify({'error': 'Stocktake not found'}), 404
+        return jsonify(session), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to retrieve stocktake: {e}'}), 500
+
+@bp.route('/<int:session_id>/counts', methods=['POST'])
+def record_counts(session_id):
+    """
+    Records counts in bulk. JSON body: {"counts": [{"item_id" or "barcode",
+    "counted_quantity", "counted_at"}], "mode": "set" | "add", "person_name"};
+    scanners send mode "add" and may leave out counted_quantity (1 per scan).
+    A count sheet can be uploaded as a CSV file field "file" or a text/csv
+    body, with mode and person_name in the query string.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None or request.mimetype == 'text/csv':
+            raw = upload.read() if upload is not None else request.get_data()
+            counts = _parse_counts_csv(raw.decode('utf-8-sig'))
+            options = request.values
+        else:
+            options = request.get_json(silent=True) or {}
+            counts = options.get('counts')
+            if not isinstance(counts, list) or not all(isinstance(count, dict) for count in counts):
+                raise ValueError('counts must be a list of objects.')
+        result = stocktake_model.record_counts(
+            session_id, counts, options.get('person_name'), mode=options.get('mode', 'set'))
+    except UnicodeDecodeError:
+        return jsonify({'error': 'The sheet must be UTF-8 encoded.'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to record counts: {e}'}), 500
+    if result is None:
+        return jsonify({'error': 'Stocktake not found'}), 404
+    return jsonify(result), 200
+
+@bp.route('/<int:session_id>/variances', methods=['GET'])
+def get_variances(session_id):
+    """
+    Returns counted lines with book quantity and variance, largest first.
+    Query: only_differences=true, include_uncounted=true, limit, offset,
+    format=columnar.
+    """
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if (limit is not None and limit < 1) or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset must not be negative.'}), 400
+    try:
+        data = stocktake_model.get_variances(
+            session_id,
+            only_differences=request.args.get('only_differences', 'false').lower() == 'true',
+            include_uncounted=request.args.get('include_uncounted', 'false').lower() == 'true',
+            limit=limit, offset=offset)
+        if data is None:
+            return jsonify({'error': 'Stocktake not found'}), 404
+        if wants_columnar():
+            data["lines"] = to_columnar(data["lines"])
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute variances: {e}'}), 500
+
+@bp.route('/<int:session_id>/post', methods=['POST'])
+def post_stocktake(session_id):
+    """Posts every counted variance as an adjustment and closes the session. Body: person_name."""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = stocktake_model.post_session(session_id, data.get('person_name'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to post stocktake: {e}'}), 500
+    if result is None:
+        return jsonify({'error': 'Stocktake not found'}), 404
+    return jsonify(result), 200
+
+@bp.route('/<int:session_id>/cancel', methods=['POST'])
+def cancel_stocktake(session_id):
+    try:
+        session = stocktake_model.cancel_session(session_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to cancel stocktake: {e}'}), 500
+    if session is None:
+        return jsonify({'error': 'Stocktake not found'}), 404
+    return jsonify(session), 200
@@ -23,13 +23,10 @@ def create_unit():
 
 @bp.route('/', methods=['GET'])
 def get_units():
-    print("--- GET /api/units/ RECEIVED ---")
     try:
         units = unit_model.get_all_units()
-        print(f"--- GET /api/units/ RETURNING {len(units)} UNITS ---")
         return jsonify(units), 200
     except Exception as e:
-        print(f"--- GET /api/units/ FAILED WITH EXCEPTION: {e} ---")
         return jsonify({"error": "Failed to retrieve units", "details": str(e)}), 500
 
 @bp.route('/<int:unit_id>', methods=['GET'])
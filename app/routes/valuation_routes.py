@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify
+from app import jobs
+from app.models import valuation_model
+
+bp = Blueprint('valuation', __name__, url_prefix='/api/valuation')
+
+def _backfill_job():
+    """
+    The 'valuation_backfill' job while the one-off replay of the movement
+    history has not finished (usually just after an upgrade), else None.
+    Requests that arrive meanwhile share the job that is running.
+    """
+    if valuation_model.is_backfilled():
+        return None
+    job, _ = jobs.submit('valuation_backfill')
+    return job
+
+@bp.route('', methods=['GET'])
+def get_valuation_summary():
+    """Returns the total stock value (FIFO and weighted average); 202 with the backfill job until it is built."""
+    try:
+        job = _backfill_job()
+        if job is not None:
+            return jsonify({"status": "building", "job": job}), 202
+        return jsonify(valuation_model.get_valuation_summary()), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute stock valuation: {e}'}), 500
+
+@bp.route('/categories', methods=['GET'])
+def get_category_valuation():
+    """Returns stock value per sub-category, or per main category with ?level=main."""
+    level = request.args.get('level', 'sub')
+    if level not in ('sub', 'main'):
+        return jsonify({'error': "level must be 'sub' or 'main'."}), 400
+    try:
+        job = _backfill_job()
+        if job is not None:
+            return jsonify({"status": "building", "job": job}), 202
+        return jsonify(valuation_model.get_category_valuation(level)), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute category valuation: {e}'}), 500
+
+@bp.route('/items/<int:item_id>', methods=['GET'])
+def get_item_valuation(item_id):
+    """Returns one item's valuation and open cost layers."""
+    try:
+        job = _backfill_job()
+        if job is not None:
+            return jsonify({"status": "building", "job": job}), 202
+        result = valuation_model.get_item_valuation(item_id)
+        if result is None:
+            return jsonify({'error': 'Item not found'}), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to retrieve item valuation: {e}'}), 500
+
+@bp.route('/rebuild', methods=['POST'])
+def rebuild_valuation():
+    """
+    Rebuilds all cost layers from the movement history in a 'valuation_rebuild'
+    job. Returns 202 with the job, or 200 with a rebuild already queued or running.
+    """
+    try:
+        job, reused = jobs.submit('valuation_rebuild')
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue stock valuation rebuild: {e}'}), 500
+    return jsonify({**job, "reused": reused}), 200 if reused else 202
+
+# Both replay every log, so they run as jobs. They write, so their results are
+# never reused; a job of the same kind already queued or running is shared.
+jobs.register('valuation_backfill', lambda params, progress: valuation_model.backfill())
+jobs.register('valuation_rebuild', lambda params, progress: valuation_model.backfill(rebuild=True))
@@ -0,0 +1,136 @@
+"""
+Serves the built SPA (UI/dist) from an in-memory manifest.
+
+The build directory is indexed once at startup, so requests never touch the
+file system to decide what to send. Vite's content-hashed bundles
+(assets/<name>-<hash>.<ext>) are cached by the webview for a year as
+immutable; index.html and the other unhashed files are revalidated with an
+ETag and usually answered with 304. Precompressed .br/.gz siblings, written at
+packaging time by precompress_directory(), are served when the client accepts
+them.
+
+Packaging:
+    python -m app.static_assets UI/dist
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from flask import request, send_file
+from . import compression
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Vite names bundles <name>-<8 char hash>.<ext> under assets/.
+_HASHED_ASSET_RE = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+_VARIANT_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+# A precompressed file is only kept if it saves at least this fraction.
+_MIN_SAVING = 0.1
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_manifest(root: str) -> dict:
+    """
+    Maps every file below root (as a URL path, e.g. 'assets/index-AbC12345.js')
+    to its mimetype, ETag, cache policy and precompressed variants.
+    """
+    manifest = {}
+    variants = []
+    if not os.path.isdir(root):
+        return manifest
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            full_path = os.path.join(dir_path, file_name)
+            url_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+            base, suffix = os.path.splitext(url_path)
+            if suffix in _VARIANT_SUFFIXES:
+                variants.append((base, _VARIANT_SUFFIXES[suffix], full_path))
+                continue
+            manifest[url_path] = {
+                "path": full_path,
+                "mimetype": mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+                "etag": _file_hash(full_path),
+                "immutable": bool(_HASHED_ASSET_RE.match(url_path)),
+                "variants": {},
+            }
+    # vite build empties dist/, so a variant always belongs to the current build.
+    for base, encoding, full_path in variants:
+        if base in manifest:
+            manifest[base]["variants"][encoding] = full_path
+    return manifest
+
+def _send_asset(asset: dict):
+    path = asset["path"]
+    etag = asset["etag"]
+    encoding = None
+    if asset["variants"]:
+        encoding = compression.choose_encoding(request.accept_encodings)
+        if encoding in asset["variants"]:
+            path = asset["variants"][encoding]
+            etag = f"{etag}-{encoding}"
+        else:
+            encoding = None
+
+    response = send_file(path, mimetype=asset["mimetype"], etag=etag, conditional=True,
+                         max_age=IMMUTABLE_MAX_AGE if asset["immutable"] else None)
+    if asset["immutable"]:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    if asset["variants"]:
+        response.vary.add('Accept-Encoding')
+    if encoding and response.status_code != 304:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_app(app, root: str):
+    """Indexes root and registers the SPA catch-all route on app."""
+    manifest = build_manifest(root)
+    app.config['STATIC_MANIFEST'] = manifest
+    print(f"Indexed {len(manifest)} UI file(s) from '{root}'.")
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve_spa(path):
+        asset = manifest.get(path) or manifest.get('index.html')
+        if asset is None:
+            return "UI build not found.", 404
+        return _send_asset(asset)
+
+def precompress_directory(root: str) -> int:
+    """
+    Writes .gz (and .br when brotli is installed) next to every compressible
+    file in root. Run at packaging time; returns the number of files written.
+    """
+    written = 0
+    encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if os.path.splitext(file_name)[1] in _VARIANT_SUFFIXES:
+                continue
+            if mimetypes.guess_type(file_name)[0] not in compression.COMPRESSIBLE_MIMETYPES:
+                continue
+            full_path = os.path.join(dir_path, file_name)
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            if len(data) < compression.COMPRESSION_MIN_BYTES:
+                continue
+            for encoding in encodings:
+                suffix = '.br' if encoding == 'br' else '.gz'
+                # Packaging is a one-off, so use the strongest settings.
+                compressed = compression.compress(data, encoding, best=True)
+                if len(compressed) <= len(data) * (1 - _MIN_SAVING):
+                    with open(full_path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join('UI', 'dist')
+    print(f"Wrote {precompress_directory(target)} precompressed file(s) in '{target}'.")
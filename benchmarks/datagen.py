@@ -0,0 +1,183 @@
+"""
+Generates synthetic warehouse databases for benchmarking.
+
+The database is created through the application's own schema.sql and
+migrations (db_utils.initialize_database), then filled with nested categories,
+items with Arabic and Latin names, and a movement log history whose action mix,
+timestamps and quantity chain look like a real install: every item starts with
+a Creation entry, removals never drive stock negative, and each row's
+resulting_quantity follows from the previous one.
+
+Usage:
+    python -m benchmarks.datagen OUTPUT.db [--items 10000] [--logs 1000000] [--days 730]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import db_utils, movement_log_model
+from app.models.text_utils import normalize_name
+
+UNIT_NAMES = ['قطعة', 'علبة', 'كرتونة', 'متر', 'كيلوجرام', 'لتر', 'لفة', 'طقم', 'piece', 'box']
+MAIN_CATEGORY_NAMES = ['كهرباء', 'سباكة', 'أدوات', 'قرطاسية', 'نظافة', 'قطع غيار', 'Electronics', 'Safety']
+ITEM_WORDS = ['مفتاح', 'كابل', 'مسمار', 'صمام', 'لمبة', 'شريط', 'ورق', 'قفاز', 'فلتر', 'Bolt', 'Cable', 'Valve', 'Filter']
+PERSON_NAMES = ['أحمد', 'محمد', 'خالد', 'سارة', 'فاطمة', 'عمر', 'يوسف', 'ليلى', 'Admin']
+
+# Relative frequency of the logged actions after each item's Creation entry.
+ACTION_MIX = [('Removal', 0.62), ('Addition', 0.30), ('Update', 0.05), ('Status Change', 0.02), ('Restored', 0.01)]
+
+BATCH_SIZE = 50_000
+
+
+def create_database(path):
+    """Creates an empty database at path using the application's schema and migrations."""
+    if os.path.exists(path):
+        os.remove(path)
+    db_utils.DATABASE_NAME = os.path.abspath(path)
+    db_utils.DB_INITIALIZED = False
+    db_utils.initialize_database()
+    return db_utils.get_db_connection()
+
+
+def generate(path, items=10_000, logs=1_000_000, days=730, sub_categories_per_main=12,
+             providers=30, destinations=40, seed=42, verbose=True):
+    """Generates a synthetic database at path and returns a summary dict."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    conn = create_database(path)
+    cursor = conn.cursor()
+
+    cursor.executemany("INSERT INTO units (name) VALUES (?)", [(name,) for name in UNIT_NAMES])
+    cursor.executemany("INSERT INTO providers (name) VALUES (?)", [(f"مورد {i}",) for i in range(1, providers + 1)])
+    cursor.executemany("INSERT INTO destinations (name) VALUES (?)", [(f"قسم {i}",) for i in range(1, destinations + 1)])
+
+    sub_category_ids = []
+    for main_name in MAIN_CATEGORY_NAMES:
+        cursor.execute("INSERT INTO categories (name) VALUES (?)", (main_name,))
+        main_id = cursor.lastrowid
+        for i in range(1, sub_categories_per_main + 1):
+            cursor.execute("INSERT INTO categories (name, parent_id) VALUES (?, ?)", (f"{main_name} {i}", main_id))
+            sub_category_ids.append(cursor.lastrowid)
+
+    # Quantities start at zero and are set from the generated log chain at the end.
+    item_rows = []
+    item_costs = []
+    for item_id in range(1, items + 1):
+        name = f"{rng.choice(ITEM_WORDS)} {rng.choice(ITEM_WORDS)} {item_id}"
+        cost = round(rng.lognormvariate(2.5, 1.0), 2)
+        item_costs.append(cost)
+        status = 'active' if rng.random() < 0.9 else rng.choice(['inactive', 'archived'])
+        item_rows.append((item_id, name, normalize_name(name), rng.randint(1, len(UNIT_NAMES)),
+                          rng.choice(sub_category_ids), rng.randint(1, providers), cost, status,
+                          f"62{item_id:011d}"))
+    cursor.executemany(
+        "INSERT INTO items (id, name, normalized_name, unit_id, sub_category_id, provider_id, cost, status, barcode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        item_rows
+    )
+    item_names = [row[1] for row in item_rows]
+    conn.commit()
+
+    # Popular items are picked far more often than the long tail (Zipf-like).
+    weights = [1.0 / (rank ** 0.8) for rank in range(1, items + 1)]
+    rng.shuffle(weights)
+    actions, action_weights = zip(*ACTION_MIX)
+    quantities = [0] * items
+    start_time = datetime.now() - timedelta(days=days)
+    span_seconds = days * 86400
+    creation_window = min(span_seconds / 4, 90 * 86400)
+
+    def log_rows():
+        for index in range(items):
+            quantity = rng.randint(0, 200)
+            quantities[index] = quantity
+            timestamp = start_time + timedelta(seconds=creation_window * index / items)
+            yield (index + 1, item_names[index], 'Creation', quantity, quantity, None, None,
+                   "Item created.", rng.choice(PERSON_NAMES), None, timestamp)
+
+        remaining = max(0, logs - items)
+        chosen_items = rng.choices(range(items), weights=weights, k=min(remaining, BATCH_SIZE))
+        for n in range(remaining):
+            if n and n % BATCH_SIZE == 0:
+                chosen_items = rng.choices(range(items), weights=weights, k=min(remaining - n, BATCH_SIZE))
+            index = chosen_items[n % BATCH_SIZE]
+            item_id = index + 1
+            offset = creation_window + (span_seconds - creation_window) * n / remaining
+            timestamp = start_time + timedelta(seconds=offset)
+            action = rng.choices(actions, weights=action_weights)[0]
+            person = rng.choice(PERSON_NAMES)
+
+            if action == 'Removal' and quantities[index] == 0:
+                action = 'Addition'
+            if action == 'Addition':
+                change = rng.randint(5, 100)
+                quantities[index] += change
+                yield (item_id, item_names[index], 'Addition', change, quantities[index], rng.randint(1, providers),
+                       round(item_costs[index] * rng.uniform(0.9, 1.1), 2), None, person, None, timestamp)
+            elif action == 'Removal':
+                change = rng.randint(1, max(1, min(quantities[index], 20)))
+                quantities[index] -= change
+                yield (item_id, item_names[index], 'Removal', change, quantities[index], None, None, None,
+                       person, rng.randint(1, destinations), timestamp)
+            else:
+                yield (item_id, item_names[index], action, None, None, None, None, f"{action} (synthetic).",
+                       person, None, timestamp)
+
+    insert_sql = movement_log_model.LOG_INSERT_SQL
+    batch = []
+    written = 0
+    for row in log_rows():
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            movement_log_model.intern_log_values(cursor, batch)
+            cursor.executemany(insert_sql, batch)
+            conn.commit()
+            written += len(batch)
+            batch.clear()
+            if verbose:
+                print(f"  {written:,} movement logs written...", end="\r")
+    if batch:
+        movement_log_model.intern_log_values(cursor, batch)
+        cursor.executemany(insert_sql, batch)
+        written += len(batch)
+    cursor.executemany("UPDATE items SET current_quantity = ? WHERE id = ?",
+                       [(quantity, index + 1) for index, quantity in enumerate(quantities)])
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    summary = {
+        "path": os.path.abspath(path),
+        "items": items,
+        "movement_logs": written,
+        "categories": len(MAIN_CATEGORY_NAMES) * (sub_categories_per_main + 1),
+        "seconds": round(time.perf_counter() - started, 2),
+        "bytes": os.path.getsize(path),
+    }
+    if verbose:
+        print()
+        print(f"Generated {summary['items']:,} items and {summary['movement_logs']:,} movement logs "
+              f"({summary['bytes'] / 1e6:.1f} MB) in {summary['seconds']} s.")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('output')
+    parser.add_argument('--items', type=int, default=10_000, help='Number of items (1k-500k).')
+    parser.add_argument('--logs', type=int, default=1_000_000, help='Total movement log rows (up to 10M).')
+    parser.add_argument('--days', type=int, default=730, help='Length of the generated history in days.')
+    parser.add_argument('--sub-categories', type=int, default=12, help='Sub-categories per main category.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    generate(args.output, items=args.items, logs=args.logs, days=args.days,
+             sub_categories_per_main=args.sub_categories, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
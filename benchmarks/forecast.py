@@ -0,0 +1,85 @@
+"""
+Measures the reorder forecast: a full computation, a cached request and a
+request after an adjustment.
+
+The full computation reads every Removal of the lookback window and reduces it
+with NumPy; the cached request applies the current quantities, lead time and
+service level to the cached per-item arrays. After an adjustment only
+the new removal is merged into the cached totals. The default size is the
+target workload of 100k items with two years of history.
+
+Usage:
+    python -m benchmarks.forecast [--db existing.db] [--items 100000] [--logs 3000000]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db_utils, forecast_model, item_model
+from benchmarks import datagen
+
+
+def _timed_ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Reuse an existing generated database (a copy is used).')
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--logs', type=int, default=3_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wh_forecast_')
+    os.environ['APPDATA'] = work_dir
+    db_path = os.path.join(work_dir, 'forecast.db')
+    if args.db:
+        with sqlite3.connect(args.db) as source, sqlite3.connect(db_path) as target:
+            source.backup(target)
+        db_utils.DATABASE_NAME = db_path
+        db_utils.DB_INITIALIZED = False
+        db_utils.initialize_database()
+    else:
+        datagen.generate(db_path, items=args.items, logs=args.logs)
+
+    app = create_app()
+    with app.app_context():
+        db = db_utils.get_db()
+        removals = db.execute("SELECT COUNT(*) FROM movement_logs WHERE action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal')").fetchone()[0]
+        print(f"{removals:,} removal log(s) in the database.\n")
+
+        ids = forecast_model._read_items(db)[0]
+        log_id = db.execute("SELECT MAX(id) FROM movement_logs").fetchone()[0]
+        full = [_timed_ms(lambda: forecast_model._compute_stats(db, date.today(), ids, log_id))[0]
+                for _ in range(args.repeat)]
+        forecast_model._cache.clear()
+        first, result = _timed_ms(lambda: forecast_model.get_reorder_forecast(only_reorder=True, limit=50))
+        cached = [_timed_ms(lambda: forecast_model.get_reorder_forecast(only_reorder=True, limit=50))[0]
+                  for _ in range(args.repeat)]
+        adjusted = []
+        for _ in range(args.repeat):
+            item_model.record_quantity_adjustment(int(ids[0]), 1, 'addition', 'benchmark')
+            item_model.record_quantity_adjustment(int(ids[0]), 1, 'removal', 'benchmark')
+            adjusted.append(_timed_ms(lambda: forecast_model.get_reorder_forecast(only_reorder=True, limit=50))[0])
+
+    print(f"{'step':<30} {'p50 ms':>9}")
+    print(f"{'full computation':<30} {statistics.median(full):>9.0f}")
+    print(f"{'first request (cold cache)':<30} {first:>9.0f}")
+    print(f"{'cached request':<30} {statistics.median(cached):>9.1f}")
+    print(f"{'request after an adjustment':<30} {statistics.median(adjusted):>9.1f}")
+    print(f"\n{result['total_count']:,} item(s) need a reorder, {result['low_cover_count']:,} have less cover than the lead time.")
+
+
+if __name__ == '__main__':
+    main()
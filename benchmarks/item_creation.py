@@ -0,0 +1,99 @@
+"""
+Benchmarks item creation latency against large item tables.
+
+Every add_item call first checks for an existing item with the same name, so
+its latency is dominated by that lookup once the table grows. The benchmark
+seeds a throw-away database with N items (a quarter of them archived, as in a
+long-lived install), then times add_item and compares the indexed
+normalized_name lookup with the legacy LOWER(name) = LOWER(?) query.
+
+Usage:
+    python -m benchmarks.item_creation [--sizes 10000 100000] [--samples 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import flask
+
+from app.models import db_utils, item_model
+from app.models.text_utils import normalize_name
+
+
+def _seed_items(conn, count):
+    conn.execute("INSERT INTO units (name) VALUES ('piece')")
+    conn.execute("INSERT INTO categories (name) VALUES ('Main')")
+    conn.execute("INSERT INTO categories (name, parent_id) VALUES ('Sub', 1)")
+    rows = (
+        (f"Seed item {i}", normalize_name(f"Seed item {i}"), 1, 2, 10,
+         'archived' if i % 4 == 0 else 'active', f"SEED{i:08d}")
+        for i in range(count)
+    )
+    conn.executemany(
+        "INSERT INTO items (name, normalized_name, unit_id, sub_category_id, current_quantity, status, barcode) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_size(count, samples):
+    tmp_dir = tempfile.mkdtemp(prefix='wh_bench_')
+    db_utils.DATABASE_NAME = os.path.join(tmp_dir, 'bench.db')
+    db_utils.DB_INITIALIZED = False
+    db_utils.initialize_database()
+
+    conn = db_utils.get_db_connection()
+    _seed_items(conn, count)
+
+    legacy_times = []
+    for i in range(samples):
+        start = time.perf_counter()
+        conn.execute("SELECT * FROM items WHERE LOWER(name) = LOWER(?)", (f"Missing item {i}",)).fetchone()
+        legacy_times.append(time.perf_counter() - start)
+    conn.close()
+
+    app = flask.Flask(__name__)
+    create_times = []
+    with app.app_context():
+        for i in range(samples):
+            start = time.perf_counter()
+            item_model.add_item(name=f"Bench item {i}", unit_id=1, sub_category_id=2, quantity=1,
+                                provider_id=None, cost=None, person_name='bench', barcode=None)
+            create_times.append(time.perf_counter() - start)
+        db = flask.g.pop('db', None)
+        if db is not None:
+            db.close()
+
+    return {
+        "items": count,
+        "add_item_p50_ms": statistics.median(create_times) * 1000,
+        "add_item_p95_ms": _percentile(create_times, 0.95) * 1000,
+        "legacy_name_lookup_p50_ms": statistics.median(legacy_times) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'items':>10} {'add_item p50':>14} {'add_item p95':>14} {'LOWER() lookup p50':>20}")
+    for count in args.sizes:
+        result = run_size(count, args.samples)
+        print(f"{result['items']:>10} {result['add_item_p50_ms']:>11.3f} ms {result['add_item_p95_ms']:>11.3f} ms "
+              f"{result['legacy_name_lookup_p50_ms']:>17.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
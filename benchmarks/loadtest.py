@@ -0,0 +1,249 @@
+"""
+Load-tests the HTTP API with simulated barcode-scanning stations.
+
+Each station is a thread with its own keep-alive connection. Scans arrive as
+a Poisson process at --rate scans/second per station; a scan is a
+GET /api/items/by-barcode/<code> followed by POST /api/items/<id>/adjust.
+With probability --read-ratio a station also loads a dashboard or movement
+log page between scans, as the office PCs do.
+
+By default the app is served in-process on a free port from a synthetic
+database (see benchmarks.datagen); pass --url to target a running install.
+
+Usage:
+    python -m benchmarks.loadtest [--stations 8] [--rate 2] [--duration 30]
+                                  [--db existing.db | --url http://127.0.0.1:5070]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+READ_REQUESTS = [
+    ("dashboard_summary", "/api/movement-logs/summary/today"),
+    ("dashboard_items", "/api/items/?page=1&page_size=10"),
+    ("logs_page", "/api/movement-logs?page=1&page_size=50"),
+    ("logs_page_2", "/api/movement-logs?page=2&page_size=50"),
+]
+
+
+class Station(threading.Thread):
+    """One simulated scanning station."""
+
+    def __init__(self, host, port, barcodes, rate, read_ratio, deadline, seed, recorder):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.barcodes = barcodes
+        self.rate = rate
+        self.read_ratio = read_ratio
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.recorder = recorder
+        self.connection = None
+
+    def _request(self, name, method, path, body=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        start = time.perf_counter()
+        status, data = None, b''
+        for attempt in range(2):
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                status, data = response.status, response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                break
+            except (http.client.HTTPException, OSError):
+                if self.connection is not None:
+                    self.connection.close()
+                self.connection = None
+                if attempt:
+                    status = 'connection_error'
+        self.recorder.record(name, time.perf_counter() - start, status, data)
+        return status, data
+
+    def run(self):
+        next_scan = time.perf_counter()
+        while True:
+            next_scan += self.rng.expovariate(self.rate)
+            delay = next_scan - time.perf_counter()
+            if time.perf_counter() + max(delay, 0) >= self.deadline:
+                return
+            if delay > 0:
+                time.sleep(delay)
+
+            status, data = self._request("scan_lookup", "GET", f"/api/items/by-barcode/{self.rng.choice(self.barcodes)}")
+            if status == 200:
+                item = json.loads(data)
+                body = {"change_amount": 1, "person_name": "loadtest"}
+                body["adjustment_type"] = "removal" if item.get('current_quantity', 0) > 0 and self.rng.random() < 0.7 else "addition"
+                self._request("scan_adjust", "POST", f"/api/items/{item['id']}/adjust", body)
+
+            if self.rng.random() < self.read_ratio:
+                name, path = self.rng.choice(READ_REQUESTS)
+                self._request(name, "GET", path)
+
+
+class Recorder:
+    """Collects latencies and outcomes from all stations."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = defaultdict(int)
+
+    def record(self, name, duration, status, body):
+        with self.lock:
+            self.latencies[name].append(duration)
+            if status != 200:
+                self.errors[name] += 1
+                if b'locked' in body or b'busy' in body:
+                    self.lock_errors[name] += 1
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def _summarize(samples, errors, lock_errors, elapsed):
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "lock_error_rate": round(lock_errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+def report(recorder, elapsed):
+    results = {}
+    for name, samples in sorted(recorder.latencies.items()):
+        results[name] = _summarize(samples, recorder.errors[name], recorder.lock_errors[name], elapsed)
+    all_samples = [s for samples in recorder.latencies.values() for s in samples]
+    results["all"] = _summarize(all_samples, sum(recorder.errors.values()), sum(recorder.lock_errors.values()), elapsed)
+
+    print(f"\n{'operation':<18} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'locked':>7}")
+    for name, row in results.items():
+        print(f"{name:<18} {row['requests']:>7} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.2%} {row['lock_error_rate']:>7.2%}")
+    return results
+
+
+def _start_local_server(db_path):
+    """Serves the app in a background thread on a free port, like the desktop build does."""
+    import logging
+    from werkzeug.serving import make_server
+    from app import create_app
+    from app.models import db_utils
+
+    # The per-request access log would dominate the console output.
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    db_utils.DATABASE_NAME = db_path
+    db_utils.DB_INITIALIZED = False
+    db_utils.initialize_database()
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _load_barcodes(db_path=None, url=None, limit=5000):
+    if db_path:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT barcode FROM items WHERE status = 'active' AND barcode IS NOT NULL LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+    parsed = urlparse(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    barcodes = []
+    page = 1
+    while len(barcodes) < limit:
+        connection.request("GET", f"/api/items/?page={page}&page_size=200")
+        items = json.loads(connection.getresponse().read()).get('items', [])
+        if not items:
+            break
+        barcodes.extend(item['barcode'] for item in items if item.get('barcode'))
+        page += 1
+    connection.close()
+    return barcodes[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='Target a running server instead of starting one in-process.')
+    parser.add_argument('--db', help='Database to serve in-process (a copy is used).')
+    parser.add_argument('--items', type=int, default=10_000, help='Items to generate when neither --url nor --db is given.')
+    parser.add_argument('--logs', type=int, default=200_000, help='Movement logs to generate when neither --url nor --db is given.')
+    parser.add_argument('--stations', type=int, default=8, help='Number of simulated scanning stations.')
+    parser.add_argument('--rate', type=float, default=2.0, help='Mean scans per second per station.')
+    parser.add_argument('--read-ratio', type=float, default=0.2, help='Probability of a dashboard/log read after a scan.')
+    parser.add_argument('--duration', type=float, default=30.0, help='Test length in seconds.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Also write the results as JSON to this path.')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = args.url
+        barcodes = _load_barcodes(url=url)
+    else:
+        work_dir = tempfile.mkdtemp(prefix='wh_load_')
+        db_path = os.path.join(work_dir, 'load.db')
+        if args.db:
+            with sqlite3.connect(args.db) as source, sqlite3.connect(db_path) as target:
+                source.backup(target)
+        else:
+            from benchmarks import datagen
+            datagen.generate(db_path, items=args.items, logs=args.logs)
+        barcodes = _load_barcodes(db_path=db_path)
+        server, url = _start_local_server(db_path)
+
+    if not barcodes:
+        sys.exit("No active items with barcodes to scan.")
+
+    parsed = urlparse(url)
+    print(f"Running {args.stations} station(s) at {args.rate} scans/s each for {args.duration:.0f} s against {url}")
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    stations = [
+        Station(parsed.hostname, parsed.port or 80, barcodes, args.rate, args.read_ratio, deadline, args.seed + i, recorder)
+        for i in range(args.stations)
+    ]
+    for station in stations:
+        station.start()
+    for station in stations:
+        station.join()
+    elapsed = time.perf_counter() - started
+
+    results = report(recorder, elapsed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "elapsed_s": round(elapsed, 2), "results": results}, f, indent=2)
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Measures the dictionary-encoded movement log storage against the plain layout.
+
+A copy of the logs is written in the layout used before migration 0010 (item
+name, action type, details and person name as TEXT in every row, with the same
+indexes) and both databases are vacuumed. The table shows the file and log
+storage sizes, then the median time of the same reads against each layout:
+a full decode of every row, a table scan of numeric columns, the forecast's
+Removal aggregate (covering index), a grouped count per action type and a deep
+page of the log list.
+
+Last, the log list and export read paths of movement_log_model (a filtered
+page, the last 30 days and every log, as dicts) are timed against the queries
+they ran on the plain layout, alternately. The run fails if any is slower than
+on the plain layout by more than --tolerance. The app reads also carry their
+per-call work (the archive catalog lookup, statement tracing) that the bare
+plain queries skip, so a small page compares conservatively.
+
+Usage:
+    python -m benchmarks.log_storage [--db existing.db] [--items 100000] [--logs 3000000]
+                                     [--tolerance 0.10]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db_utils, movement_log_model
+from benchmarks import datagen
+
+_PLAIN_TABLE_SQL = """
+    CREATE TABLE movement_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        item_id INTEGER NOT NULL,
+        item_name TEXT,
+        action_type TEXT NOT NULL,
+        quantity_changed INTEGER,
+        resulting_quantity INTEGER,
+        provider_id INTEGER,
+        cost_per_item REAL,
+        details TEXT,
+        person_name TEXT,
+        destination_id INTEGER
+    )
+"""
+_PLAIN_INDEXES = (
+    "CREATE INDEX idx_mov_log_item_id ON movement_logs (item_id)",
+    "CREATE INDEX idx_mov_log_timestamp ON movement_logs (timestamp)",
+    "CREATE INDEX idx_mov_log_provider_id ON movement_logs (provider_id)",
+    "CREATE INDEX idx_mov_log_destination_id ON movement_logs (destination_id)",
+    "CREATE INDEX idx_mov_log_action_timestamp ON movement_logs (action_type, timestamp, item_id, quantity_changed)",
+)
+# The log list query as it read the plain layout (before migration 0010).
+_PLAIN_LOG_QUERY = """
+    SELECT ml.id, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed,
+           ml.resulting_quantity, p.name as provider, ml.cost_per_item, ml.details,
+           ml.person_name, ml.timestamp, d.name as destination_name
+    FROM movement_logs ml
+    LEFT JOIN destinations d ON ml.destination_id = d.id
+    LEFT JOIN providers p ON ml.provider_id = p.id
+    {where}
+    ORDER BY ml.timestamp DESC {limit}
+"""
+# Log storage of each layout: the tables and indexes counted in the size column.
+_ENCODED_OBJECTS = ('movement_log_entries', 'log_strings', 'log_action_types', 'sqlite_autoindex_log_strings_1',
+                    'sqlite_autoindex_log_action_types_1', 'idx_mov_log_item_id', 'idx_mov_log_timestamp',
+                    'idx_mov_log_provider_id', 'idx_mov_log_destination_id', 'idx_mov_log_action_timestamp')
+_PLAIN_OBJECTS = ('movement_logs', 'idx_mov_log_item_id', 'idx_mov_log_timestamp', 'idx_mov_log_provider_id',
+                  'idx_mov_log_destination_id', 'idx_mov_log_action_timestamp')
+
+def _queries(since):
+    """(name, plain SQL, encoded SQL, params): the same read in each layout's idiom."""
+    removals = ("SELECT item_id, SUM(quantity_changed) FROM movement_logs WHERE {action} AND timestamp >= ? "
+                "GROUP BY item_id")
+    return [
+        ("full decode (all columns)", "SELECT * FROM movement_logs", None, ()),
+        ("table scan (numeric columns)", "SELECT SUM(quantity_changed), SUM(resulting_quantity) FROM movement_logs",
+         None, ()),
+        ("removals per item since", removals.format(action="action_type = 'Removal'"),
+         removals.format(action="action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal')"), (since,)),
+        ("count per action type", "SELECT action_type, COUNT(*) FROM movement_logs GROUP BY action_type",
+         "SELECT (SELECT name FROM log_action_types WHERE id = action_type_id), COUNT(*) FROM movement_log_entries "
+         "GROUP BY action_type_id", ()),
+        ("page 200 of the log list", "SELECT * FROM movement_logs ORDER BY timestamp DESC LIMIT 50 OFFSET 10000",
+         None, ()),
+    ]
+
+def _app_reads(since, destination_id):
+    """(name, plain read, encoded read): callables returning the rows as dicts, given a connection."""
+    def plain(where, params, limit=""):
+        def read(conn):
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            return [dict(row) for row in cursor.execute(_PLAIN_LOG_QUERY.format(where=where, limit=limit), params)]
+        return read
+
+    filtered = {'action_type': 'Removal', 'destination_id': str(destination_id)}
+    return [
+        ("page: Removal at a destination",
+         plain("WHERE ml.action_type IN (?) AND ml.destination_id = ?", ('Removal', str(destination_id), 50, 0),
+               limit="LIMIT ? OFFSET ?"),
+         lambda conn: movement_log_model.get_movement_logs(filtered, page=1, page_size=50, include_total=False)["logs"]),
+        ("export: last 30 days", plain("WHERE ml.timestamp >= ?", (since,)),
+         lambda conn: list(movement_log_model.iter_movement_logs({'date_from': since}, db=conn))),
+        ("export: every log", plain("", ()),
+         lambda conn: list(movement_log_model.iter_movement_logs(None, db=conn))),
+    ]
+
+def _write_plain_copy(source_path, plain_path):
+    conn = sqlite3.connect(plain_path)
+    try:
+        conn.execute(_PLAIN_TABLE_SQL)
+        # The log list joins these for the names.
+        conn.execute("CREATE TABLE destinations (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("CREATE TABLE providers (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+        conn.execute("INSERT INTO main.destinations SELECT id, name FROM source.destinations")
+        conn.execute("INSERT INTO main.providers SELECT id, name FROM source.providers")
+        conn.execute("""
+            INSERT INTO main.movement_logs
+            SELECT id, timestamp, item_id, item_name, action_type, quantity_changed, resulting_quantity,
+                   provider_id, cost_per_item, details, person_name, destination_id
+            FROM source.movement_logs ORDER BY id
+        """)
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+        for sql in _PLAIN_INDEXES:
+            conn.execute(sql)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def _storage_mb(conn, objects):
+    """Bytes of the given tables and indexes, or None when SQLite lacks the dbstat table."""
+    try:
+        placeholders = ','.join('?' * len(objects))
+        size = conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({placeholders})", objects).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    return size / 1e6
+
+def _median_ms(conn, sql, params, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _row in conn.execute(sql, params):
+            pass
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+def _compare_calls_ms(plain_read, plain, encoded_read, encoded, repeat, min_seconds=0.5):
+    """Median ms of each read, run alternately (at least repeat times and min_seconds) so drift hits both."""
+    plain_durations, encoded_durations = [], []
+    started = time.perf_counter()
+    while len(plain_durations) < repeat or time.perf_counter() - started < min_seconds:
+        for read, conn, durations in ((plain_read, plain, plain_durations), (encoded_read, encoded, encoded_durations)):
+            start = time.perf_counter()
+            read(conn)
+            durations.append(time.perf_counter() - start)
+    return statistics.median(plain_durations) * 1000, statistics.median(encoded_durations) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Reuse an existing generated database (a copy is used).')
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--logs', type=int, default=3_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed slowdown of the app reads against the plain layout (0.10 = 10%%).')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wh_log_storage_')
+    encoded_path = os.path.join(work_dir, 'encoded.db')
+    plain_path = os.path.join(work_dir, 'plain.db')
+    if args.db:
+        with sqlite3.connect(args.db) as source, sqlite3.connect(encoded_path) as target:
+            source.backup(target)
+        db_utils.DATABASE_NAME = encoded_path
+        db_utils.DB_INITIALIZED = False
+        db_utils.initialize_database()
+    else:
+        datagen.generate(encoded_path, items=args.items, logs=args.logs)
+    with sqlite3.connect(encoded_path) as conn:
+        conn.execute("VACUUM")
+    _write_plain_copy(encoded_path, plain_path)
+
+    encoded = sqlite3.connect(encoded_path)
+    plain = sqlite3.connect(plain_path)
+    try:
+        log_count, since = encoded.execute(
+            "SELECT COUNT(*), date(MAX(timestamp), '-365 days') FROM movement_log_entries").fetchone()
+        print(f"{log_count:,} movement log(s).\n")
+
+        print(f"{'':<30} {'plain':>12} {'encoded':>12} {'change':>8}")
+        plain_file = os.path.getsize(plain_path) / 1e6
+        # The plain copy holds only the logs; the encoded file also has everything else.
+        other = os.path.getsize(encoded_path) / 1e6 - (_storage_mb(encoded, _ENCODED_OBJECTS) or 0)
+        rows = [("log storage MB", _storage_mb(plain, _PLAIN_OBJECTS), _storage_mb(encoded, _ENCODED_OBJECTS))]
+        if rows[0][1] is None:
+            rows = [("database file MB (approx.)", plain_file + other, os.path.getsize(encoded_path) / 1e6)]
+        else:
+            rows.append(("database file MB", plain_file + other, os.path.getsize(encoded_path) / 1e6))
+        for name, before, after in rows:
+            print(f"{name:<30} {before:>12.1f} {after:>12.1f} {(after / before - 1) * 100:>7.0f}%")
+
+        print(f"\n{'query (p50 ms)':<30} {'plain':>12} {'encoded':>12} {'change':>8}")
+        for name, plain_sql, encoded_sql, params in _queries(since):
+            before = _median_ms(plain, plain_sql, params, args.repeat)
+            after = _median_ms(encoded, encoded_sql or plain_sql, params, args.repeat)
+            print(f"{name:<30} {before:>12.0f} {after:>12.0f} {(after / before - 1) * 100:>7.0f}%")
+
+        destination_id, last_month = encoded.execute(
+            "SELECT (SELECT destination_id FROM movement_log_entries WHERE destination_id IS NOT NULL ORDER BY id DESC LIMIT 1), "
+            "date(MAX(timestamp), '-30 days') FROM movement_log_entries").fetchone()
+        slower = []
+        print(f"\n{'app read (p50 ms)':<30} {'plain':>12} {'encoded':>12} {'change':>8}")
+        with create_app().app_context():
+            app_conn = db_utils.get_db()
+            for name, plain_read, encoded_read in _app_reads(last_month, destination_id):
+                assert len(plain_read(plain)) == len(encoded_read(app_conn)), name
+                before, after = _compare_calls_ms(plain_read, plain, encoded_read, app_conn, args.repeat)
+                change = after / before - 1
+                marker = "  SLOWER" if change > args.tolerance else ""
+                print(f"{name:<30} {before:>12.1f} {after:>12.1f} {change * 100:>7.0f}%{marker}")
+                if change > args.tolerance:
+                    slower.append(name)
+    finally:
+        encoded.close()
+        plain.close()
+    if slower:
+        print(f"\n{len(slower)} app read(s) slower than on the plain layout: {', '.join(slower)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
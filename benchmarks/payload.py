@@ -0,0 +1,121 @@
+"""
+Measures response payload size and encoding cost for the large list endpoints.
+
+For every endpoint the rows are fetched once and then re-encoded in each
+variant: escaped vs UTF-8 JSON, row dicts vs ?format=columnar, and identity vs
+gzip vs br (when the brotli package is installed). The table shows bytes on
+the wire and the median time to serialize + compress; the end-to-end section
+times real requests through the test client with the default and the most
+compact settings.
+
+Usage:
+    python -m benchmarks.payload [--db existing.db] [--items 10000] [--logs 200000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, compression
+from app.json_format import to_columnar
+from app.models import db_utils
+from benchmarks import datagen
+
+
+def _median_ms(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def endpoints(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        last_month = conn.execute("SELECT date(MAX(timestamp), '-30 days') FROM movement_logs").fetchone()[0]
+    finally:
+        conn.close()
+    # (name, url, key holding the row list or None when the body is the list)
+    return [
+        ("all_filtered_last_month", f"/api/movement-logs/all_filtered?date_from={last_month}", None),
+        ("logs_page_200", "/api/movement-logs?page=1&page_size=200", "logs"),
+        ("items_page_200", "/api/items/?page=1&page_size=200", "items"),
+    ]
+
+
+def encoding_table(client, targets, repeat):
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+    print(f"{'endpoint':<26} {'json':<8} {'shape':<9} {'encoding':<9} {'bytes':>11} {'encode ms':>10}")
+    for name, url, key in targets:
+        body = client.get(url, headers={'Accept-Encoding': 'identity'}).get_json()
+        rows = body if key is None else body[key]
+        for ensure_ascii in (True, False):
+            for shape in ('rows', 'columnar'):
+                for encoding in encodings:
+                    def encode():
+                        payload = rows if shape == 'rows' else to_columnar(rows)
+                        data = json.dumps(payload, ensure_ascii=ensure_ascii, separators=(',', ':')).encode('utf-8')
+                        return data if encoding == 'identity' else compression.compress(data, encoding)
+                    size = len(encode())
+                    elapsed = _median_ms(encode, repeat)
+                    label = 'escaped' if ensure_ascii else 'utf-8'
+                    print(f"{name:<26} {label:<8} {shape:<9} {encoding:<9} {size:>11,} {elapsed:>10.2f}")
+        print()
+
+
+def end_to_end(client, targets, repeat):
+    best = 'br' if compression.brotli is not None else 'gzip'
+    print(f"{'endpoint':<26} {'variant':<22} {'bytes':>11} {'p50 ms':>9}")
+    for name, url, _ in targets:
+        separator = '&' if '?' in url else '?'
+        variants = [
+            ("rows, identity", url, 'identity'),
+            (f"rows, {best}", url, best),
+            (f"columnar, {best}", f"{url}{separator}format=columnar", best),
+        ]
+        for label, variant_url, encoding in variants:
+            headers = {'Accept-Encoding': encoding}
+            size = len(client.get(variant_url, headers=headers).get_data())
+            elapsed = _median_ms(lambda: client.get(variant_url, headers=headers), repeat)
+            print(f"{name:<26} {label:<22} {size:>11,} {elapsed:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Reuse an existing generated database (a copy is used).')
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--logs', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wh_payload_')
+    os.environ['APPDATA'] = work_dir
+    db_path = os.path.join(work_dir, 'payload.db')
+    if args.db:
+        with sqlite3.connect(args.db) as source, sqlite3.connect(db_path) as target:
+            source.backup(target)
+        db_utils.DATABASE_NAME = db_path
+        db_utils.DB_INITIALIZED = False
+        db_utils.initialize_database()
+    else:
+        datagen.generate(db_path, items=args.items, logs=args.logs)
+
+    app = create_app()
+    client = app.test_client()
+    targets = endpoints(db_path)
+    if compression.brotli is None:
+        print("brotli is not installed; only gzip is measured.\n")
+    encoding_table(client, targets, args.repeat)
+    end_to_end(client, targets, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Audits the query plans of every SQL statement issued by the model modules.
+
+The audit seeds a throw-away database, runs a scenario that calls the model
+functions the routes use, and records each statement through the connection's
+trace callback. Every captured statement is then run through
+EXPLAIN QUERY PLAN. A statement fails the audit when its plan contains a full
+table SCAN of one of the LARGE_TABLES and it is not listed in ALLOWED_SCANS.
+The exit status is non-zero on failure so index regressions break the build.
+
+Usage:
+    python -m benchmarks.query_plan_audit [--verbose]
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import flask
+from flask import g
+
+from app.models import (
+    abc_model, category_model, db_utils, destination_model, forecast_model, item_model,
+    movement_log_model, provider_model, reconciliation_model, scan_session_model, stocktake_model,
+    unit_model,
+)
+from app.models.text_utils import normalize_name
+
+# Tables that grow without bound on a real install.
+LARGE_TABLES = {'items', 'movement_logs', 'movement_log_entries'}
+# Aliases inside views, which show up in the plans of the queries reading them.
+_VIEW_ALIASES = {'mle': 'movement_log_entries'}
+
+# Statements whose scan is inherent to the feature rather than a missing index,
+# matched against the whitespace-normalized statement text.
+ALLOWED_SCANS = {
+    r"\bi\.name LIKE '%": "Substring search ('%term%') cannot use a B-tree index.",
+    r"^SELECT COUNT\(\*\) FROM movement_log_entries ml$": "Unfiltered total of the log table.",
+    r"'quantity_mismatch', COALESCE\(rc\.last_quantity": "Reconciliation compares every item with the end of its ledger.",
+}
+
+_TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_SQL_KEYWORDS = {'where', 'on', 'join', 'left', 'inner', 'order', 'group', 'limit', 'set', 'values', 'select'}
+
+
+def _seed(conn, item_count, log_count):
+    conn.execute("INSERT INTO units (name) VALUES ('piece'), ('box')")
+    conn.execute("INSERT INTO providers (name) VALUES ('Provider A'), ('Provider B')")
+    conn.execute("INSERT INTO destinations (name) VALUES ('Site A'), ('Site B')")
+    conn.execute("INSERT INTO categories (name) VALUES ('Main')")
+    conn.executemany("INSERT INTO categories (name, parent_id) VALUES (?, 1)", [(f"Sub {i}",) for i in range(20)])
+    conn.executemany(
+        "INSERT INTO items (name, normalized_name, unit_id, sub_category_id, provider_id, current_quantity, status, barcode) VALUES (?, ?, 1, ?, 1, 100, ?, ?)",
+        ((f"Item {i}", normalize_name(f"Item {i}"), 2 + i % 20, 'archived' if i % 10 == 0 else 'active', f"BC{i:08d}")
+         for i in range(item_count))
+    )
+    now = datetime.now()
+    logs = [(1 + i % item_count, f"Item {i % item_count}", 'Addition' if i % 3 else 'Removal', 1, 100, None, None, None,
+             None, 1 + i % 2, (now - timedelta(days=i % 700)).strftime('%Y-%m-%d %H:%M:%S'))
+            for i in range(log_count)]
+    movement_log_model.intern_log_values(conn.cursor(), logs)
+    conn.executemany(movement_log_model.LOG_INSERT_SQL, logs)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def _scenario():
+    """Calls the read and write paths used by the routes."""
+    item_model.get_items_paginated(1, 10)
+    item_model.get_items_paginated(3, 10, search_term='Item 5')
+    item_model.get_items_paginated(1, 10, sub_category_id=3)
+    item_model.get_item_by_id(5)
+    item_model.get_item_by_name('Item 5')
+    item_model.get_item_by_barcode('BC00000005')
+    new_item = item_model.add_item('Audit item', 1, 3, 5, 1, 1.5, 'audit', 'AUDIT0001')
+    item_model.update_item(new_item['id'], 'Audit item 2', 1, 3, 'AUDIT0002', 'audit')
+    item_model.update_item(new_item['id'], 'Audit item 2', 2, 3, 'AUDIT0002', 'audit')
+    item_model.record_quantity_adjustment(new_item['id'], 2, 'addition', 'audit', provider_id=1, cost=2.0)
+    item_model.record_quantity_adjustment(new_item['id'], 1, 'removal', 'audit', destination_id=1)
+    item_model.update_item_status(new_item['id'], 'inactive', 'audit')
+    item_model.restore_item(new_item['id'], 4, 'audit')
+
+    movement_log_model.get_movement_logs(page=1, page_size=50)
+    movement_log_model.get_movement_logs(filters={'item_id': 7}, page=1, page_size=50)
+    movement_log_model.get_movement_logs(filters={'action_type': 'Addition,Removal', 'destination_id': 1}, page=2, page_size=50)
+    movement_log_model.get_movement_logs(filters={'item_id': 7}, page=None, page_size=None)
+    movement_log_model.get_movement_logs(filters={'date_from': '2026-01-01'}, page=1, page_size=50)
+    movement_log_model.get_daily_movement_summary()
+    forecast_model.get_reorder_forecast(only_reorder=True, limit=10)
+    abc_model.refresh_scope(*abc_model.resolve_period())
+    abc_model.refresh_scope(*abc_model.resolve_period(), destination_id=1)
+    abc_model.get_abc_classification(limit=10)
+    abc_model.get_abc_classification(main_category_id=1, destination_id=1, limit=10)
+    item_model.record_quantity_adjustment(7, 1, 'removal', 'audit', destination_id=1)
+    abc_model.refresh_scope(*abc_model.resolve_period(), destination_id=1)
+    reconciliation_model.run_reconciliation(db=g.db)
+    reconciliation_model.get_reconciliation_report(issue_type='chain_break')
+    stocktake = stocktake_model.create_session('audit', 'audit', main_category_id=1)
+    stocktake_model.record_counts(stocktake['id'], [{'item_id': 7, 'counted_quantity': 3}, {'barcode': 'BC00000008'}], 'audit', mode='add')
+    stocktake_model.get_variances(stocktake['id'], only_differences=True, limit=50)
+    stocktake_model.post_session(stocktake['id'], 'audit')
+    stocktake_model.list_sessions('open')
+    scan_session = scan_session_model.create_session('removal', 'audit', destination_id=1)
+    scan_session_model.add_scan(scan_session['id'], 'BC00000005')
+    scan_session_model.add_scan(scan_session['id'], 'BC00000005')
+    scan_session_model.close_session(scan_session['id'])
+
+    category_model.get_categories(main_categories_only=True)
+    category_model.get_categories(parent_id=1, page=1, page_size=10)
+    category_model.get_category_by_id(3)
+    category_model.is_category_in_use(3)
+    unit_model.get_all_units()
+    unit_model.is_unit_in_use(2)
+    provider_model.get_all_providers()
+    provider_model.is_provider_in_use(2)
+    destination_model.get_all_destinations()
+    destination_model.is_destination_in_use(2)
+
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def _full_scans(conn, sql):
+    """Returns the large tables fully scanned by a statement's plan."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    aliases = _table_aliases(sql)
+    scanned = []
+    for row in plan:
+        detail = row[3]
+        match = re.match(r'SCAN (\w+)', detail)
+        if not match:
+            continue
+        if 'USING INDEX' in detail and ' ORDER BY ' in sql and ' LIMIT ' in sql:
+            # Walking an index in ORDER BY order stops as soon as LIMIT rows are found.
+            continue
+        table = aliases.get(match.group(1), _VIEW_ALIASES.get(match.group(1), match.group(1)))
+        if table in LARGE_TABLES:
+            scanned.append(detail)
+    return plan, scanned
+
+
+def run_audit(item_count=20_000, log_count=100_000, verbose=False):
+    tmp_dir = tempfile.mkdtemp(prefix='wh_audit_')
+    db_utils.DATABASE_NAME = os.path.join(tmp_dir, 'audit.db')
+    db_utils.DB_INITIALIZED = False
+    db_utils.initialize_database()
+
+    conn = db_utils.get_db_connection()
+    _seed(conn, item_count, log_count)
+
+    statements = []
+    app = flask.Flask(__name__)
+    with app.app_context():
+        db = db_utils.get_db()
+        db.set_trace_callback(statements.append)
+        _scenario()
+        g.pop('db').close()
+
+    failures = []
+    seen = set()
+    for sql in statements:
+        sql = " ".join(sql.split())
+        keyword = sql.lstrip().split(None, 1)[0].upper()
+        if sql.upper().startswith('CREATE TEMP TABLE'):
+            # Scratch tables of the scenario's connection; create them here so later plans resolve.
+            conn.execute(sql.replace('CREATE TEMP TABLE', 'CREATE TEMP TABLE IF NOT EXISTS', 1))
+            continue
+        if keyword not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT') or sql in seen:
+            continue
+        seen.add(sql)
+        plan, scanned = _full_scans(conn, sql)
+        allowed_reason = next((reason for pattern, reason in ALLOWED_SCANS.items() if re.search(pattern, sql)), None)
+        if verbose:
+            print(sql[:160])
+            for row in plan:
+                print(f"    {row[3]}")
+        if scanned and not allowed_reason:
+            failures.append((sql, scanned))
+    conn.close()
+    return len(seen), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=20_000)
+    parser.add_argument('--logs', type=int, default=100_000)
+    parser.add_argument('--verbose', action='store_true', help='Print every statement with its plan.')
+    args = parser.parse_args()
+
+    checked, failures = run_audit(args.items, args.logs, args.verbose)
+    for sql, scanned in failures:
+        print("FULL SCAN:", sql)
+        for detail in scanned:
+            print(f"    {detail}")
+    print(f"Audited {checked} statement(s); {len(failures)} with full scans of large tables.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Runs the endpoint benchmark suite against a synthetic database.
+
+Each scenario drives the Flask app through its test client, so routing, JSON
+encoding and the request hooks are included in the numbers. Results are
+written as JSON. With --baseline, every scenario's median is compared with a
+previous results file and the run fails if any median regressed by more than
+--tolerance.
+
+Usage:
+    python -m benchmarks.run [--items 10000] [--logs 1000000] [--db existing.db]
+                             [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import db_utils
+from benchmarks import datagen
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _pick_fixtures(db_path):
+    """Chooses real ids and values from the database for the scenarios to use."""
+    conn = sqlite3.connect(db_path)
+    try:
+        item_id, barcode, name = conn.execute(
+            "SELECT id, barcode, name FROM items WHERE status = 'active' AND barcode IS NOT NULL ORDER BY id LIMIT 1 OFFSET 10"
+        ).fetchone()
+        last_month = conn.execute("SELECT date(MAX(timestamp), '-30 days') FROM movement_logs").fetchone()[0]
+        total_logs = conn.execute("SELECT MAX(id) FROM movement_logs").fetchone()[0] or 0
+    finally:
+        conn.close()
+    return {
+        "item_id": item_id,
+        "barcode": barcode,
+        "search": name.split()[0],
+        "last_month": last_month,
+        "deep_log_page": max(1, total_logs // 50 // 2),
+    }
+
+
+def build_scenarios(fixtures):
+    """Returns (name, method, url, json_body_factory) for every benchmarked request."""
+    item_id = fixtures['item_id']
+    adjust_toggle = {'n': 0}
+
+    def adjust_body():
+        adjust_toggle['n'] += 1
+        if adjust_toggle['n'] % 2:
+            return {"change_amount": 1, "adjustment_type": "addition", "person_name": "bench", "cost": 1.0}
+        return {"change_amount": 1, "adjustment_type": "removal", "person_name": "bench"}
+
+    return [
+        ("items_page", "GET", "/api/items/?page=1&page_size=50", None),
+        ("items_page_deep", "GET", "/api/items/?page=100&page_size=50", None),
+        ("item_search", "GET", f"/api/items/?page=1&page_size=50&search={fixtures['search']}", None),
+        ("item_by_barcode", "GET", f"/api/items/by-barcode/{fixtures['barcode']}", None),
+        ("logs_page", "GET", "/api/movement-logs?page=1&page_size=50", None),
+        ("logs_page_deep", "GET", f"/api/movement-logs?page={fixtures['deep_log_page']}&page_size=50", None),
+        ("logs_page_filtered", "GET", "/api/movement-logs?page=1&page_size=50&action_type=Removal&destination_id=3", None),
+        ("logs_item_history", "GET", f"/api/movement-logs?page=1&page_size=50&item_id={item_id}", None),
+        ("all_filtered_last_month", "GET", f"/api/movement-logs/all_filtered?date_from={fixtures['last_month']}", None),
+        ("daily_summary", "GET", "/api/movement-logs/summary/today", None),
+        ("adjust", "POST", f"/api/items/{item_id}/adjust", adjust_body),
+        ("barcode_render", "GET", f"/api/items/{item_id}/barcode", None),
+        ("backup", "POST", "/api/backup/create", None),
+    ]
+
+
+def run_scenarios(app, scenarios, iterations, warmup=2, only=None):
+    client = app.test_client()
+    results = {}
+    for name, method, url, body_factory in scenarios:
+        if only and name not in only:
+            continue
+        # Backups copy the whole file, keep their iteration count small.
+        count = max(3, iterations // 10) if name == 'backup' else iterations
+        durations = []
+        response_bytes = 0
+        for i in range(warmup + count):
+            body = body_factory() if body_factory else None
+            start = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: {method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            if i >= warmup:
+                durations.append(elapsed)
+                response_bytes = len(response.get_data())
+        results[name] = {
+            "iterations": count,
+            "p50_ms": round(statistics.median(durations) * 1000, 3),
+            "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+            "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+            "response_bytes": response_bytes,
+        }
+        print(f"{name:<26} p50 {results[name]['p50_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change against a baseline run and returns the regressed scenario names."""
+    regressions = []
+    print(f"\n{'scenario':<26} {'baseline p50':>14} {'current p50':>14} {'change':>9}")
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("p50_ms"):
+            print(f"{name:<26} {'-':>14} {current['p50_ms']:>11.3f} ms {'new':>9}")
+            continue
+        change = current['p50_ms'] / previous['p50_ms'] - 1
+        marker = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:<26} {previous['p50_ms']:>11.3f} ms {current['p50_ms']:>11.3f} ms {change:>+8.1%}{marker}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Reuse an existing generated database (a copy is benchmarked).')
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--logs', type=int, default=1_000_000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--only', nargs='+', help='Run only the named scenarios.')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/<timestamp>.json).')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.20, help='Allowed p50 slowdown before failing (0.20 = 20%%).')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wh_bench_')
+    # Backups are written under APPDATA; keep them out of the real backup folder.
+    os.environ['APPDATA'] = work_dir
+    db_path = os.path.join(work_dir, 'bench.db')
+    if args.db:
+        with sqlite3.connect(args.db) as source, sqlite3.connect(db_path) as target:
+            source.backup(target)
+        db_utils.DATABASE_NAME = db_path
+        db_utils.DB_INITIALIZED = False
+        db_utils.initialize_database()
+        dataset = {"source": os.path.abspath(args.db)}
+    else:
+        dataset = datagen.generate(db_path, items=args.items, logs=args.logs)
+
+    app = create_app()
+    fixtures = _pick_fixtures(db_path)
+    results = run_scenarios(app, build_scenarios(fixtures), args.iterations, only=args.only)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "dataset": dataset,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y-%m-%d_%H-%M-%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
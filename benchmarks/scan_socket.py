@@ -0,0 +1,167 @@
+"""
+Compares scans/second per station over the REST API and the scan socket.
+
+A scan removes or adds one unit of a random item by barcode. Every station
+scans as fast as it can for --duration seconds, in three modes:
+
+    rest       GET /api/items/by-barcode/<code> then POST /api/items/<id>/adjust
+    socket     one "adjust" request by barcode on /ws/scan, waiting for each reply
+    pipelined  the same requests with up to --window of them in flight
+
+The app is served in-process on a free port from a synthetic database (see
+benchmarks.datagen), the same way as benchmarks.loadtest.
+
+Usage:
+    python -m benchmarks.scan_socket [--stations 1] [--duration 10] [--window 16] [--db existing.db]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.loadtest import _load_barcodes, _start_local_server
+
+MODES = ('rest', 'socket', 'pipelined')
+
+
+def _scan_body(rng):
+    # Mostly removals; the additions keep stock from running out over long runs.
+    return {"change_amount": 1, "person_name": "bench",
+            "adjustment_type": "removal" if rng.random() < 0.5 else "addition"}
+
+
+def _rest_station(host, port, barcodes, deadline, rng, latencies):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    scans = errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", f"/api/items/by-barcode/{rng.choice(barcodes)}")
+            response = connection.getresponse()
+            item = json.loads(response.read())
+            if response.will_close:
+                connection.close()
+            ok = response.status == 200
+            if ok:
+                connection.request("POST", f"/api/items/{item['id']}/adjust", body=json.dumps(_scan_body(rng)),
+                                   headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                if response.will_close:
+                    connection.close()
+                ok = response.status == 200
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        scans += 1
+        errors += not ok
+    connection.close()
+    return scans, errors
+
+
+def _socket_station(url, barcodes, deadline, rng, latencies, window):
+    from simple_websocket import Client
+
+    ws = Client.connect(url)
+    sent_at = deque()
+    scans = errors = 0
+    next_id = 0
+    try:
+        while time.perf_counter() < deadline or sent_at:
+            while len(sent_at) < window and time.perf_counter() < deadline:
+                next_id += 1
+                ws.send(json.dumps({"id": next_id, "op": "adjust", "barcode": rng.choice(barcodes), **_scan_body(rng)}))
+                sent_at.append(time.perf_counter())
+            reply = json.loads(ws.receive())
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            scans += 1
+            errors += reply['status'] != 200
+    finally:
+        ws.close()
+    return scans, errors
+
+
+def run_mode(mode, url, barcodes, stations, duration, window, seed):
+    parsed = urlparse(url)
+    socket_url = f"ws://{parsed.hostname}:{parsed.port}/ws/scan"
+    results = [None] * stations
+    latencies = [[] for _ in range(stations)]
+    deadline = time.perf_counter() + duration
+
+    def station(index):
+        rng = random.Random(seed + index)
+        if mode == 'rest':
+            results[index] = _rest_station(parsed.hostname, parsed.port, barcodes, deadline, rng, latencies[index])
+        else:
+            results[index] = _socket_station(socket_url, barcodes, deadline, rng, latencies[index],
+                                             window if mode == 'pipelined' else 1)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=station, args=(i,), daemon=True) for i in range(stations)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    scans = sum(result[0] for result in results)
+    all_latencies = [sample for samples in latencies for sample in samples]
+    return {
+        "scans": scans,
+        "errors": sum(result[1] for result in results),
+        "scans_per_second_per_station": scans / elapsed / stations,
+        "p50_ms": statistics.median(all_latencies) * 1000 if all_latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Database to serve (a copy is used).')
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--logs', type=int, default=200_000)
+    parser.add_argument('--stations', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per mode.')
+    parser.add_argument('--window', type=int, default=16, help='Requests in flight per station when pipelined.')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        import flask_sock  # noqa: F401
+    except ImportError:
+        sys.exit("flask-sock is not installed; the scan socket is unavailable.")
+
+    work_dir = tempfile.mkdtemp(prefix='wh_scan_socket_')
+    os.environ['APPDATA'] = work_dir
+    db_path = os.path.join(work_dir, 'scan.db')
+    if args.db:
+        with sqlite3.connect(args.db) as source, sqlite3.connect(db_path) as target:
+            source.backup(target)
+    else:
+        from benchmarks import datagen
+        datagen.generate(db_path, items=args.items, logs=args.logs)
+    barcodes = _load_barcodes(db_path=db_path)
+    server, url = _start_local_server(db_path)
+
+    print(f"{args.stations} station(s), {args.duration:.0f} s per mode, pipelining window {args.window}\n")
+    print(f"{'mode':<11} {'scans':>8} {'scans/s/station':>16} {'p50 ms':>8} {'errors':>7}")
+    for mode in args.modes.split(','):
+        row = run_mode(mode, url, barcodes, args.stations, args.duration, args.window, args.seed)
+        print(f"{mode:<11} {row['scans']:>8} {row['scans_per_second_per_station']:>16.1f} {row['p50_ms']:>8.2f} {row['errors']:>7}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
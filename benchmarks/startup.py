@@ -0,0 +1,141 @@
+"""
+Measures desktop-app startup: time to first window and to first API response.
+
+Each run starts a fresh interpreter with -X importtime that follows app.main's
+startup sequence against a copy of a synthetic database: import app.main, call
+start_backend() (the point where main() opens the window) and poll the API
+until it answers. Times are measured from just before the process is spawned,
+so interpreter start-up is included. The slowest top-level imports of the last
+run are listed from the -X importtime report.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--db existing.db] [--fresh]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from benchmarks import datagen
+
+EVENTS = ['imported', 'window', 'first_api_response', 'warm']
+
+# Runs inside the measured interpreter: argv = spawn time, database path, port.
+_DRIVER = r'''
+import json, os, sys, time
+spawned = float(sys.argv[1])
+def mark(event):
+    print(json.dumps({"event": event, "seconds": time.time() - spawned}), flush=True)
+sys.path.insert(0, os.getcwd())
+from app.models import db_utils
+db_utils.DATABASE_NAME = sys.argv[2]
+import app.main as main_module
+from app.models import barcode_index
+mark("imported")
+main_module.FLASK_PORT = int(sys.argv[3])
+main_module.start_backend()
+mark("window")
+import urllib.request
+url = f"http://127.0.0.1:{sys.argv[3]}/api/items/?page=1&page_size=10"
+deadline = time.time() + 60
+while True:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            if response.status == 200:
+                break
+    except OSError:
+        if time.time() > deadline:
+            raise
+        time.sleep(0.005)
+mark("first_api_response")
+while not barcode_index.is_loaded() and time.time() < deadline:
+    time.sleep(0.005)
+mark("warm")
+os._exit(0)
+'''
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_once(db_path, work_dir):
+    env = dict(os.environ, APPDATA=work_dir)
+    spawned = time.time()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _DRIVER, repr(spawned), db_path, str(_free_port())],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{process.stdout[-2000:]}\n{process.stderr[-2000:]}")
+    events = {}
+    for line in process.stdout.splitlines():
+        if line.startswith('{'):
+            record = json.loads(line)
+            events[record['event']] = record['seconds'] * 1000
+    return events, process.stderr
+
+
+def slowest_imports(importtime_report, top):
+    """Top-level imports (and their cumulative microseconds) from an -X importtime report."""
+    totals = []
+    for line in importtime_report.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            totals.append((int(match.group(2)), match.group(4)))
+    return sorted(totals, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Generated database to start from (copied for every run).')
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--logs', type=int, default=100_000)
+    parser.add_argument('--fresh', action='store_true', help='Start every run from an empty database (includes schema creation).')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list.')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='wh_startup_')
+    source_db = None
+    if not args.fresh:
+        source_db = args.db or os.path.join(work_dir, 'source.db')
+        if not args.db:
+            datagen.generate(source_db, items=args.items, logs=args.logs, verbose=False)
+
+    samples = {event: [] for event in EVENTS}
+    report = ''
+    for run in range(args.runs):
+        db_path = os.path.join(work_dir, f'run_{run}.db')
+        if source_db:
+            shutil.copyfile(source_db, db_path)
+        events, report = run_once(db_path, work_dir)
+        for event in EVENTS:
+            samples[event].append(events[event])
+        print(f"run {run + 1}: " + "  ".join(f"{event} {events[event]:.0f} ms" for event in EVENTS))
+
+    print(f"\n{'milestone':<22} {'p50 ms':>9} {'min ms':>9}")
+    for event in EVENTS:
+        print(f"{event:<22} {statistics.median(samples[event]):>9.0f} {min(samples[event]):>9.0f}")
+
+    print(f"\nSlowest top-level imports (last run):")
+    for micros, module in slowest_imports(report, args.top):
+        print(f"  {micros / 1000:>8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+-- database/migrations/0002_items_normalized_name.sql
+
+-- Case- and spelling-insensitive key for duplicate item name checks.
+-- LOWER(name) = LOWER(?) cannot use idx_items_name and scans every item.
+-- normalize_name() is registered by the migration runner (app/models/text_utils.py).
+ALTER TABLE items ADD COLUMN normalized_name TEXT;
+
+UPDATE items SET normalized_name = normalize_name(name);
+
+CREATE INDEX IF NOT EXISTS idx_items_normalized_name ON items (normalized_name);
@@ -0,0 +1,12 @@
+-- database/migrations/0003_items_lookup_indexes.sql
+
+-- Supports provider_model.is_provider_in_use and unit_model.is_unit_in_use,
+-- which otherwise scan the whole items table before a delete.
+CREATE INDEX IF NOT EXISTS idx_items_provider_id ON items (provider_id);
+CREATE INDEX IF NOT EXISTS idx_items_unit_id ON items (unit_id);
+
+-- Serves the item list pattern "status = 'active' ORDER BY id DESC LIMIT ?"
+-- without sorting. It also covers every lookup the single-column status index
+-- handled, so that index is dropped to keep item writes cheaper.
+CREATE INDEX IF NOT EXISTS idx_items_status_id ON items (status, id);
+DROP INDEX IF EXISTS idx_items_status;
@@ -0,0 +1,22 @@
+-- database/migrations/0004_movement_log_archive.sql
+
+-- Catalog of the per-year cold-storage files that old movement logs are moved to
+-- (see app/models/log_archive_model.py). file_name is relative to the archive directory.
+CREATE TABLE IF NOT EXISTS movement_log_archives (
+    year INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    first_timestamp TIMESTAMP,
+    last_timestamp TIMESTAMP
+);
+
+-- Per-item opening balance left behind when an item's history is archived:
+-- the quantity after the last archived quantity-bearing log, so the live log
+-- chain can be checked and valued without opening the archives.
+CREATE TABLE IF NOT EXISTS movement_log_checkpoints (
+    item_id INTEGER PRIMARY KEY,
+    archived_through_log_id INTEGER NOT NULL,
+    archived_through_timestamp TIMESTAMP,
+    opening_quantity INTEGER,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
@@ -0,0 +1,32 @@
+-- database/migrations/0005_stock_valuation.sql
+
+-- Small key/value store for one-off jobs and watermarks (e.g. the valuation backfill).
+CREATE TABLE IF NOT EXISTS system_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Open FIFO cost layers: one per receipt (Creation/Addition), consumed oldest-first
+-- by removals and deleted once empty. unit_cost is NULL when the receipt had no known cost.
+CREATE TABLE IF NOT EXISTS cost_layers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER NOT NULL,
+    received_at TIMESTAMP,
+    unit_cost REAL,
+    original_quantity INTEGER NOT NULL,
+    remaining_quantity INTEGER NOT NULL,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_cost_layers_item_id ON cost_layers (item_id, id);
+
+-- Running valuation per item, kept in step with items.current_quantity by
+-- app/models/valuation_model.py.
+CREATE TABLE IF NOT EXISTS item_valuation (
+    item_id INTEGER PRIMARY KEY,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    average_cost REAL,                      -- weighted average cost of the units on hand
+    fifo_value REAL NOT NULL DEFAULT 0,     -- value of the open cost layers
+    unvalued_quantity INTEGER NOT NULL DEFAULT 0, -- units in open layers without a known cost
+    updated_at TIMESTAMP,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
@@ -0,0 +1,9 @@
+-- database/migrations/0006_movement_log_action_timestamp_index.sql
+
+-- Serves the demand forecast's bulk read ("action_type = 'Removal' AND
+-- timestamp in range", grouped per item and day) from the index alone, and
+-- the other action_type + date range filters without visiting the table.
+-- It covers every lookup the single-column action_type index handled, so that
+-- index is dropped to keep log inserts cheaper.
+CREATE INDEX IF NOT EXISTS idx_mov_log_action_timestamp ON movement_logs (action_type, timestamp, item_id, quantity_changed);
+DROP INDEX IF EXISTS idx_mov_log_action_type;
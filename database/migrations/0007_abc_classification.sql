@@ -0,0 +1,32 @@
+-- database/migrations/0007_abc_classification.sql
+
+-- One row per ABC analysis scope (period + destination). through_log_id is the
+-- last movement log folded into the scope's totals; newer logs are added on the
+-- next request. destination_id 0 means all destinations.
+CREATE TABLE IF NOT EXISTS abc_scopes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_from TEXT NOT NULL,
+    date_to TEXT NOT NULL,
+    destination_id INTEGER NOT NULL DEFAULT 0,
+    through_log_id INTEGER NOT NULL DEFAULT 0,
+    total_value REAL NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP,
+    UNIQUE (date_from, date_to, destination_id)
+);
+
+-- Withdrawn quantity and value (quantity x cost) per item within a scope, with
+-- the item's rank by value and the value of all items up to and including it.
+-- A/B/C classes are derived from cumulative_value at read time, so the class
+-- thresholds can change without a refresh.
+CREATE TABLE IF NOT EXISTS abc_item_totals (
+    scope_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    value REAL NOT NULL DEFAULT 0,
+    rank INTEGER,
+    cumulative_value REAL,
+    PRIMARY KEY (scope_id, item_id),
+    FOREIGN KEY (scope_id) REFERENCES abc_scopes(id) ON DELETE CASCADE,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_abc_item_totals_rank ON abc_item_totals (scope_id, rank);
@@ -0,0 +1,28 @@
+-- database/migrations/0008_reconciliation.sql
+
+-- Last verified point of each item's quantity chain: the newest movement log
+-- checked and the resulting_quantity it left. The global watermark (the
+-- newest log id covered by a run) is kept in system_state.
+CREATE TABLE IF NOT EXISTS reconciliation_checkpoints (
+    item_id INTEGER PRIMARY KEY,
+    last_log_id INTEGER NOT NULL,
+    last_quantity INTEGER,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
+
+-- Discrepancies found by app/models/reconciliation_model.py.
+-- chain_break: a log's resulting_quantity does not follow from the previous
+--              one and its quantity_changed (log_id is set).
+-- quantity_mismatch: items.current_quantity differs from the end of the
+--                    chain; recomputed on every run.
+CREATE TABLE IF NOT EXISTS reconciliation_issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER NOT NULL,
+    log_id INTEGER,
+    issue_type TEXT NOT NULL CHECK(issue_type IN ('chain_break', 'quantity_mismatch')),
+    expected_quantity INTEGER,
+    actual_quantity INTEGER,
+    detected_at TIMESTAMP,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_reconciliation_issues_item_id ON reconciliation_issues (item_id);
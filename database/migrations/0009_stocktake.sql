@@ -0,0 +1,33 @@
+-- database/migrations/0009_stocktake.sql
+
+-- A stocktake (cycle count) session. snapshot_log_id is the newest movement
+-- log when the expected quantities were taken; movements after it are
+-- reconciled against each count's counted_at when variances are computed.
+CREATE TABLE IF NOT EXISTS stocktake_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open' CHECK(status IN ('open', 'posted', 'cancelled')),
+    snapshot_log_id INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL,
+    created_by TEXT,
+    posted_at TIMESTAMP,
+    posted_by TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stocktake_sessions_status ON stocktake_sessions (status);
+
+-- One line per item in the session's scope. counted_quantity stays NULL
+-- until the item is counted; book_quantity and variance are filled in when
+-- the session is posted.
+CREATE TABLE IF NOT EXISTS stocktake_lines (
+    session_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    expected_quantity INTEGER NOT NULL,
+    counted_quantity INTEGER,
+    counted_at TIMESTAMP,
+    counted_by TEXT,
+    book_quantity INTEGER,
+    variance INTEGER,
+    PRIMARY KEY (session_id, item_id),
+    FOREIGN KEY (session_id) REFERENCES stocktake_sessions(id) ON DELETE CASCADE,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
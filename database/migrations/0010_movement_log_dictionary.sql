@@ -0,0 +1,87 @@
+-- database/migrations/0010_movement_log_dictionary.sql
+
+-- Dictionary-encoded movement logs. The same few item names, person names,
+-- action types and details repeat across every log row, so each distinct
+-- value is stored once and the rows keep integer codes:
+--   log_action_types  the action types ('Addition', 'Removal', ...)
+--   log_strings       item names, person names and details, interned together
+-- The rows move to movement_log_entries and movement_logs becomes a view that
+-- decodes them, so every query reading movement_logs returns the same columns
+-- as before. Writes go to movement_log_entries (movement_log_model interns
+-- the values first).
+CREATE TABLE IF NOT EXISTS log_action_types (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+INSERT OR IGNORE INTO log_action_types (id, name) VALUES
+    (1, 'Creation'), (2, 'Addition'), (3, 'Removal'), (4, 'Update'), (5, 'Status Change'), (6, 'Restored');
+INSERT OR IGNORE INTO log_action_types (name) SELECT DISTINCT action_type FROM movement_logs;
+
+CREATE TABLE IF NOT EXISTS log_strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT UNIQUE NOT NULL
+);
+INSERT OR IGNORE INTO log_strings (value)
+    SELECT item_name FROM movement_logs WHERE item_name IS NOT NULL
+    UNION SELECT person_name FROM movement_logs WHERE person_name IS NOT NULL
+    UNION SELECT details FROM movement_logs WHERE details IS NOT NULL;
+
+CREATE TABLE movement_log_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    item_id INTEGER NOT NULL,
+    item_name_id INTEGER,
+    action_type_id INTEGER NOT NULL,
+    quantity_changed INTEGER,
+    resulting_quantity INTEGER,
+    provider_id INTEGER,
+    cost_per_item REAL,
+    details_id INTEGER,
+    person_name_id INTEGER,
+    destination_id INTEGER,
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE RESTRICT,
+    FOREIGN KEY (destination_id) REFERENCES destinations(id) ON DELETE RESTRICT,
+    FOREIGN KEY (provider_id) REFERENCES providers(id) ON DELETE SET NULL
+);
+
+INSERT INTO movement_log_entries (
+    id, timestamp, item_id, item_name_id, action_type_id, quantity_changed, resulting_quantity,
+    provider_id, cost_per_item, details_id, person_name_id, destination_id
+)
+SELECT ml.id, ml.timestamp, ml.item_id, item_name.id, action.id, ml.quantity_changed, ml.resulting_quantity,
+       ml.provider_id, ml.cost_per_item, details.id, person.id, ml.destination_id
+FROM movement_logs ml
+JOIN log_action_types action ON action.name = ml.action_type
+LEFT JOIN log_strings item_name ON item_name.value = ml.item_name
+LEFT JOIN log_strings details ON details.value = ml.details
+LEFT JOIN log_strings person ON person.value = ml.person_name
+ORDER BY ml.id;
+
+-- Keep the AUTOINCREMENT high-water mark, so ids of archived logs are never reused.
+DELETE FROM sqlite_sequence WHERE name = 'movement_log_entries';
+INSERT INTO sqlite_sequence (name, seq) SELECT 'movement_log_entries', seq FROM sqlite_sequence WHERE name = 'movement_logs';
+
+DROP TABLE movement_logs;
+
+CREATE INDEX IF NOT EXISTS idx_mov_log_item_id ON movement_log_entries (item_id);
+CREATE INDEX IF NOT EXISTS idx_mov_log_timestamp ON movement_log_entries (timestamp);
+CREATE INDEX IF NOT EXISTS idx_mov_log_provider_id ON movement_log_entries (provider_id);
+CREATE INDEX IF NOT EXISTS idx_mov_log_destination_id ON movement_log_entries (destination_id);
+CREATE INDEX IF NOT EXISTS idx_mov_log_action_timestamp ON movement_log_entries (action_type_id, timestamp, item_id, quantity_changed);
+
+-- The names are decoded with scalar subqueries rather than joins, so a query
+-- only pays for the columns it reads (SQLite keeps unused LEFT JOINs in
+-- aggregate queries). The code column action_type_id is exposed as well:
+-- filters on action_type should compare it with the code, e.g.
+--   action_type_id = (SELECT id FROM log_action_types WHERE name = 'Removal')
+-- which idx_mov_log_action_timestamp serves; a filter on the decoded
+-- action_type cannot use an index.
+CREATE VIEW movement_logs AS
+SELECT mle.id, mle.timestamp, mle.item_id,
+       (SELECT value FROM log_strings WHERE id = mle.item_name_id) AS item_name,
+       (SELECT name FROM log_action_types WHERE id = mle.action_type_id) AS action_type,
+       mle.quantity_changed, mle.resulting_quantity, mle.provider_id, mle.cost_per_item,
+       (SELECT value FROM log_strings WHERE id = mle.details_id) AS details,
+       (SELECT value FROM log_strings WHERE id = mle.person_name_id) AS person_name,
+       mle.destination_id, mle.action_type_id
+FROM movement_log_entries mle;
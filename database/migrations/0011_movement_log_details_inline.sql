@@ -0,0 +1,27 @@
+-- database/migrations/0011_movement_log_details_inline.sql
+
+-- Log details are free text that rarely repeats ("Status changed from ... to
+-- ...", notes), so interning them in log_strings (migration 0010) saved little
+-- and grew the dictionary by about a value per log. They are stored inline in
+-- movement_log_entries again; log_strings keeps the item and person names.
+ALTER TABLE movement_log_entries ADD COLUMN details TEXT;
+UPDATE movement_log_entries
+SET details = (SELECT value FROM log_strings WHERE id = movement_log_entries.details_id)
+WHERE details_id IS NOT NULL;
+
+DROP VIEW movement_logs;
+ALTER TABLE movement_log_entries DROP COLUMN details_id;
+
+DELETE FROM log_strings
+WHERE id NOT IN (SELECT item_name_id FROM movement_log_entries WHERE item_name_id IS NOT NULL)
+  AND id NOT IN (SELECT person_name_id FROM movement_log_entries WHERE person_name_id IS NOT NULL);
+
+CREATE VIEW movement_logs AS
+SELECT mle.id, mle.timestamp, mle.item_id,
+       (SELECT value FROM log_strings WHERE id = mle.item_name_id) AS item_name,
+       (SELECT name FROM log_action_types WHERE id = mle.action_type_id) AS action_type,
+       mle.quantity_changed, mle.resulting_quantity, mle.provider_id, mle.cost_per_item,
+       mle.details,
+       (SELECT value FROM log_strings WHERE id = mle.person_name_id) AS person_name,
+       mle.destination_id, mle.action_type_id
+FROM movement_log_entries mle;
@@ -0,0 +1,9 @@
+-- database/migrations/0012_items_unique_normalized_name.sql
+
+-- Item names are unique up to normalize_name(), which add_item and update_item
+-- only checked before writing, so two concurrent requests could both pass the
+-- check. The index now enforces it; the runner first lists any items sharing
+-- a normalized name (db_utils._check_duplicate_item_names), since those must
+-- be renamed before this migration can apply.
+DROP INDEX IF EXISTS idx_items_normalized_name;
+CREATE UNIQUE INDEX idx_items_normalized_name ON items (normalized_name);
@@ -0,0 +1,62 @@
+import pytest
+from app import create_app
+from app.models import (barcode_index, count_cache, db_utils, movement_log_model, scan_session_model,
+                        valuation_model)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    The API on a new database in tmp_path. The in-process caches (dictionary
+    codes, barcode index, counts, scan sessions) would carry over from the
+    database of an earlier test, so they start empty.
+    """
+    monkeypatch.setenv('APPDATA', str(tmp_path))
+    monkeypatch.setattr(db_utils, 'DATABASE_NAME', str(tmp_path / 'warehouse.db'))
+    monkeypatch.setattr(db_utils, 'DB_INITIALIZED', False)
+    monkeypatch.setattr(movement_log_model, '_names', {"strings": {}, "string_codes": {}, "action_types": {}})
+    monkeypatch.setattr(valuation_model, '_backfilled', False)
+    monkeypatch.setattr(scan_session_model, '_sessions', {})
+    count_cache.clear()
+    barcode_index.invalidate()
+    db_utils.initialize_database()
+    return create_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def check(response, status=200):
+    """The JSON body of response, after asserting its status code."""
+    assert response.status_code == status, (response.status_code, response.get_data(as_text=True))
+    return response.get_json()
+
+@pytest.fixture
+def refs(client):
+    """Ids of a unit, a main category with one sub-category, a provider and a destination."""
+    main = check(client.post('/api/categories/', json={'name': 'Main'}), 201)
+    return {
+        'unit_id': check(client.post('/api/units/', json={'name': 'piece'}), 201)['id'],
+        'main_category_id': main['id'],
+        'sub_category_id': check(client.post('/api/categories/', json={'name': 'Sub', 'parent_id': main['id']}), 201)['id'],
+        'provider_id': check(client.post('/api/providers', json={'name': 'Provider'}), 201)['id'],
+        'destination_id': check(client.post('/api/destinations/', json={'name': 'Site'}), 201)['id'],
+    }
+
+@pytest.fixture
+def add_item(client, refs):
+    """Creates an active item through the API and returns it."""
+    def add(name, quantity=10, barcode=None, cost=2.0):
+        return check(client.post('/api/items/', json={
+            'name': name, 'unit_id': refs['unit_id'], 'sub_category_id': refs['sub_category_id'],
+            'initial_quantity': quantity, 'cost': cost, 'barcode': barcode, 'person_name': 'tester',
+        }), 201)
+    return add
+
+@pytest.fixture
+def adjust(client):
+    """Records an addition or removal through the API."""
+    def adjust_item(item_id, change_amount, adjustment_type):
+        return check(client.post(f'/api/items/{item_id}/adjust', json={
+            'change_amount': change_amount, 'adjustment_type': adjustment_type, 'person_name': 'tester',
+        }))
+    return adjust_item
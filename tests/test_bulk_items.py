@@ -0,0 +1,55 @@
+import sqlite3
+import pytest
+from app.models import item_model
+from conftest import check
+
+def _log_count(client):
+    return check(client.get('/api/movement-logs?page=1&page_size=1'))['total_records']
+
+def test_bulk_status_archive_and_restore(client, refs, add_item):
+    items = [add_item(f'Item {n}') for n in range(3)]
+    item_ids = [item['id'] for item in items]
+    logs = _log_count(client)
+
+    summary = check(client.post('/api/items/bulk/status', json={'status': 'inactive', 'item_ids': item_ids + [9999]}))
+    assert summary['updated'] == 3 and summary['not_found_ids'] == [9999]
+    summary = check(client.post('/api/items/bulk/archive', json={'sub_category_id': refs['sub_category_id']}))
+    assert summary['updated'] == 3 and summary['updated_ids'] == item_ids
+    summary = check(client.post('/api/items/bulk/restore', json={
+        'target_sub_category_id': refs['sub_category_id'], 'item_ids': item_ids[:2]}))
+    assert summary['restored'] == 2
+
+    statuses = [check(client.get(f'/api/items/{item_id}'))['status'] for item_id in item_ids]
+    assert statuses == ['active', 'active', 'archived']
+    assert _log_count(client) == logs + 8
+
+@pytest.mark.parametrize('operation', ['status', 'archive', 'restore'])
+def test_bulk_operations_roll_back_when_logging_fails(client, refs, add_item, monkeypatch, operation):
+    items = [add_item(f'Item {n}') for n in range(3)]
+    item_ids = [item['id'] for item in items]
+    body = {'item_ids': item_ids}
+    if operation == 'status':
+        body['status'] = 'inactive'
+    elif operation == 'restore':
+        check(client.post('/api/items/bulk/archive', json={'item_ids': item_ids}))
+        body['target_sub_category_id'] = refs['sub_category_id']
+    statuses = {item_id: check(client.get(f'/api/items/{item_id}'))['status'] for item_id in item_ids}
+    logs = _log_count(client)
+
+    def fail(entries, db=None):
+        # The UPDATE has run by now; the error must undo it.
+        raise sqlite3.OperationalError('disk I/O error')
+    with monkeypatch.context() as patch:
+        patch.setattr(item_model, 'add_log_entries', fail)
+        check(client.post(f'/api/items/bulk/{operation}', json=body), 500)
+
+    assert {item_id: check(client.get(f'/api/items/{item_id}'))['status'] for item_id in item_ids} == statuses
+    assert _log_count(client) == logs
+    # The connection is usable again: the next bulk change goes through.
+    assert check(client.post('/api/items/bulk/status', json={'status': 'inactive', 'item_ids': item_ids}))['updated'] > 0
+
+def test_bulk_requests_are_validated(client):
+    check(client.post('/api/items/bulk/status', json={'status': 'inactive'}), 400)
+    check(client.post('/api/items/bulk/status', json={'status': 'gone', 'item_ids': [1]}), 400)
+    check(client.post('/api/items/bulk/archive', json={'item_ids': 'all'}), 400)
+    check(client.post('/api/items/bulk/restore', json={'item_ids': [1]}), 400)
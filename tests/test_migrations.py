@@ -0,0 +1,137 @@
+import sqlite3
+import pytest
+from app.models import db_utils, movement_log_model
+
+# The runner's own list, kept before _migrate narrows it.
+get_all_migrations = db_utils.get_migrations
+
+# The log list as it was read from the plain movement_logs table (schema
+# versions 1-9), before migration 0010 moved the rows to movement_log_entries.
+PLAIN_LOG_QUERY = """
+    SELECT ml.id, ml.item_id, ml.item_name, ml.action_type, ml.quantity_changed, ml.resulting_quantity,
+           p.name as provider, ml.cost_per_item, ml.details, ml.person_name, ml.timestamp,
+           d.name as destination_name
+    FROM movement_logs ml
+    LEFT JOIN destinations d ON ml.destination_id = d.id
+    LEFT JOIN providers p ON ml.provider_id = p.id
+    {where}
+    ORDER BY ml.timestamp DESC
+"""
+
+def _create_v1_database(path):
+    """A database at the baseline schema (version 1) with items and logs written the old way."""
+    conn = sqlite3.connect(path)
+    with open(db_utils.SCHEMA_PATH, encoding='utf-8') as f:
+        db_utils._apply_script(conn, f.read(), db_utils.BASELINE_SCHEMA_VERSION)
+    conn.executescript("""
+        INSERT INTO units (id, name) VALUES (1, 'piece');
+        INSERT INTO categories (id, name) VALUES (1, 'Main');
+        INSERT INTO categories (id, name, parent_id) VALUES (2, 'Sub', 1);
+        INSERT INTO providers (id, name) VALUES (1, 'Provider');
+        INSERT INTO destinations (id, name) VALUES (1, 'Site');
+        INSERT INTO items (id, name, unit_id, sub_category_id, current_quantity, cost, status, barcode) VALUES
+            (1, 'Bolt', 1, 2, 7, 2.5, 'active', 'B1'),
+            (2, 'مسمار', 1, 2, 3, NULL, 'archived', NULL);
+        INSERT INTO movement_logs (timestamp, item_id, item_name, action_type, quantity_changed, resulting_quantity,
+                                   provider_id, cost_per_item, details, person_name, destination_id) VALUES
+            ('2026-01-01 09:00:00', 1, 'Bolt', 'Creation', 5, 5, 1, NULL, 'Item created.', 'Sara', NULL),
+            ('2026-01-02 09:00:00', 2, 'مسمار', 'Creation', 3, 3, NULL, NULL, 'Item created.', NULL, NULL),
+            ('2026-01-03 09:00:00', 1, 'Bolt', 'Addition', 4, 9, 1, 3.0, NULL, 'Sara', NULL),
+            ('2026-01-04 09:00:00', 1, 'Bolt', 'Removal', 2, 7, NULL, NULL, NULL, 'Omar', 1),
+            ('2026-01-05 09:00:00', 2, 'مسمار', 'Status Change', NULL, NULL, NULL, NULL,
+             'Status changed from ''active'' to ''archived''.', 'Omar', NULL),
+            ('2026-01-06 09:00:00', 1, 'Bolt', 'Stock Count', NULL, NULL, NULL, NULL, 'Legacy action type.', NULL, NULL);
+    """)
+    conn.commit()
+    conn.close()
+
+def _migrate(monkeypatch, path, through_version=None):
+    """Runs the migration runner on path, applying the migrations up to through_version (all when None)."""
+    migrations = [(version, script) for version, script in get_all_migrations()
+                  if through_version is None or version <= through_version]
+    monkeypatch.setattr(db_utils, 'get_migrations', lambda: migrations)
+    monkeypatch.setattr(db_utils, 'DATABASE_NAME', str(path))
+    monkeypatch.setattr(db_utils, 'DB_INITIALIZED', False)
+    db_utils.initialize_database()
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def _plain_logs(path, where="", params=()):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(PLAIN_LOG_QUERY.format(where=where), params)]
+    finally:
+        conn.close()
+
+def test_migrations_upgrade_a_v1_database(tmp_path, monkeypatch):
+    path = tmp_path / 'v1.db'
+    _create_v1_database(path)
+    latest_version = max(version for version, _ in get_all_migrations())
+
+    assert _migrate(monkeypatch, path) == latest_version
+    assert db_utils.DB_INITIALIZED
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    items = {row['id']: row['normalized_name'] for row in conn.execute("SELECT id, normalized_name FROM items")}
+    assert items == {1: 'bolt', 2: 'مسمار'}
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'movement_logs'").fetchone()[0] == 'view'
+    assert conn.execute("SELECT COUNT(*) FROM movement_log_entries").fetchone()[0] == 6
+    # New logs continue after the migrated ones.
+    assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'movement_log_entries'").fetchone()[0] == 6
+    conn.close()
+
+def test_a_current_database_is_left_untouched(tmp_path, monkeypatch):
+    path = tmp_path / 'v1.db'
+    _create_v1_database(path)
+    latest_version = _migrate(monkeypatch, path)
+
+    def fail(*args):
+        raise AssertionError("a migration ran on a current database")
+    monkeypatch.setattr(db_utils, '_apply_script', fail)
+    assert _migrate(monkeypatch, path) == latest_version
+
+def test_dictionary_encoding_keeps_the_log_list(app, tmp_path, monkeypatch):
+    path = tmp_path / 'v1.db'
+    _create_v1_database(path)
+    # The last layout before migration 0010, read the way the log list read it then.
+    assert _migrate(monkeypatch, path, through_version=9) == 9
+    every_log = _plain_logs(path)
+    removals = _plain_logs(path, "WHERE ml.action_type IN (?) AND ml.destination_id = ?", ('Removal', 1))
+    bolt_logs = _plain_logs(path, "WHERE ml.item_id = ?", (1,))
+    assert len(every_log) == 6 and len(removals) == 1
+
+    _migrate(monkeypatch, path)
+    with app.app_context():
+        assert movement_log_model.get_movement_logs(None, page=None)["logs"] == every_log
+        assert movement_log_model.get_movement_logs(None, page=1, page_size=4)["logs"] == every_log[:4]
+        assert movement_log_model.get_movement_logs(
+            {'action_type': 'Removal', 'destination_id': '1'}, page=1, page_size=50)["logs"] == removals
+        assert movement_log_model.get_movement_logs({'item_id': 1}, page=None)["logs"] == bolt_logs
+        assert list(movement_log_model.iter_movement_logs(None)) == every_log
+
+def test_duplicate_item_names_stop_the_unique_name_migration(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'v1.db'
+    _create_v1_database(path)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO items (id, name, unit_id, status) VALUES (3, 'BOLT ', 1, 'archived')")
+    conn.commit()
+    conn.close()
+
+    assert _migrate(monkeypatch, path) == 11
+    assert not db_utils.DB_INITIALIZED
+    assert "[1: Bolt, 3: BOLT ]" in capsys.readouterr().out
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE items SET name = 'Bolt (old)', normalized_name = 'bolt (old)' WHERE id = 3")
+    conn.commit()
+    conn.close()
+    assert _migrate(monkeypatch, path) == 12
+    conn = sqlite3.connect(path)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO items (name, normalized_name, unit_id) VALUES ('bolt', 'bolt', 1)")
+    conn.close()
@@ -0,0 +1,70 @@
+from app.models import reconciliation_model
+from app.models.db_utils import get_db_connection
+from conftest import check
+
+def _break_last_log(item_id, by=1):
+    """Changes the resulting_quantity of the item's newest log, as a lost or doubled write would."""
+    conn = get_db_connection()
+    log_id = conn.execute("SELECT MAX(id) FROM movement_logs WHERE item_id = ?", (item_id,)).fetchone()[0]
+    conn.execute("UPDATE movement_log_entries SET resulting_quantity = resulting_quantity + ? WHERE id = ?", (by, log_id))
+    conn.commit()
+    conn.close()
+    return log_id
+
+def test_a_consistent_ledger_has_no_issues(client, add_item, adjust):
+    bolt = add_item('Bolt', quantity=10)
+    adjust(bolt['id'], 5, 'addition')
+    adjust(bolt['id'], 3, 'removal')
+    run = check(client.post('/api/reconciliation/run', json={}))
+    assert run['full'] and run['logs_checked'] == 3 and run['quantity_mismatches'] == 0
+    assert check(client.get('/api/reconciliation'))['counts'] == {'chain_break': 0, 'quantity_mismatch': 0}
+
+def test_chain_breaks_are_found_on_incremental_and_full_runs(client, add_item, adjust):
+    bolt = add_item('Bolt', quantity=10)
+    nut = add_item('Nut', quantity=4)
+    check(client.post('/api/reconciliation/run', json={}))
+
+    # After the first run the chains continue from their checkpoints.
+    adjust(bolt['id'], 5, 'addition')
+    broken_log_id = _break_last_log(bolt['id'])
+    adjust(bolt['id'], 2, 'removal')
+    adjust(nut['id'], 1, 'removal')
+    conn = get_db_connection()
+    conn.execute("UPDATE items SET current_quantity = current_quantity + 5 WHERE id = ?", (nut['id'],))
+    conn.commit()
+    conn.close()
+    run = check(client.post('/api/reconciliation/run', json={}))
+    assert not run['full'] and run['logs_checked'] == 3 and run['quantity_mismatches'] == 1
+
+    report = check(client.get('/api/reconciliation?issue_type=chain_break'))
+    assert report['counts'] == {'chain_break': 2, 'quantity_mismatch': 1}
+    # The addition logged 16 instead of 15; the removal after it was applied to
+    # the real 15, so it breaks the chain (which goes on from 16) as well.
+    breaks = [(issue['item_id'], issue['log_id'], issue['expected_quantity'], issue['actual_quantity'])
+              for issue in reversed(report['issues'])]
+    assert breaks == [(bolt['id'], broken_log_id, 15, 16), (bolt['id'], broken_log_id + 1, 14, 13)]
+    mismatch = check(client.get('/api/reconciliation?issue_type=quantity_mismatch'))['issues'][0]
+    assert (mismatch['item_id'], mismatch['expected_quantity'], mismatch['actual_quantity']) == (nut['id'], 3, 8)
+
+    full = check(client.post('/api/reconciliation/run', json={'full': True}))
+    assert full['logs_checked'] == 5
+    assert check(client.get('/api/reconciliation'))['counts'] == {'chain_break': 2, 'quantity_mismatch': 1}
+
+def test_logs_written_during_the_sweep_are_checked(client, add_item, adjust, monkeypatch):
+    bolt = add_item('Bolt', quantity=10)
+    sweep = reconciliation_model._sweep
+    calls = []
+
+    def sweep_then_adjust(*args):
+        checked = sweep(*args)
+        if not calls:
+            # A removal that lands after the unlocked sweep, with a wrong resulting quantity.
+            adjust(bolt['id'], 4, 'removal')
+            calls.append(_break_last_log(bolt['id'], by=-1))
+        return checked
+    monkeypatch.setattr(reconciliation_model, '_sweep', sweep_then_adjust)
+
+    run = check(client.post('/api/reconciliation/run', json={}))
+    assert run['logs_checked'] == 2 and run['through_log_id'] == calls[0]
+    issue = check(client.get('/api/reconciliation?issue_type=chain_break'))['issues'][0]
+    assert (issue['log_id'], issue['expected_quantity'], issue['actual_quantity']) == (calls[0], 6, 5)
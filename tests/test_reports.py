@@ -0,0 +1,20 @@
+import os
+import re
+import zlib
+from app import pdf_render
+
+def test_only_the_drawn_glyphs_are_embedded(tmp_path):
+    path = tmp_path / 'report.pdf'
+    with pdf_render.StreamingPdf(path, title='تقرير') as pdf:
+        page = pdf.new_page()
+        page.text('تقرير الأصناف — Bolt 12', pdf_render.MARGIN, 800, 10, align='left')
+        pdf.add_page(page)
+    data = path.read_bytes()
+
+    font_file = re.search(rb"/Length (\d+) /Length1 (\d+) /Filter /FlateDecode >>\nstream\n", data)
+    packed_length, length = int(font_file.group(1)), int(font_file.group(2))
+    subset = zlib.decompress(data[font_file.end():font_file.end() + packed_length])
+    assert len(subset) == length < os.path.getsize(pdf_render._font_path()) // 20
+    assert re.search(rb"/BaseFont /[A-Z]{6}\+", data)
+    # The pages keep the full font's glyph ids; the map points each one into the subset.
+    assert re.search(rb"/CIDToGIDMap \d+ 0 R", data)
@@ -0,0 +1,44 @@
+from conftest import check
+
+def test_close_applies_one_adjustment_per_item(client, refs, add_item):
+    bolt = add_item('Bolt', quantity=10, barcode='B1')
+    session = check(client.post('/api/scan-sessions', json={
+        'adjustment_type': 'removal', 'person_name': 'desk', 'destination_id': refs['destination_id']}), 201)
+    for _ in range(3):
+        check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'B1'}))
+    logs = check(client.get('/api/movement-logs?page=1&page_size=1'))['total_records']
+
+    closed = check(client.post(f"/api/scan-sessions/{session['id']}/close"))
+    assert closed['items'][0]['current_quantity'] == 7
+    assert check(client.get('/api/movement-logs?page=1&page_size=1'))['total_records'] == logs + 1
+    check(client.get(f"/api/scan-sessions/{session['id']}"), 404)
+
+def test_close_with_short_stock_applies_nothing(client, refs, add_item, adjust):
+    bolt = add_item('Bolt', quantity=10, barcode='B1')
+    nut = add_item('Nut', quantity=4, barcode='N1')
+    session = check(client.post('/api/scan-sessions', json={'adjustment_type': 'removal', 'person_name': 'desk'}), 201)
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'B1', 'quantity': 2}))
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'N1', 'quantity': 4}))
+    # Stock leaves by another path before the session closes.
+    adjust(nut['id'], 1, 'removal')
+    logs = check(client.get('/api/movement-logs?page=1&page_size=1'))['total_records']
+
+    error = check(client.post(f"/api/scan-sessions/{session['id']}/close"), 400)['error']
+    assert "Only 3 of 'Nut' in stock, 4 scanned." in error
+    # The bolts scanned before the nuts are not taken either, and the session stays open.
+    assert check(client.get(f"/api/items/{bolt['id']}"))['current_quantity'] == 10
+    assert check(client.get(f"/api/items/{nut['id']}"))['current_quantity'] == 3
+    assert check(client.get('/api/movement-logs?page=1&page_size=1'))['total_records'] == logs
+    assert check(client.get(f"/api/scan-sessions/{session['id']}"))['total_quantity'] == 6
+
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'N1', 'quantity': -1}))
+    check(client.post(f"/api/scan-sessions/{session['id']}/close"))
+    assert check(client.get(f"/api/items/{bolt['id']}"))['current_quantity'] == 8
+    assert check(client.get(f"/api/items/{nut['id']}"))['current_quantity'] == 0
+
+def test_removal_scans_beyond_stock_are_refused(client, refs, add_item):
+    add_item('Bolt', quantity=2, barcode='B1')
+    session = check(client.post('/api/scan-sessions', json={'adjustment_type': 'removal'}), 201)
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'B1', 'quantity': 2}))
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'B1'}), 400)
+    check(client.post(f"/api/scan-sessions/{session['id']}/scans", json={'barcode': 'NOPE'}), 400)
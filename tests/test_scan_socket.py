@@ -0,0 +1,46 @@
+import json
+import threading
+import pytest
+from werkzeug.serving import make_server
+from conftest import check
+
+pytest.importorskip('flask_sock')
+simple_websocket = pytest.importorskip('simple_websocket')
+
+@pytest.fixture
+def socket_url(app):
+    """ws:// URL of /ws/scan on a real server, since the test client cannot upgrade connections."""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'ws://127.0.0.1:{server.server_port}/ws/scan'
+    server.shutdown()
+    thread.join()
+
+def test_scan_socket_answers_requests_in_order(client, refs, add_item, socket_url):
+    bolt = add_item('Bolt', quantity=10, barcode='B1')
+    session = check(client.post('/api/scan-sessions', json={'adjustment_type': 'removal'}), 201)
+    ws = simple_websocket.Client(socket_url)
+    try:
+        for message in (
+            {'id': 1, 'op': 'lookup', 'barcode': 'B1'},
+            {'id': 2, 'op': 'adjust', 'item_id': bolt['id'], 'change_amount': 3, 'adjustment_type': 'removal',
+             'person_name': 'station'},
+            {'id': 3, 'op': 'scan', 'session_id': session['id'], 'barcode': 'B1'},
+            {'id': 4, 'op': 'adjust', 'item_id': 999999, 'change_amount': 1, 'adjustment_type': 'addition'},
+            {'id': 5, 'op': 'melt'},
+        ):
+            ws.send(json.dumps(message))
+        replies = [json.loads(ws.receive(timeout=5)) for _ in range(5)]
+        ws.send('not json')
+        invalid = json.loads(ws.receive(timeout=5))
+    finally:
+        ws.close()
+
+    assert [reply['id'] for reply in replies] == [1, 2, 3, 4, 5]
+    assert [reply['status'] for reply in replies] == [200, 200, 200, 404, 400]
+    assert replies[0]['result']['id'] == bolt['id']
+    assert replies[1]['result']['current_quantity'] == 7
+    assert replies[2]['result']['quantity'] == 1
+    assert invalid['status'] == 400 and invalid['id'] is None
+    assert check(client.get(f"/api/items/{bolt['id']}"))['current_quantity'] == 7
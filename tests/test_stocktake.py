@@ -0,0 +1,36 @@
+from conftest import check
+
+def test_movements_during_the_count_are_not_variances(client, refs, add_item, adjust):
+    bolt = add_item('Bolt', quantity=10)
+    nut = add_item('Nut', quantity=5)
+    session = check(client.post('/api/stocktakes', json={
+        'name': 'Aisle 3', 'person_name': 'tester', 'item_ids': [bolt['id'], nut['id']]}), 201)
+    assert session['line_count'] == 2
+
+    # Work goes on after the snapshot: 3 bolts leave before they are counted,
+    # 2 nuts arrive after the nut count was taken (counted_at).
+    adjust(bolt['id'], 3, 'removal')
+    adjust(nut['id'], 2, 'addition')
+    check(client.post(f"/api/stocktakes/{session['id']}/counts", json={'counts': [
+        {'item_id': bolt['id'], 'counted_quantity': 6},
+        {'item_id': nut['id'], 'counted_quantity': 5, 'counted_at': session['created_at']},
+    ], 'person_name': 'counter'}))
+
+    lines = {line['item_id']: line for line in check(client.get(f"/api/stocktakes/{session['id']}/variances"))['lines']}
+    assert lines[bolt['id']]['movements_since_snapshot'] == -3
+    assert lines[bolt['id']]['book_quantity'] == 7 and lines[bolt['id']]['variance'] == -1
+    assert lines[nut['id']]['movements_since_snapshot'] == 0
+    assert lines[nut['id']]['book_quantity'] == 5 and lines[nut['id']]['variance'] == 0
+
+    check(client.post(f"/api/stocktakes/{session['id']}/post", json={'person_name': 'tester'}))
+    # Only the real difference is posted, on top of the movements.
+    assert check(client.get(f"/api/items/{bolt['id']}"))['current_quantity'] == 6
+    assert check(client.get(f"/api/items/{nut['id']}"))['current_quantity'] == 7
+    check(client.post(f"/api/stocktakes/{session['id']}/post", json={}), 400)
+    assert check(client.post('/api/reconciliation/run', json={'full': True}))['quantity_mismatches'] == 0
+
+def test_counts_before_the_session_opened_are_rejected(client, refs, add_item):
+    bolt = add_item('Bolt')
+    session = check(client.post('/api/stocktakes', json={'name': 'Aisle 3', 'item_ids': [bolt['id']]}), 201)
+    check(client.post(f"/api/stocktakes/{session['id']}/counts", json={'counts': [
+        {'item_id': bolt['id'], 'counted_quantity': 1, 'counted_at': '2000-01-01T00:00:00'}]}), 400)